@@ -0,0 +1,161 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from mappings import MAPA_CARGOS_CODFUNCAO_METAX, MAPA_CARGOS_METAX
+from outcomes import OUTCOME_FAILED_ACTION, OUTCOME_FAILED_VERIFICATION, OUTCOME_SAVED_NOT_VERIFIED
+
+
+# Ordem de processamento do grupo do contrato por custo previsto: casos baratos e
+# provaveis primeiro, pessoas com cargo sem mapeamento, CEP que ja caiu no fallback
+# ou falha em execucao anterior por ultimo. Quem compartilha UF/regiao/cargo fica
+# junto (combos do formulario ja carregados). Os custos sao estimativas em segundos
+# de portal, usadas tambem para decidir se a pessoa ainda cabe no orcamento de tempo.
+CUSTO_BASE_S = 60
+CUSTO_CARGO_SEM_MAPA_S = 45
+CUSTO_CEP_INVALIDO_S = 40
+CUSTO_CEP_DESCONHECIDO_S = 15
+CUSTO_SEM_FOTO_S = 10
+CUSTO_FOTO_DESCONHECIDA_S = 5
+CUSTO_FALHA_ANTERIOR_S = 60
+
+OUTCOMES_FALHA = {OUTCOME_FAILED_ACTION, OUTCOME_FAILED_VERIFICATION, OUTCOME_SAVED_NOT_VERIFIED}
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS cep_portal (
+        cep TEXT PRIMARY KEY,
+        encontrado INTEGER NOT NULL,
+        atualizado_em TEXT NOT NULL
+    )
+"""
+
+_LOTE_CONSULTA = 500
+
+
+def _somente_digitos(valor) -> str:
+    return "".join(filter(str.isdigit, str(valor or "")))
+
+
+def _texto(valor) -> str:
+    return str(valor or "").strip().upper()
+
+
+def _conectar(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(SQL_CRIAR_TABELA)
+    return conn
+
+
+def consultar_ceps(path: str, ceps: list[str]) -> dict[str, bool]:
+    """Resultado da ultima busca de cada CEP no portal: {cep: encontrado}."""
+    ceps = sorted({_somente_digitos(c) for c in ceps if len(_somente_digitos(c)) == 8})
+    if not ceps or not os.path.exists(path):
+        return {}
+    conn = _conectar(path)
+    try:
+        resultado = {}
+        for i in range(0, len(ceps), _LOTE_CONSULTA):
+            lote = ceps[i:i + _LOTE_CONSULTA]
+            placeholders = ", ".join(["?"] * len(lote))
+            rows = conn.execute(
+                f"SELECT cep, encontrado FROM cep_portal WHERE cep IN ({placeholders})",
+                lote,
+            ).fetchall()
+            resultado.update({cep: bool(encontrado) for cep, encontrado in rows})
+        return resultado
+    finally:
+        conn.close()
+
+
+def gravar_ceps(path: str, ceps: dict[str, bool], agora: datetime | None = None) -> int:
+    linhas = [
+        (cep, int(bool(encontrado)), (agora or datetime.now()).isoformat())
+        for cep, encontrado in (ceps or {}).items()
+        if len(_somente_digitos(cep)) == 8
+    ]
+    if not linhas:
+        return 0
+    conn = _conectar(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cep_portal (cep, encontrado, atualizado_em) VALUES (?, ?, ?)",
+                linhas,
+            )
+    finally:
+        conn.close()
+    return len(linhas)
+
+
+def cargo_mapeado(funcionario: dict) -> bool:
+    cod_funcao = _texto(funcionario.get("CODFUNCAO"))
+    if cod_funcao and cod_funcao in MAPA_CARGOS_CODFUNCAO_METAX:
+        return True
+    return _texto(funcionario.get("DESCRICAO_CARGO")) in MAPA_CARGOS_METAX
+
+
+def custo_previsto(
+    funcionario: dict,
+    ceps_conhecidos: dict[str, bool],
+    ultimos_outcomes: dict[str, str],
+    fotos_conhecidas: dict[str, str | None],
+) -> tuple[int, list[str]]:
+    """Custo estimado (segundos) e os motivos que somaram acima do custo base."""
+    custo = CUSTO_BASE_S
+    motivos = []
+    if not cargo_mapeado(funcionario):
+        custo += CUSTO_CARGO_SEM_MAPA_S
+        motivos.append("cargo_sem_mapa")
+
+    cep = _somente_digitos(funcionario.get("CEP"))
+    if len(cep) != 8 or ceps_conhecidos.get(cep) is False:
+        custo += CUSTO_CEP_INVALIDO_S
+        motivos.append("cep_invalido")
+    elif cep not in ceps_conhecidos:
+        custo += CUSTO_CEP_DESCONHECIDO_S
+        motivos.append("cep_desconhecido")
+
+    cpf = _somente_digitos(funcionario.get("CPF"))
+    if cpf not in fotos_conhecidas:
+        custo += CUSTO_FOTO_DESCONHECIDA_S
+    elif not fotos_conhecidas[cpf]:
+        custo += CUSTO_SEM_FOTO_S
+        motivos.append("sem_foto")
+
+    if ultimos_outcomes.get(cpf) in OUTCOMES_FALHA:
+        custo += CUSTO_FALHA_ANTERIOR_S
+        motivos.append("falha_anterior")
+    return custo, motivos
+
+
+def chave_afinidade(funcionario: dict) -> tuple[str, str, str]:
+    # A query RM nao traz cidade; o prefixo de 5 digitos do CEP (regiao/setor) faz esse papel.
+    cargo = _texto(funcionario.get("CODFUNCAO")) or _texto(funcionario.get("DESCRICAO_CARGO"))
+    return _texto(funcionario.get("ESTADO")), _somente_digitos(funcionario.get("CEP"))[:5], cargo
+
+
+def ordenar_por_custo(
+    funcionarios: list[dict],
+    ceps_conhecidos: dict[str, bool] | None = None,
+    ultimos_outcomes: dict[str, str] | None = None,
+    fotos_conhecidas: dict[str, str | None] | None = None,
+) -> list[tuple[dict, int]]:
+    """
+    [(funcionario, custo_s)] na ordem de processamento. Os grupos de afinidade
+    (UF, regiao do CEP, cargo) saem pelo custo medio; dentro do grupo, pelo custo. Empates
+    mantem a ordem original (admissao).
+    """
+    grupos: dict[tuple[str, str, str], list[tuple[int, dict, int]]] = {}
+    for indice, func in enumerate(funcionarios):
+        custo, _ = custo_previsto(func, ceps_conhecidos or {}, ultimos_outcomes or {}, fotos_conhecidas or {})
+        grupos.setdefault(chave_afinidade(func), []).append((indice, func, custo))
+
+    def _prioridade_grupo(membros):
+        return sum(custo for _, _, custo in membros) / len(membros), membros[0][0]
+
+    ordem = []
+    for membros in sorted(grupos.values(), key=_prioridade_grupo):
+        for _, func, custo in sorted(membros, key=lambda m: (m[2], m[0])):
+            ordem.append((func, custo))
+    return ordem
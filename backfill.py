@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from utils import gravar_json_atomico
+
+
+# Backfill historico (--backfill DE ATE): o periodo e dividido em janelas de
+# admissao processadas uma a uma; o checkpoint guarda a ultima janela concluida
+# para que uma interrupcao retome na seguinte.
+
+
+def parse_data_backfill(valor: str) -> date:
+    return datetime.strptime(str(valor).strip(), "%Y-%m-%d").date()
+
+
+def dividir_periodo(inicio: date, fim: date, dias_por_janela: int) -> list[tuple[date, date]]:
+    """Janelas fechadas [inicio, fim] de ate dias_por_janela dias, em ordem cronologica."""
+    if fim < inicio:
+        raise ValueError(f"Periodo de backfill invalido: {inicio.isoformat()} > {fim.isoformat()}")
+    dias_por_janela = max(1, int(dias_por_janela))
+    janelas = []
+    atual = inicio
+    while atual <= fim:
+        janela_fim = min(atual + timedelta(days=dias_por_janela - 1), fim)
+        janelas.append((atual, janela_fim))
+        atual = janela_fim + timedelta(days=1)
+    return janelas
+
+
+def ler_checkpoint(path: str) -> dict | None:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_checkpoint(path: str, checkpoint: dict):
+    gravar_json_atomico(path, checkpoint, indent=2)
+
+
+def novo_checkpoint(inicio: date, fim: date, dias_por_janela: int) -> dict:
+    return {
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "dias_por_janela": int(dias_por_janela),
+        "ultima_janela_concluida": None,
+        "janelas_concluidas": [],
+        "concluido": False,
+        "atualizado_em": datetime.now().isoformat(),
+    }
+
+
+def checkpoint_compativel(checkpoint: dict | None, inicio: date, fim: date) -> bool:
+    """Checkpoint so e retomado para o mesmo periodo DE/ATE."""
+    return bool(checkpoint) and checkpoint.get("inicio") == inicio.isoformat() and checkpoint.get("fim") == fim.isoformat()
+
+
+def janelas_pendentes(janelas: list[tuple[date, date]], checkpoint: dict | None) -> list[tuple[date, date]]:
+    """Janelas posteriores a ultima concluida no checkpoint."""
+    ultima = (checkpoint or {}).get("ultima_janela_concluida")
+    if not ultima:
+        return list(janelas)
+    ultimo_fim = date.fromisoformat(ultima)
+    return [janela for janela in janelas if janela[1] > ultimo_fim]
+
+
+def orcamento_esgotado(prazo: float | None, agora: float | None = None) -> bool:
+    """Com --orcamento-min, nenhuma janela nova comeca depois do prazo (epoch)."""
+    return prazo is not None and (agora or time.time()) >= prazo
+
+
+def registrar_janela_se_completa(
+    checkpoint: dict,
+    janela: tuple[date, date],
+    execution_id: str,
+    adiados: int,
+    resumo: dict | None = None,
+    total_janelas: int | None = None,
+) -> bool:
+    """
+    Marca a janela como concluida so se ninguem dela foi adiado pelo orcamento de tempo;
+    caso contrario o checkpoint fica na janela anterior e a proxima execucao refaz esta.
+    """
+    if adiados:
+        return False
+    registrar_janela_concluida(checkpoint, janela, execution_id, resumo=resumo, total_janelas=total_janelas)
+    return True
+
+
+def registrar_janela_concluida(
+    checkpoint: dict,
+    janela: tuple[date, date],
+    execution_id: str,
+    resumo: dict | None = None,
+    total_janelas: int | None = None,
+) -> dict:
+    inicio, fim = janela
+    checkpoint["ultima_janela_concluida"] = fim.isoformat()
+    checkpoint["janelas_concluidas"].append(
+        {
+            "inicio": inicio.isoformat(),
+            "fim": fim.isoformat(),
+            "execution_id": execution_id,
+            "concluida_em": datetime.now().isoformat(),
+            **(resumo or {}),
+        }
+    )
+    checkpoint["concluido"] = fim.isoformat() >= checkpoint["fim"]
+    if total_janelas is not None:
+        checkpoint["total_janelas"] = total_janelas
+    checkpoint["atualizado_em"] = datetime.now().isoformat()
+    return checkpoint
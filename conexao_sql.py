@@ -0,0 +1,145 @@
+import json
+import os
+import queue
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils import gravar_json_atomico
+
+
+DRIVERS_ODBC_CANDIDATOS = [
+    "ODBC Driver 17 for SQL Server",
+    "ODBC Driver 18 for SQL Server",
+    "ODBC Driver 13 for SQL Server",
+    "SQL Server",
+    "SQL Server Native Client 11.0",
+]
+
+
+def _host_atual() -> str:
+    return socket.gethostname() or "desconhecido"
+
+
+def ler_driver_cache(path: str, server: str, host: str | None = None) -> str | None:
+    """Retorna o driver que funcionou por ultimo neste host para o servidor informado."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entrada = (data or {}).get(host or _host_atual()) or {}
+    if entrada.get("server") != server:
+        return None
+    return entrada.get("driver")
+
+
+def gravar_driver_cache(path: str, server: str, database: str, driver: str, host: str | None = None):
+    """Grava driver/servidor por host. Nunca grava credenciais."""
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except (OSError, ValueError):
+            data = {}
+    data[host or _host_atual()] = {
+        "driver": driver,
+        "server": server,
+        "database": database,
+        "atualizado_em": datetime.now().isoformat(),
+    }
+    gravar_json_atomico(path, data, indent=2)
+
+
+def ordenar_drivers(driver_preferido: str | None, driver_cache: str | None, disponiveis: list[str]) -> list[str]:
+    """Driver em cache primeiro, depois o configurado e os candidatos; so os instalados."""
+    ordem = []
+    for driver in [driver_cache, driver_preferido, *DRIVERS_ODBC_CANDIDATOS]:
+        if driver and driver in disponiveis and driver not in ordem:
+            ordem.append(driver)
+    return ordem
+
+
+class PoolConexoes:
+    """
+    Pool simples de conexoes reaproveitadas durante a execucao.
+    Conexoes ociosas sao validadas (keep-alive) antes de serem entregues.
+    """
+
+    def __init__(self, fabrica, tamanho_max: int = 4, sql_validacao: str = "SELECT 1"):
+        self._fabrica = fabrica
+        self._tamanho_max = max(1, int(tamanho_max))
+        self._sql_validacao = sql_validacao
+        self._ociosas = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(self._tamanho_max)
+        self.criadas = 0
+        self.reutilizadas = 0
+
+    @property
+    def tamanho_max(self) -> int:
+        return self._tamanho_max
+
+    def _esta_viva(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql_validacao)
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _fechar_silencioso(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _pegar(self):
+        while True:
+            try:
+                conn = self._ociosas.get_nowait()
+            except queue.Empty:
+                break
+            if self._esta_viva(conn):
+                self.reutilizadas += 1
+                return conn
+            self._fechar_silencioso(conn)
+        conn = self._fabrica()
+        self.criadas += 1
+        return conn
+
+    @contextmanager
+    def conexao(self):
+        self._vagas.acquire()
+        conn = None
+        try:
+            conn = self._pegar()
+            yield conn
+        except BaseException:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                self._fechar_silencioso(conn)
+            raise
+        else:
+            try:
+                conn.commit()
+                self._ociosas.put(conn)
+            except Exception:
+                self._fechar_silencioso(conn)
+        finally:
+            self._vagas.release()
+
+    def fechar(self):
+        while True:
+            try:
+                conn = self._ociosas.get_nowait()
+            except queue.Empty:
+                return
+            self._fechar_silencioso(conn)
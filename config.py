@@ -18,6 +18,17 @@ DEFAULT_PUBLIC_BASE_DIR = r"P:\ProcessoMetaX"
 SHAREPOINT_SITE_URL = os.getenv("SHAREPOINT_SITE_URL")
 SHAREPOINT_CLIENT_ID = os.getenv("SHAREPOINT_CLIENT_ID")
 SHAREPOINT_CLIENT_SECRET = os.getenv("SHAREPOINT_CLIENT_SECRET")
+SHAREPOINT_BASE_FOLDER = os.getenv("SHAREPOINT_BASE_FOLDER") or (
+    "/sites/Corporativo/"
+    "Documentos Compartilhados/Enesa/"
+    "125 - ARAUCO/DP/"
+    "01.ADMISSÃO/"
+    "04.DOCUMENTAÇÃO MOBILIZAÇÃO"
+)
+
+# Obra atendida nesta execucao (segundo segmento do CODSECAO). O launcher de
+# multiplas obras (launcher_obras.py) define METAX_OBRA por particao.
+NUMERO_OBRA = int(os.getenv("METAX_OBRA") or "125")
 
 # SQL Server Configuration
 DB_DRIVER = os.getenv("DB_DRIVER", "SQL Server")
@@ -57,6 +68,44 @@ PUBLIC_JSON_DIR = os.getenv("PUBLIC_JSON_DIR", os.path.join(PUBLIC_BASE_DIR, "js
 PUBLIC_RELEASES_DIR = os.getenv("PUBLIC_RELEASES_DIR", os.path.join(PUBLIC_BASE_DIR, "releases"))
 PUBLIC_SCREENSHOTS_DIR = os.getenv("PUBLIC_SCREENSHOTS_DIR", os.path.join(PUBLIC_BASE_DIR, "screenshots"))
 
+# Cache local (referencias RM e afins)
+CACHE_DIR = os.getenv("METAX_CACHE_DIR", os.path.join(ROOT_DIR, "cache"))
+
+# Lista de nomes excluidos da busca SQL (um por linha), editavel sem release
+NOMES_EXCLUIDOS_PATH = os.getenv("NOMES_EXCLUIDOS_PATH", os.path.join(PUBLIC_INPUTS_DIR, "nomes_excluidos.txt"))
+
+# Watermark da ingestao incremental (ultima admissao concluida)
+WATERMARK_PATH = os.getenv("METAX_WATERMARK_PATH", os.path.join(PUBLIC_JSON_DIR, "rm_watermark.json"))
+
+# Ledger de outcomes entre execucoes (CPF -> ultimo outcome + hash da linha RM)
+LEDGER_PATH = os.getenv("METAX_LEDGER_PATH", os.path.join(CACHE_DIR, "outcome_ledger.sqlite3"))
+
+# Snapshot local dos resultados da query RM (TTL em METAX_RM_SNAPSHOT_TTL_MIN)
+RM_SNAPSHOT_PATH = os.getenv("METAX_RM_SNAPSHOT_PATH", os.path.join(CACHE_DIR, "rm_snapshots.sqlite3"))
+
+# storage_state do portal por contrato, cifrado com DPAPI (login/CAPTCHA reaproveitado entre execucoes)
+SESSAO_PORTAL_DIR = os.getenv("METAX_SESSAO_DIR", os.path.join(CACHE_DIR, "sessoes"))
+
+# Journal por execucao (uma linha por pessoa concluida) para --resume
+JOURNAL_DIR = os.getenv("METAX_JOURNAL_DIR", os.path.join(CACHE_DIR, "journal"))
+
+# Ultimo resultado da busca de cada CEP no portal (custo previsto do agendador)
+CEP_CACHE_PATH = os.getenv("METAX_CEP_CACHE_PATH", os.path.join(CACHE_DIR, "ceps_portal.sqlite3"))
+
+# Filas compartilhadas entre maquinas (--fila): leases e concluidos por CPF na pasta publica
+FILA_DIR = os.getenv("METAX_FILA_DIR", os.path.join(PUBLIC_BASE_DIR, "fila"))
+
+# Latencias observadas por etapa do portal (timeouts adaptativos do rpa_metax)
+TIMEOUTS_PORTAL_PATH = os.getenv("METAX_TIMEOUTS_PATH", os.path.join(CACHE_DIR, "timeouts_portal.json"))
+
+# Configuracao das obras para o launcher de particoes (launcher_obras.py)
+OBRAS_CONFIG_PATH = os.getenv("METAX_OBRAS_CONFIG", os.path.join(ROOT_DIR, "obras.json"))
+
+# Checkpoint do backfill historico (--backfill DE ATE)
+BACKFILL_CHECKPOINT_PATH = os.getenv(
+    "METAX_BACKFILL_CHECKPOINT_PATH", os.path.join(PUBLIC_JSON_DIR, "rm_backfill.json")
+)
+
 # Paths
 FOTOS_EM_PROCESSAMENTO_DIR = os.getenv(
     "FOTOS_EM_PROCESSAMENTO_DIR",
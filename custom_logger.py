@@ -1,6 +1,7 @@
 import inspect
 import json
 import os
+import threading
 import time
 from datetime import datetime
 from typing import Optional
@@ -49,6 +50,7 @@ class CustomLogger:
         self.public_buffer_max_lines = 50
         self.public_flush_seconds = 5
         self.last_public_flush_time = None
+        self._lock = threading.RLock()
         self._initialized = True
 
     def configure(
@@ -228,28 +230,30 @@ class CustomLogger:
 
     def _append_entry(self, entry: dict):
         line = json.dumps(entry, ensure_ascii=False) + "\n"
-        if not self.output_manager or not self.log_filename:
-            self.buffer.append(line)
-            return
-
-        try:
-            self.output_manager.append_text(KIND_LOGS, self.log_filename, line, write_public=False)
-            self.public_buffer.append(line)
-            if self._should_flush_public():
-                self._flush_public()
-        except Exception as e:
-            print(f"[ERRO ] Falha ao gravar log tecnico: {e}", flush=True)
+        with self._lock:
+            if not self.output_manager or not self.log_filename:
+                self.buffer.append(line)
+                return
+
+            try:
+                self.output_manager.append_text(KIND_LOGS, self.log_filename, line, write_public=False)
+                self.public_buffer.append(line)
+                if self._should_flush_public():
+                    self._flush_public()
+            except Exception as e:
+                print(f"[ERRO ] Falha ao gravar log tecnico: {e}", flush=True)
 
     def _flush_buffer(self):
-        if not self.output_manager or not self.log_filename:
-            return
-        content = "".join(self.buffer)
-        self.buffer = []
-        try:
-            self.output_manager.append_text(KIND_LOGS, self.log_filename, content, write_public=False)
-            self.output_manager.append_public_text_only(KIND_LOGS, self.log_filename, content)
-        except Exception as e:
-            print(f"[ERRO ] Falha ao descarregar buffer de logs: {e}", flush=True)
+        with self._lock:
+            if not self.output_manager or not self.log_filename:
+                return
+            content = "".join(self.buffer)
+            self.buffer = []
+            try:
+                self.output_manager.append_text(KIND_LOGS, self.log_filename, content, write_public=False)
+                self.output_manager.append_public_text_only(KIND_LOGS, self.log_filename, content)
+            except Exception as e:
+                print(f"[ERRO ] Falha ao descarregar buffer de logs: {e}", flush=True)
 
     def _should_flush_public(self) -> bool:
         if not self.public_buffer:
@@ -261,15 +265,16 @@ class CustomLogger:
         return (time.time() - self.last_public_flush_time) >= self.public_flush_seconds
 
     def _flush_public(self):
-        if not self.output_manager or not self.log_filename or not self.public_buffer:
-            return
-        content = "".join(self.public_buffer)
-        self.public_buffer = []
-        try:
-            self.output_manager.append_public_text_only(KIND_LOGS, self.log_filename, content)
-            self.last_public_flush_time = time.time()
-        except Exception as e:
-            print(f"[ERRO ] Falha ao publicar log tecnico: {e}", flush=True)
+        with self._lock:
+            if not self.output_manager or not self.log_filename or not self.public_buffer:
+                return
+            content = "".join(self.public_buffer)
+            self.public_buffer = []
+            try:
+                self.output_manager.append_public_text_only(KIND_LOGS, self.log_filename, content)
+                self.last_public_flush_time = time.time()
+            except Exception as e:
+                print(f"[ERRO ] Falha ao publicar log tecnico: {e}", flush=True)
 
     def flush(self):
         self._flush_public()
@@ -0,0 +1,112 @@
+import os
+import re
+import unicodedata
+
+
+# Fila manual (cadastrar_metax.txt): uma entrada por linha, misturando
+#   NOME COMPLETO          -> busca por nome (collation CI_AI)
+#   CPF:123.456.789-01     -> igualdade em PPESSOA.CPF (11 digitos, com ou sem pontuacao)
+#   CHAPA:00123            -> igualdade em PFUNC.CHAPA
+# Numeros sem prefixo: 11 digitos viram CPF, demais viram CHAPA.
+TIPOS_ENTRADA = ("NOME", "CPF", "CHAPA")
+
+_PREFIXO_RE = re.compile(r"^(CPF|CHAPA)\s*[:=]\s*(.+)$", re.I)
+_NUMERICO_RE = re.compile(r"^[\d.\-/\s]+$")
+
+
+def normalizar_nome(raw: str) -> str:
+    if not raw:
+        return ""
+    texto = raw.strip()
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join([c for c in texto if not unicodedata.combining(c)])
+    texto = " ".join(texto.split())
+    return texto.upper()
+
+
+def somente_digitos(valor) -> str:
+    return "".join(filter(str.isdigit, str(valor or "")))
+
+
+def interpretar_linha_txt(raw: str) -> tuple[str, str] | None:
+    """Retorna (tipo, valor) normalizado ou None para linha vazia/comentario/invalida."""
+    texto = (raw or "").strip()
+    if not texto or texto.startswith("#"):
+        return None
+    prefixo = _PREFIXO_RE.match(texto)
+    if prefixo:
+        tipo = prefixo.group(1).upper()
+        valor = prefixo.group(2).strip()
+        if tipo == "CPF":
+            cpf = somente_digitos(valor)
+            return ("CPF", cpf) if len(cpf) == 11 else None
+        return ("CHAPA", valor) if valor else None
+    if _NUMERICO_RE.match(texto):
+        digitos = somente_digitos(texto)
+        if not digitos:
+            return None
+        return ("CPF", digitos) if len(digitos) == 11 else ("CHAPA", texto.strip())
+    nome = normalizar_nome(texto)
+    return ("NOME", nome) if nome else None
+
+
+def carregar_entradas_txt(path: str) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Le a fila TXT e devolve (linhas_originais, entradas). entradas tem apenas os
+    tipos presentes ({"NOME": [...], "CPF": [...], "CHAPA": [...]}), sem repetidos
+    e na ordem do arquivo; sem nenhuma entrada valida o dict fica vazio.
+    """
+    if not os.path.exists(path):
+        return [], {}
+    with open(path, "r", encoding="utf-8") as f:
+        linhas = f.readlines()
+    entradas: dict[str, list[str]] = {}
+    vistos = set()
+    for linha in linhas:
+        chave = interpretar_linha_txt(linha)
+        if not chave or chave in vistos:
+            continue
+        vistos.add(chave)
+        entradas.setdefault(chave[0], []).append(chave[1])
+    return linhas, entradas
+
+
+def chaves_do_funcionario(funcionario: dict) -> set[tuple[str, str]]:
+    """Todas as chaves (NOME, CPF, CHAPA) pelas quais o funcionario pode estar na fila."""
+    chaves = set()
+    nome = normalizar_nome(str(funcionario.get("NOME") or ""))
+    if nome:
+        chaves.add(("NOME", nome))
+    cpf = somente_digitos(funcionario.get("CPF"))
+    if cpf:
+        chaves.add(("CPF", cpf))
+    chapa = str(funcionario.get("CHAPA") or "").strip()
+    if chapa:
+        chaves.add(("CHAPA", chapa))
+    return chaves
+
+
+def atualizar_fila_txt(path: str, chaves_processadas: set[tuple[str, str]]) -> int:
+    """Remove da fila as linhas cuja chave foi processada; apaga o arquivo se esvaziar."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        linhas = f.readlines()
+
+    novas_linhas = []
+    removidos = 0
+    for linha in linhas:
+        chave = interpretar_linha_txt(linha)
+        if chave and chave in chaves_processadas:
+            removidos += 1
+            continue
+        novas_linhas.append(linha)
+
+    restantes = [l for l in novas_linhas if l.strip() and not l.strip().startswith("#")]
+    if not restantes:
+        os.remove(path)
+        return removidos
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(novas_linhas)
+    return removidos
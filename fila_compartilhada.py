@@ -0,0 +1,222 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from outcomes import compute_totals
+from utils import gravar_json_atomico
+
+
+# Fila de trabalho compartilhada entre maquinas na pasta publica (--fila NOME). Todas
+# rodam a mesma janela SQL; cada CPF so e processado por quem cria o lease_<cpf>.json
+# (O_EXCL, atomico tambem no compartilhamento SMB). O dono renova o mtime do lease em
+# heartbeat; lease sem heartbeat por METAX_FILA_LEASE_S e considerado abandonado e pode
+# ser retomado por outra maquina. Ao concluir, o registro do manifest vai para
+# concluido_<cpf>.json e o lease e liberado; consolidar_fila junta todos num manifest unico.
+
+ARQUIVO_CONSOLIDADO = "manifest_consolidado.json"
+
+
+def _ler_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class FilaCompartilhada:
+    def __init__(self, diretorio: str, maquina: str, execution_id: str, lease_s: int | None = None):
+        self.diretorio = diretorio
+        self.maquina = maquina
+        self.execution_id = execution_id
+        self.lease_s = lease_s or int(os.getenv("METAX_FILA_LEASE_S", "300"))
+        self.dono = f"{maquina}:{execution_id}:{os.getpid()}"
+        self.contagem = {"reivindicados": 0, "outra_maquina": 0, "ja_concluidos": 0, "retomados_expirados": 0}
+        self._ativos: set[str] = set()
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._heartbeat = None
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _lease_path(self, cpf: str) -> str:
+        return os.path.join(self.diretorio, f"lease_{cpf}.json")
+
+    def _concluido_path(self, cpf: str) -> str:
+        return os.path.join(self.diretorio, f"concluido_{cpf}.json")
+
+    def _somar(self, chave: str):
+        with self._lock:
+            self.contagem[chave] += 1
+
+    def _criar_lease(self, cpf: str) -> bool:
+        try:
+            fd = os.open(self._lease_path(cpf), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {"dono": self.dono, "maquina": self.maquina, "execution_id": self.execution_id,
+                 "adquirido_em": datetime.now().isoformat()},
+                f,
+            )
+        return True
+
+    def _retomar_expirado(self, cpf: str, agora: float | None = None) -> bool:
+        """
+        Renomeia o lease vencido para um nome unico e confere que o arquivo movido e o
+        mesmo que foi julgado vencido: se outra maquina retomou antes e ja criou lease novo
+        no mesmo nome, o rename pegou o lease dela, que e devolvido. So uma maquina ganha.
+        """
+        path = self._lease_path(cpf)
+        try:
+            mtime = os.path.getmtime(path)
+            if (agora or time.time()) - mtime <= self.lease_s:
+                return False
+            visto = _ler_json(path)
+            descartado = f"{path}.expirado_{uuid.uuid4().hex}"
+            os.rename(path, descartado)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        try:
+            mesmo = os.path.getmtime(descartado) == mtime and _ler_json(descartado) == visto
+        except OSError:
+            mesmo = False
+        if not mesmo:
+            try:
+                os.rename(descartado, path)
+            except OSError:
+                pass
+            return False
+        try:
+            os.remove(descartado)
+        except OSError:
+            pass
+        return True
+
+    def reivindicar(self, cpf: str, agora: float | None = None) -> bool:
+        """True se esta execucao ficou com o CPF; False se ja concluido ou com outra maquina."""
+        if os.path.exists(self._concluido_path(cpf)):
+            self._somar("ja_concluidos")
+            return False
+        retomado = False
+        if not self._criar_lease(cpf):
+            if not (self._retomar_expirado(cpf, agora) and self._criar_lease(cpf)):
+                self._somar("outra_maquina")
+                return False
+            retomado = True
+        # Outra maquina pode ter concluido e liberado entre a checagem e o O_EXCL.
+        if os.path.exists(self._concluido_path(cpf)):
+            self._remover_lease(cpf)
+            self._somar("ja_concluidos")
+            return False
+        with self._lock:
+            self._ativos.add(cpf)
+        self._somar("retomados_expirados" if retomado else "reivindicados")
+        return True
+
+    def _remover_lease(self, cpf: str):
+        path = self._lease_path(cpf)
+        dados = _ler_json(path)
+        if dados is not None and dados.get("dono") != self.dono:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def liberar(self, cpf: str):
+        """Devolve o CPF para a fila sem concluir (outra maquina ou a proxima execucao pega)."""
+        with self._lock:
+            self._ativos.discard(cpf)
+        self._remover_lease(cpf)
+
+    def concluir(self, cpf: str, registro: dict):
+        gravar_json_atomico(
+            self._concluido_path(cpf),
+            {
+                "maquina": self.maquina,
+                "execution_id": self.execution_id,
+                "concluido_em": datetime.now().isoformat(),
+                "registro": registro,
+            },
+            indent=2,
+            default=str,
+        )
+        self.liberar(cpf)
+
+    def renovar(self):
+        with self._lock:
+            ativos = list(self._ativos)
+        for cpf in ativos:
+            try:
+                os.utime(self._lease_path(cpf))
+            except OSError:
+                pass
+
+    def iniciar_heartbeat(self):
+        def _loop():
+            while not self._parar.wait(max(1.0, self.lease_s / 3)):
+                self.renovar()
+
+        self._heartbeat = threading.Thread(target=_loop, name="fila-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def fechar(self):
+        self._parar.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+        with self._lock:
+            ativos = list(self._ativos)
+        for cpf in ativos:
+            self.liberar(cpf)
+
+
+def consolidar_fila(diretorio: str, agora: float | None = None, lease_s: int | None = None) -> dict:
+    """Manifest unico da fila: registros concluidos de todas as maquinas e leases ainda ativos."""
+    lease_s = lease_s or int(os.getenv("METAX_FILA_LEASE_S", "300"))
+    agora = agora or time.time()
+    people = []
+    maquinas: dict[str, int] = {}
+    for path in sorted(glob.glob(os.path.join(diretorio, "concluido_*.json"))):
+        dados = _ler_json(path)
+        if not dados or not isinstance(dados.get("registro"), dict):
+            continue
+        registro = dict(dados["registro"])
+        registro["fila_maquina"] = dados.get("maquina")
+        people.append(registro)
+        maquinas[dados.get("maquina") or "?"] = maquinas.get(dados.get("maquina") or "?", 0) + 1
+    em_andamento = []
+    for path in sorted(glob.glob(os.path.join(diretorio, "lease_*.json"))):
+        try:
+            idade = agora - os.path.getmtime(path)
+        except OSError:
+            continue
+        dados = _ler_json(path) or {}
+        em_andamento.append(
+            {
+                "cpf": os.path.basename(path)[len("lease_"):-len(".json")],
+                "maquina": dados.get("maquina"),
+                "execution_id": dados.get("execution_id"),
+                "heartbeat_ha_s": int(idade),
+                "expirado": idade > lease_s,
+            }
+        )
+    return {
+        "atualizado_em": datetime.now().isoformat(),
+        "people": people,
+        "totals": compute_totals(people),
+        "maquinas": maquinas,
+        "em_andamento": em_andamento,
+    }
+
+
+def gravar_consolidado(diretorio: str, consolidado: dict) -> str:
+    path = os.path.join(diretorio, ARQUIVO_CONSOLIDADO)
+    gravar_json_atomico(path, consolidado, indent=2, default=str)
+    return path
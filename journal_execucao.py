@@ -0,0 +1,92 @@
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+# Journal append-only por execucao: uma linha JSON por pessoa concluida (fsync a cada
+# linha) e o resultado da varredura de rascunhos por contrato. Se o processo morrer no
+# meio do grupo, --resume <execution_id> reconstroi o manifest a partir daqui e segue
+# apenas com quem falta. Processos por contrato (--contratos-paralelos) gravam em
+# arquivo proprio com sufixo do contrato; a leitura junta todos da execucao.
+
+
+def caminho_journal(diretorio: str, execution_id: str, sufixo: str | None = None) -> str:
+    nome = f"journal_{execution_id}__{sufixo}.jsonl" if sufixo else f"journal_{execution_id}.jsonl"
+    return os.path.join(diretorio, nome)
+
+
+class JournalExecucao:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._arquivo = open(path, "a", encoding="utf-8")
+
+    def _gravar(self, entrada: dict):
+        linha = json.dumps(entrada, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._arquivo.write(linha)
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+
+    def registrar_pessoa(self, registro: dict):
+        self._gravar({"tipo": "pessoa", "gravado_em": datetime.now().isoformat(), "registro": registro})
+
+    def registrar_rascunhos(self, contrato_chave: str, cpfs: set[str]):
+        self._gravar(
+            {
+                "tipo": "rascunhos",
+                "gravado_em": datetime.now().isoformat(),
+                "contrato_chave": contrato_chave,
+                "cpfs": sorted(cpfs),
+            }
+        )
+
+    def fechar(self):
+        with self._lock:
+            if not self._arquivo.closed:
+                self._arquivo.close()
+
+
+def ler_journal(diretorio: str, execution_id: str) -> dict:
+    """
+    Junta os journals da execucao: {"people": [...], "rascunhos": {contrato: set(cpfs)}}.
+    A ultima linha de cada arquivo pode estar truncada (queda durante a escrita) e e ignorada;
+    se a mesma pessoa aparecer mais de uma vez vale a ultima.
+    """
+    pessoas: dict[str, dict] = {}
+    rascunhos: dict[str, set[str]] = {}
+    padrao = os.path.join(diretorio, f"journal_{glob.escape(execution_id)}*.jsonl")
+    for path in sorted(glob.glob(padrao)):
+        with open(path, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                if entrada.get("tipo") == "pessoa":
+                    registro = entrada.get("registro") or {}
+                    chave = registro.get("cpf") or registro.get("nome")
+                    if chave:
+                        pessoas[chave] = registro
+                elif entrada.get("tipo") == "rascunhos" and entrada.get("contrato_chave"):
+                    rascunhos.setdefault(entrada["contrato_chave"], set()).update(entrada.get("cpfs") or [])
+    return {"people": list(pessoas.values()), "rascunhos": rascunhos}
+
+
+def limpar_journals_antigos(diretorio: str, dias: int, agora: float | None = None) -> int:
+    if not os.path.isdir(diretorio):
+        return 0
+    limite = (agora or time.time()) - dias * 86400
+    removidos = 0
+    for path in glob.glob(os.path.join(diretorio, "journal_*.jsonl")):
+        try:
+            if os.path.getmtime(path) < limite:
+                os.remove(path)
+                removidos += 1
+        except OSError:
+            continue
+    return removidos
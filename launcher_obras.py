@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from config import OBRAS_CONFIG_PATH, PUBLIC_BASE_DIR, PUBLIC_JSON_DIR, PUBLIC_LOGS_DIR, ROOT_DIR
+from outcomes import compute_totals
+from runner import RunnerLogger
+from utils import gravar_json_atomico
+
+
+# Execucao particionada por obra: cada obra roda o main.py em um processo proprio,
+# com METAX_OBRA, contratos, pasta SharePoint e diretorios publicos da obra via
+# ambiente (o config.py le tudo no import). Ao final, os resultados de cada
+# particao (METAX_RESULTADO_PATH) sao mesclados em um resumo unico.
+
+# Diretorios publicos relativos a base da obra (mesmos defaults do config.py).
+_DIRS_PUBLICOS_OBRA = {
+    "PUBLIC_INPUTS_DIR": ("entrada",),
+    "PUBLIC_PROCESSADOS_DIR": ("fotos", "processados"),
+    "PUBLIC_ERROS_DIR": ("fotos", "erros"),
+    "PUBLIC_LOGS_DIR": ("logs",),
+    "PUBLIC_RELATORIOS_DIR": ("relatorios",),
+    "PUBLIC_JSON_DIR": ("json",),
+    "PUBLIC_SCREENSHOTS_DIR": ("screenshots",),
+    "FOTOS_EM_PROCESSAMENTO_DIR": ("fotos", "em_processamento"),
+    "FOTOS_PROCESSADOS_DIR": ("fotos", "processados"),
+    "FOTOS_ERROS_DIR": ("fotos", "erros"),
+    "PASTA_FOTOS": ("fotos", "em_processamento"),
+    "METAX_FILA_DIR": ("fila",),
+}
+
+# Arquivos por obra (lista de exclusao, watermark e checkpoint do backfill).
+_ARQUIVOS_OBRA = {
+    "NOMES_EXCLUIDOS_PATH": ("entrada", "nomes_excluidos.txt"),
+    "METAX_WATERMARK_PATH": ("json", "rm_watermark.json"),
+    "METAX_BACKFILL_CHECKPOINT_PATH": ("json", "rm_backfill.json"),
+}
+
+
+def carregar_obras(path: str) -> list[dict]:
+    """
+    Le obras.json ({"obras": [{"numero": 125, "nome": "ARAUCO", "sharepoint_base_folder": ...}]})
+    e valida os campos obrigatorios.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    obras = dados.get("obras") if isinstance(dados, dict) else dados
+    if not isinstance(obras, list) or not obras:
+        raise ValueError(f"Nenhuma obra configurada em {path}")
+    numeros = set()
+    for obra in obras:
+        if not isinstance(obra, dict) or not obra.get("nome"):
+            raise ValueError(f"Obra sem nome em {path}: {obra}")
+        try:
+            obra["numero"] = int(obra.get("numero"))
+        except (TypeError, ValueError):
+            raise ValueError(f"Obra com numero invalido em {path}: {obra}")
+        if obra["numero"] in numeros:
+            raise ValueError(f"Obra repetida em {path}: {obra['numero']}")
+        if not str(obra.get("sharepoint_base_folder") or "").strip():
+            # Sem a pasta propria, a obra herdaria a pasta SharePoint do .env (obra 125).
+            raise ValueError(f"Obra sem sharepoint_base_folder em {path}: {obra['numero']}")
+        numeros.add(obra["numero"])
+    return obras
+
+
+def base_publica_obra(obra: dict, public_base_padrao: str) -> str:
+    return obra.get("public_base_dir") or os.path.join(public_base_padrao, "obras", str(obra["numero"]))
+
+
+def montar_env_obra(obra: dict, base_env: dict, public_base_padrao: str, resultado_path: str) -> dict:
+    """
+    Ambiente do processo da obra. Diretorios e arquivos por obra sao sempre definidos
+    explicitamente sob a base da obra: load_dotenv nao sobrescreve variaveis ja
+    presentes, entao o .env compartilhado nao vaza caminhos de outra obra (remover a
+    variavel nao basta, o .env a traria de volta).
+    """
+    env = dict(base_env)
+    base = base_publica_obra(obra, public_base_padrao)
+    env["METAX_OBRA"] = str(obra["numero"])
+    env["PUBLIC_BASE_DIR"] = base
+    for nome, partes in {**_DIRS_PUBLICOS_OBRA, **_ARQUIVOS_OBRA}.items():
+        env[nome] = os.path.join(base, *partes)
+    env["SHAREPOINT_BASE_FOLDER"] = obra["sharepoint_base_folder"]
+    for chave, contrato in (obra.get("contratos") or {}).items():
+        chave = str(chave).upper()
+        env[f"METAX_CONTRATO_{chave}_VALUE"] = str(contrato.get("value") or "")
+        env[f"METAX_CONTRATO_{chave}_LABEL"] = str(contrato.get("label") or "")
+    env["METAX_RESULTADO_PATH"] = resultado_path
+    env.setdefault("PYTHONUNBUFFERED", "1")
+    env.setdefault("PYTHONIOENCODING", "utf-8")
+    return env
+
+
+def mesclar_resumos(resultados: list[dict]) -> dict:
+    """Soma os totais das particoes; o status geral so e CONSISTENT se todas forem."""
+    totals = compute_totals([])
+    for resultado in resultados:
+        parcial = resultado.get("totals") or {}
+        for chave, valor in parcial.items():
+            if chave == "by_outcome":
+                for outcome, qtd in (valor or {}).items():
+                    totals["by_outcome"][outcome] = totals["by_outcome"].get(outcome, 0) + int(qtd or 0)
+            elif isinstance(valor, int):
+                totals[chave] = totals.get(chave, 0) + valor
+    status = "CONSISTENT"
+    if not resultados or any(r.get("run_status") != "CONSISTENT" for r in resultados):
+        status = "INCONSISTENT"
+    return {
+        "run_status": status,
+        "totals": totals,
+        "obras": resultados,
+    }
+
+
+def _ler_resultado(path: str) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Executa o MetaXg para varias obras em paralelo (argumentos desconhecidos vao para o main.py)"
+    )
+    parser.add_argument("--config", default=OBRAS_CONFIG_PATH, help="Caminho do obras.json")
+    parser.add_argument("--obras", default="", help="Numeros das obras separados por virgula (padrao: todas)")
+    parser.add_argument("--max-paralelo", type=int, default=int(os.getenv("METAX_OBRAS_PARALELO", "2")),
+                        help="Quantidade maxima de obras executando ao mesmo tempo")
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None) -> int:
+    args, args_main = _parse_args(argv)
+    started_at = datetime.now()
+    stamp = started_at.strftime("%Y%m%d_%H%M%S")
+    log = RunnerLogger(os.path.join(PUBLIC_LOGS_DIR, f"launcher_obras_{stamp}.log"))
+
+    try:
+        obras = carregar_obras(args.config)
+    except (OSError, ValueError) as e:
+        log.error(f"Falha ao carregar obras: {e}")
+        return 1
+    if args.obras.strip():
+        filtro = {int(n) for n in args.obras.split(",") if n.strip()}
+        obras = [o for o in obras if o["numero"] in filtro]
+    if not obras:
+        log.error("Nenhuma obra selecionada.")
+        return 1
+
+    max_paralelo = max(1, args.max_paralelo)
+    log.info(f"Obras: {[o['numero'] for o in obras]} | paralelo={max_paralelo} | args main={args_main}")
+
+    fila = list(obras)
+    ativos = {}
+    particoes = []
+    while fila or ativos:
+        while fila and len(ativos) < max_paralelo:
+            obra = fila.pop(0)
+            base = base_publica_obra(obra, PUBLIC_BASE_DIR)
+            resultado_path = os.path.join(base, "json", f"resultado_particao_{stamp}.json")
+            log_path = os.path.join(base, "logs", f"launcher_{stamp}.log")
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            if os.path.exists(resultado_path):
+                os.remove(resultado_path)
+            env = montar_env_obra(obra, os.environ, PUBLIC_BASE_DIR, resultado_path)
+            log_file = open(log_path, "a", encoding="utf-8")
+            proc = subprocess.Popen(
+                [sys.executable, "-u", os.path.join(ROOT_DIR, "main.py"), *args_main],
+                cwd=ROOT_DIR,
+                env=env,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+            ativos[proc.pid] = (proc, obra, resultado_path, log_path, log_file, time.perf_counter())
+            log.info(f"Obra {obra['numero']} ({obra['nome']}) iniciada | pid={proc.pid} | log={log_path}")
+
+        for pid, (proc, obra, resultado_path, log_path, log_file, inicio) in list(ativos.items()):
+            if proc.poll() is None:
+                continue
+            log_file.close()
+            del ativos[pid]
+            resultado = _ler_resultado(resultado_path) or {"run_status": "FAILED", "totals": None}
+            resultado.update(
+                {
+                    "obra": obra["numero"],
+                    "nome": obra["nome"],
+                    "exit_code": proc.returncode,
+                    "log_path": log_path,
+                    "duracao_sec": int(time.perf_counter() - inicio),
+                }
+            )
+            particoes.append(resultado)
+            nivel = log.info if proc.returncode == 0 else log.error
+            nivel(f"Obra {obra['numero']} finalizada | exit={proc.returncode} | status={resultado.get('run_status')}")
+        if ativos:
+            time.sleep(1)
+
+    particoes.sort(key=lambda r: r["obra"])
+    resumo = mesclar_resumos(particoes)
+    resumo.update(
+        {
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "duration_sec": int((datetime.now() - started_at).total_seconds()),
+            "args_main": args_main,
+        }
+    )
+    resumo_path = os.path.join(PUBLIC_JSON_DIR, f"resumo_obras_{stamp}.json")
+    gravar_json_atomico(resumo_path, resumo, indent=2, default=str)
+    log.info(f"Resumo mesclado: {resumo_path} | status={resumo['run_status']} | totals={resumo['totals']}")
+    return 0 if all(p.get("exit_code") == 0 for p in particoes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
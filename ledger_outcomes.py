@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+
+from watermark import OUTCOMES_CONCLUIDOS
+
+
+# Ledger entre execucoes: ultimo outcome por CPF e hash da linha RM. Quem ja esta
+# concluido com os mesmos dados e filtrado antes de abrir sessao no portal.
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS outcome_ledger (
+        cpf TEXT PRIMARY KEY,
+        outcome TEXT NOT NULL,
+        rm_hash TEXT NOT NULL,
+        nome TEXT,
+        contrato_chave TEXT,
+        execution_id TEXT,
+        atualizado_em TEXT NOT NULL
+    )
+"""
+
+# Colunas presentes ja na fase de chaves da query RM (ver rm_query._SQL_CHAVES_TEMPLATE),
+# para o hash ser o mesmo no filtro (antes do detalhe) e no registro (depois).
+COLUNAS_HASH_RM = ("NOME", "CPF", "CHAPA", "DATAADMISSAO", "CODCOLIGADA", "CODSECAO")
+
+# SQLite limita a quantidade de parametros por comando.
+_LOTE_CONSULTA = 500
+
+
+def _somente_digitos(valor) -> str:
+    return "".join(filter(str.isdigit, str(valor or "")))
+
+
+def _normalizar_valor(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor).strip()
+
+
+def hash_registro_rm(funcionario: dict) -> str:
+    """Hash estavel das colunas-chave da linha RM (aceita dict cru ou dados_funcionario do manifest)."""
+    partes = []
+    for coluna in COLUNAS_HASH_RM:
+        valor = funcionario.get(coluna)
+        partes.append(_somente_digitos(valor) if coluna == "CPF" else _normalizar_valor(valor))
+    return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+def _conectar(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(SQL_CRIAR_TABELA)
+    return conn
+
+
+def consultar_ledger(path: str, cpfs: list[str]) -> dict[str, dict]:
+    """Entradas do ledger para os CPFs informados: {cpf: {outcome, rm_hash, atualizado_em, ...}}."""
+    cpfs = sorted({_somente_digitos(c) for c in cpfs if _somente_digitos(c)})
+    if not cpfs or not os.path.exists(path):
+        return {}
+    conn = _conectar(path)
+    try:
+        entradas = {}
+        for i in range(0, len(cpfs), _LOTE_CONSULTA):
+            lote = cpfs[i:i + _LOTE_CONSULTA]
+            placeholders = ", ".join(["?"] * len(lote))
+            rows = conn.execute(
+                "SELECT cpf, outcome, rm_hash, nome, contrato_chave, execution_id, atualizado_em "
+                f"FROM outcome_ledger WHERE cpf IN ({placeholders})",
+                lote,
+            ).fetchall()
+            for cpf, outcome, rm_hash, nome, contrato_chave, execution_id, atualizado_em in rows:
+                entradas[cpf] = {
+                    "outcome": outcome,
+                    "rm_hash": rm_hash,
+                    "nome": nome,
+                    "contrato_chave": contrato_chave,
+                    "execution_id": execution_id,
+                    "atualizado_em": atualizado_em,
+                }
+        return entradas
+    finally:
+        conn.close()
+
+
+def separar_ja_concluidos(path: str, funcionarios: list[dict]) -> tuple[list[dict], list[tuple[dict, dict]]]:
+    """
+    Divide em (pendentes, ja_concluidos). ja_concluidos traz (funcionario, entrada_ledger)
+    de quem tem outcome concluido e a mesma linha RM (hash) da ultima execucao.
+    """
+    entradas = consultar_ledger(path, [f.get("CPF") for f in funcionarios])
+    pendentes = []
+    ja_concluidos = []
+    for func in funcionarios:
+        entrada = entradas.get(_somente_digitos(func.get("CPF")))
+        if (
+            entrada
+            and entrada["outcome"] in OUTCOMES_CONCLUIDOS
+            and entrada["rm_hash"] == hash_registro_rm(func)
+        ):
+            ja_concluidos.append((func, entrada))
+        else:
+            pendentes.append(func)
+    return pendentes, ja_concluidos
+
+
+def atualizar_ledger(path: str, people: list[dict], execution_id: str, agora: datetime | None = None) -> int:
+    """Grava o outcome de cada pessoa do manifest (as vindas do proprio ledger e as adiadas sao ignoradas)."""
+    agora = agora or datetime.now()
+    linhas = []
+    for person in people or []:
+        cpf = _somente_digitos(person.get("cpf"))
+        if not cpf or not person.get("outcome") or person.get("ledger_skip") or person.get("adiado_orcamento"):
+            continue
+        dados = person.get("dados_funcionario") or {}
+        linhas.append(
+            (
+                cpf,
+                person["outcome"],
+                hash_registro_rm(dados),
+                person.get("nome"),
+                person.get("contrato_chave"),
+                execution_id,
+                agora.isoformat(),
+            )
+        )
+    if not linhas:
+        return 0
+    conn = _conectar(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO outcome_ledger "
+                "(cpf, outcome, rm_hash, nome, contrato_chave, execution_id, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                linhas,
+            )
+    finally:
+        conn.close()
+    return len(linhas)
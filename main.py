@@ -1,11 +1,18 @@
 import argparse
+import json
+import multiprocessing
 import os
 import re
 import shutil
+import socket
+import threading
 import time
-import unicodedata
 import uuid
-from datetime import datetime
+from contextlib import contextmanager
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Iterator
 
 import pyodbc
 from custom_logger import logger
@@ -21,15 +28,75 @@ from outcomes import (
     OUTCOME_SKIPPED_EMAIL_DISABLED,
     compute_totals,
 )
-from rpa_metax import iniciar_sessao, cadastrar_funcionario, obter_todos_rascunhos, verificar_cadastro
+from rpa_metax import (
+    CEPS_CONSULTADOS,
+    abrir_sessao_com_estado,
+    cadastrar_funcionario,
+    exportar_estado_sessao,
+    gravar_timeouts_adaptativos,
+    iniciar_sessao,
+    obter_todos_rascunhos,
+    verificar_cadastro,
+)
 from sharepoint import baixar_foto_funcionario
+from pipeline import Estagio, executar_pipeline
+from utils import reduzir_foto_para_metax
+from rm_query import (
+    SQL_CHAVES_POR_DATA,
+    SQL_FUNCIONARIOS_DETALHE,
+    SQL_FUNCIONARIOS_POR_DATA,
+    SQL_INSERIR_CHAVE_DETALHE,
+    SQL_INSERIR_NOME_EXCLUIDO,
+    SQL_PREPARAR_CHAVES_DETALHE,
+    SQL_PREPARAR_NOMES_EXCLUIDOS,
+    calcular_janela_admissao,
+    carregar_nomes_excluidos,
+    chave_funcionario,
+    dividir_em_chunks,
+    mesclar_detalhes,
+    montar_sql_funcionarios_por_chave,
+    montar_sql_funcionarios_por_nomes,
+)
+from entrada_txt import (
+    atualizar_fila_txt,
+    carregar_entradas_txt,
+    chaves_do_funcionario,
+)
+from conexao_sql import PoolConexoes, gravar_driver_cache, ler_driver_cache, ordenar_drivers
+from rm_snapshot_cache import gravar_snapshot, invalidar_snapshots, ler_snapshot, montar_chave_snapshot
+from sql_telemetria import TelemetriaSQL
+from backfill import (
+    checkpoint_compativel,
+    dividir_periodo,
+    gravar_checkpoint,
+    janelas_pendentes,
+    ler_checkpoint,
+    novo_checkpoint,
+    orcamento_esgotado,
+    parse_data_backfill,
+    registrar_janela_se_completa,
+)
+from ledger_outcomes import atualizar_ledger, consultar_ledger, separar_ja_concluidos
+from agendador import consultar_ceps, gravar_ceps, ordenar_por_custo
+from preflight import validar_lote
+from fila_compartilhada import FilaCompartilhada, consolidar_fila, gravar_consolidado
+from journal_execucao import JournalExecucao, caminho_journal, ler_journal, limpar_journals_antigos
+from watermark import OUTCOMES_CONCLUIDOS, calcular_novo_watermark, data_inicio_incremental, gravar_watermark, ler_watermark
+from rm_referencias import (
+    SQL_INSERIR_SECAO_OBRA,
+    SQL_PREPARAR_SECOES_OBRA,
+    enriquecer_funcionario,
+    obter_referencias,
+    secoes_da_obra,
+)
 
 from config import (
-    DB_DRIVER, DB_SERVER, DB_NAME, DB_USER, DB_PASSWORD, DIAS_RETROATIVOS,
-    ROOT_DIR, PUBLIC_BASE_DIR, PUBLIC_INPUTS_DIR, OBJECT_NAME,
+    DB_DRIVER, DB_SERVER, DB_NAME, DB_USER, DB_PASSWORD, DIAS_RETROATIVOS, NOMES_EXCLUIDOS_PATH,
+    ROOT_DIR, CACHE_DIR, PUBLIC_BASE_DIR, PUBLIC_INPUTS_DIR, OBJECT_NAME,
     PUBLIC_CODE_DIR, PUBLIC_PROCESSADOS_DIR, PUBLIC_ERROS_DIR,
     PUBLIC_LOGS_DIR, PUBLIC_RELATORIOS_DIR, PUBLIC_JSON_DIR, PUBLIC_RELEASES_DIR, PUBLIC_SCREENSHOTS_DIR,
-    FOTOS_EM_PROCESSAMENTO_DIR, FOTOS_PROCESSADOS_DIR, FOTOS_ERROS_DIR, FOTOS_BUSCA_DIRS,
+    FOTOS_EM_PROCESSAMENTO_DIR, FOTOS_PROCESSADOS_DIR, FOTOS_ERROS_DIR, FOTOS_BUSCA_DIRS, WATERMARK_PATH,
+    BACKFILL_CHECKPOINT_PATH, LEDGER_PATH, RM_SNAPSHOT_PATH, NUMERO_OBRA, SESSAO_PORTAL_DIR, JOURNAL_DIR, CEP_CACHE_PATH, FILA_DIR,
     METAX_CONTRATO_MECANICA_VALUE, METAX_CONTRATO_MECANICA_LABEL,
     METAX_CONTRATO_ELETROMECANICA_VALUE, METAX_CONTRATO_ELETROMECANICA_LABEL
 )
@@ -51,36 +118,38 @@ def _read_robot_version() -> str:
 def obter_conexao() -> pyodbc.Connection:
     """Estabelece conexao com o banco de dados SQL Server."""
     connect_timeout = os.getenv("METAX_SQL_CONNECT_TIMEOUT", "15")
-    drivers_alternativos = [
-        DB_DRIVER,
-        "ODBC Driver 17 for SQL Server",
-        "ODBC Driver 18 for SQL Server",
-        "ODBC Driver 13 for SQL Server",
-        "SQL Server",
-        "SQL Server Native Client 11.0",
-    ]
+    driver_cache_path = os.path.join(CACHE_DIR, "odbc_driver.json")
+    driver_cache = ler_driver_cache(driver_cache_path, DB_SERVER)
 
     drivers_disponiveis = [d for d in pyodbc.drivers()]
+    drivers_alternativos = ordenar_drivers(DB_DRIVER, driver_cache, drivers_disponiveis)
 
     ultimo_erro = None
     for driver in drivers_alternativos:
-        if driver in drivers_disponiveis:
-            try:
-                logger.info(f"Tentando conectar com driver: {driver}", details={"driver": driver})
-                conexao = pyodbc.connect(
-                    f"DRIVER={{{driver}}};"
-                    f"SERVER={DB_SERVER};"
-                    f"DATABASE={DB_NAME};"
-                    f"UID={DB_USER};"
-                    f"PWD={DB_PASSWORD};"
-                    f"Connection Timeout={connect_timeout}"
-                )
-                logger.info(f"Conexao estabelecida com sucesso usando driver: {driver}", details={"driver": driver})
-                return conexao
-            except Exception as e:
-                ultimo_erro = e
-                logger.warn(f"Falha ao conectar com driver {driver}: {e}", details={"driver": driver, "erro": str(e)})
-                continue
+        try:
+            logger.info(
+                f"Tentando conectar com driver: {driver}",
+                details={"driver": driver, "driver_cache": driver == driver_cache},
+            )
+            conexao = pyodbc.connect(
+                f"DRIVER={{{driver}}};"
+                f"SERVER={DB_SERVER};"
+                f"DATABASE={DB_NAME};"
+                f"UID={DB_USER};"
+                f"PWD={DB_PASSWORD};"
+                f"Connection Timeout={connect_timeout}"
+            )
+            logger.info(f"Conexao estabelecida com sucesso usando driver: {driver}", details={"driver": driver})
+            if driver != driver_cache:
+                try:
+                    gravar_driver_cache(driver_cache_path, DB_SERVER, DB_NAME, driver)
+                except Exception as e:
+                    logger.warn("Falha ao gravar cache de driver ODBC", details={"error": str(e)})
+            return conexao
+        except Exception as e:
+            ultimo_erro = e
+            logger.warn(f"Falha ao conectar com driver {driver}: {e}", details={"driver": driver, "erro": str(e)})
+            continue
 
     if ultimo_erro:
         raise ConnectionError(f"Nao foi possivel conectar ao banco de dados. Ultimo erro: {ultimo_erro}")
@@ -92,28 +161,80 @@ def obter_conexao() -> pyodbc.Connection:
     )
 
 
-def buscar_funcionarios_para_cadastro(data_admissao: str = None, filtro_nomes: list[str] = None) -> list[dict]:
+# Conexoes reaproveitadas entre as queries de uma execucao (fechadas no fim do main).
+POOL_SQL = PoolConexoes(obter_conexao, tamanho_max=int(os.getenv("METAX_SQL_POOL_SIZE", "4")))
+
+
+def iterar_funcionarios_para_cadastro(
+    data_admissao: str = None,
+    filtro_nomes: list[str] = None,
+    batch_size: int | None = None,
+    data_inicio_minima=None,
+    usar_cache: bool = True,
+    telemetria: TelemetriaSQL | None = None,
+    somente_chaves: bool = False,
+    filtro_cpfs: list[str] = None,
+    filtro_chapas: list[str] = None,
+    janela: tuple[date, date] | None = None,
+) -> Iterator[list[dict]]:
     """
-    Busca funcionarios.
-    - Se filtro_nomes for fornecido, busca APENAS esses nomes (ignora data).
+    Busca funcionarios em modo streaming, entregando lotes via fetchmany.
+    - Se filtro_nomes/filtro_cpfs/filtro_chapas forem fornecidos, busca APENAS essas
+      chaves (ignora data); CPF e CHAPA usam igualdade direta nas colunas indexadas.
     - Se nao, busca por data de admissao (e dias retroativos).
+    - Cada item gerado e uma lista de ate batch_size dicts (METAX_SQL_FETCH_BATCH).
+    - data_inicio_minima (watermark) encurta o inicio da janela por data.
+    - Com usar_cache, reaproveita o snapshot local enquanto estiver no TTL (METAX_RM_SNAPSHOT_TTL_MIN).
+    - telemetria recebe os tempos (ms) por fase: connect, referencias, setup, execute, fetch, to_dict.
+    - janela (inicio, fim) substitui DIAS_RETROATIVOS e o watermark (backfill).
+    - somente_chaves traz apenas NOME, CPF, CHAPA, admissao e secao (fase 1); o restante
+      vem de buscar_detalhes_funcionarios para quem sera cadastrado.
     """
-    if not data_admissao:
-        data_admissao = datetime.now().strftime("%Y-%m-%d")
-
-    datas_vars = f"""
-        DECLARE @DataFim DATE = '{data_admissao}';
-        DECLARE @DataInicio DATE = DATEADD(DAY, -{DIAS_RETROATIVOS}, @DataFim);
-    """
+    telemetria = telemetria or TelemetriaSQL()
+    if batch_size is None:
+        batch_size = int(os.getenv("METAX_SQL_FETCH_BATCH", "200"))
+    batch_size = max(1, int(batch_size))
+
+    if janela:
+        data_inicio, data_fim = janela
+        data_inicio_minima = None
+    else:
+        data_inicio, data_fim = calcular_janela_admissao(data_admissao, DIAS_RETROATIVOS)
+    data_admissao = data_fim.strftime("%Y-%m-%d")
 
-    params = []
-    if filtro_nomes and len(filtro_nomes) > 0:
-        logger.info(f"MODO FILTRO ATIVADO: Buscando {len(filtro_nomes)} funcionario(s) especifico(s).")
-        placeholders = ", ".join(["?"] * len(filtro_nomes))
-        where_clause = f"UPPER(P.NOME) IN ({placeholders})"
-        params = [nome.strip().upper() for nome in filtro_nomes]
+    filtros_txt = {
+        "NOME": [nome.strip().upper() for nome in filtro_nomes or [] if nome and nome.strip()],
+        "CPF": [cpf for cpf in ("".join(filter(str.isdigit, str(c))) for c in filtro_cpfs or []) if cpf],
+        "CHAPA": [str(chapa).strip() for chapa in filtro_chapas or [] if str(chapa).strip()],
+    }
+    filtros_txt = {campo: valores for campo, valores in filtros_txt.items() if valores}
+    consultas: list[tuple[str, list]] = []
+    if filtros_txt:
+        total_filtro = sum(len(valores) for valores in filtros_txt.values())
+        logger.info(
+            f"MODO FILTRO ATIVADO: Buscando {total_filtro} funcionario(s) especifico(s).",
+            details={campo.lower(): len(valores) for campo, valores in filtros_txt.items()},
+        )
+        chunk_max = int(os.getenv("METAX_SQL_NOMES_CHUNK", "200"))
+        for campo, valores in filtros_txt.items():
+            tamanho = max(1, min(chunk_max, len(valores)))
+            if campo == "NOME":
+                sql_campo = montar_sql_funcionarios_por_nomes(
+                    tamanho,
+                    collation=os.getenv("METAX_SQL_NOME_COLLATION", "Latin1_General_CI_AI"),
+                    somente_chaves=somente_chaves,
+                )
+            else:
+                sql_campo = montar_sql_funcionarios_por_chave(campo, tamanho, somente_chaves=somente_chaves)
+            consultas.extend((sql_campo, chunk) for chunk in dividir_em_chunks(valores, tamanho))
+        sql, params = consultas[0]
     else:
-        if DIAS_RETROATIVOS > 0:
+        if janela:
+            logger.info(
+                f"Buscando funcionarios com admissao entre {data_inicio.isoformat()} e {data_admissao} (backfill).",
+                details={"data_inicio": data_inicio.isoformat(), "data_fim": data_admissao},
+            )
+        elif DIAS_RETROATIVOS > 0:
             logger.info(
                 f"Buscando funcionarios com admissao entre {data_admissao} e {DIAS_RETROATIVOS} dia(s) antes.",
                 details={"data_ref": data_admissao, "retroativos": DIAS_RETROATIVOS},
@@ -123,166 +244,51 @@ def buscar_funcionarios_para_cadastro(data_admissao: str = None, filtro_nomes: l
                 f"Buscando funcionarios com admissao em: {data_admissao}",
                 details={"data_admissao": data_admissao},
             )
-        where_clause = "CAST(F.DATAADMISSAO AS DATE) BETWEEN @DataInicio AND @DataFim"
-
-    sql = f"""
-        {datas_vars}
-
-        SELECT 
-            P.NOME,
-            P.CPF,
-            F.CHAPA,
-            P.SEXO,
-            P.NATURALIDADE,
-            P.GRAUINSTRUCAO,
-            P.ESTADOCIVIL,
-            P.ESTADONATAL,
-            P.DTNASCIMENTO,
-            P.EMAIL,
-            P.TELEFONE1,
-
-            COALESCE(PAI.NOME, 'NAO INFORMADO') AS NOME_PAI,
-            COALESCE(MAE.NOME, 'NAO INFORMADO') AS NOME_MAE,
-
-            P.ORGEMISSORIDENT,
-            P.UFCARTIDENT,
-            P.CARTIDENTIDADE,
-            P.DTEMISSAOIDENT,
-            P.CARTEIRATRAB,
-            P.SERIECARTTRAB,
-            P.UFCARTTRAB,
-            P.DTCARTTRAB,
-            P.TITULOELEITOR,
-            P.ZONATITELEITOR,
-            P.SECAOTITELEITOR,
-            P.ESTELEIT,
-
-            P.CEP,
-            P.ESTADO,
-            P.BAIRRO,
-            P.RUA,
-            P.NUMERO,
-
-            F.PISPASEP,
-            F.DATAADMISSAO,
-            F.SALARIO,
-            F.CODFUNCAO,
-            SEC.NROCENCUSTOCONT AS CENTRO_CUSTO,
-
-            COALESCE(
-                UPPER(LTRIM(RTRIM(FU.NOME))),
-                'NAO INFORMADO'
-            ) AS DESCRICAO_CARGO,
-
-            TRY_CAST(
-                CAST(
-                    '<i>' + REPLACE(F.CODSECAO, '.', '</i><i>') + '</i>'
-                    AS XML
-                ).value('/i[2]', 'varchar(10)')
-                AS INT
-            ) AS NUMERO_OBRA
-
-        FROM PFUNC F
-        INNER JOIN PPESSOA P
-            ON P.CODIGO = F.CODPESSOA
-
-        LEFT JOIN PFUNCAO FU
-            ON FU.CODCOLIGADA = F.CODCOLIGADA
-        AND CAST(FU.CODIGO AS VARCHAR(20)) = F.CODFUNCAO
-
-        LEFT JOIN PSECAO SEC
-            ON SEC.CODCOLIGADA = F.CODCOLIGADA
-        AND SEC.CODIGO = F.CODSECAO
-
-        OUTER APPLY (
-            SELECT TOP 1 D.NOME
-            FROM PFDEPEND D
-            WHERE D.CODCOLIGADA = F.CODCOLIGADA
-            AND CAST(D.CHAPA AS VARCHAR(20)) = F.CHAPA
-            AND CAST(D.GRAUPARENTESCO AS VARCHAR(5)) = '6'
-            ORDER BY D.NOME
-        ) PAI
-
-        OUTER APPLY (
-            SELECT TOP 1 D.NOME
-            FROM PFDEPEND D
-            WHERE D.CODCOLIGADA = F.CODCOLIGADA
-            AND CAST(D.CHAPA AS VARCHAR(20)) = F.CHAPA
-            AND CAST(D.GRAUPARENTESCO AS VARCHAR(5)) = '7'
-            ORDER BY D.NOME
-        ) MAE
-
-        WHERE
-            {where_clause}
-            AND TRY_CAST(
-                CAST(
-                    '<i>' + REPLACE(F.CODSECAO, '.', '</i><i>') + '</i>'
-                    AS XML
-                ).value('/i[2]', 'varchar(10)')
-                AS INT
-            ) = 125
-            AND P.NOME NOT IN (
-                'WELISSON SANTOS SANTANA',
-                'DANIELE APARECIDA RODRIGUES',
-                'MARIANA CRISTINA DOS SANTOS',
-                'CASSIO ROBERTO DA SILVA',
-                'RAFAEL PEREIRA DA SILVA',
-                'ISAIAS SOUSA LISBOA',
-                'JARDELINO PEREIRA DA COSTA',
-                'RAIMUNDO FRAZAO DOS SANTOS', 
-                'FAUZE CELIS RODRIGUES COSTA',
-                'WAGNER JUNIO DE MOURA',
-                'VLADIMIR MOREIRA DA SILVA',
-                'NAILTON ISAIAS MARQUES',
-                'WALDEILSON PEREIRA DA SILVA',
-                'WELISSON SANTOS SANTANA',
-                'FRANCINALDO MARTINS SANTOS',
-                'ADAILTON DE JESUS DOS SANTOS',
-                'ANTONIO DOS SANTOS SILVA',
-                'ADRIANO SILVA SANTOS',
-                'FRANCILDO DOS SANTOS SOBRINHO',
-                'JOSE ANTONIO RODRIGUES MARTINS',
-                'VERILTON DOS SANTOS',
-                'MANOEL JOAO PIRES SOARES',
-                'ANTONIO ALVES DA SILVA FILHO',
-                'EZEQUIEL DE JESUS CERQUEIRA',
-                'MANOEL WALACE MACIEL SOARES',
-                'EDSON PAULO MADEIRA',
-                'JAIR BARROS BRANDAO',
-                'ELISVELTON DA SILVA LOBATO',
-                'JARDEL MENDES BRAGA',
-                'HAMILSON ALVES DE MELO',
-                'RAFAEL BATALHA SOUSA',
-                'MARINHO DE SOUSA MACEDO',
-                'ROBENILSON SANTOS CAMARA',
-                'FRANCISCO VALDEVAN PAIXAO',
-                'GEVANILSON CARDOSO DOS SANTOS',
-                'GENILSON SILVA CANTANHEDE',
-                'DENIS AUGUSTO DA ROCHA CONCEICAO',
-                'EDINALDO MONTEIRO LOBATO',
-                'GILSON CLEITON JOAQUIM DE MOURA',
-                'MARCIO CLEITON VIEIRA DE MESQUITA',
-                'MACIEL MIGUEL EVANGELISTA',
-                'GILSON BARRETO SANTOS',
-                'JOAO CARLOS NOVAIS SILVA',
-                'ESEQUIAS FERREIRA FERNANDES',
-                'JOCILEY PINHEIRO BAIA',
-                'ANTONIEL MARIA ALMEIDA RIBEIRO',
-                'VITOR AUGUSTO DA SILVA',
-                'ERIVAN LIMA VINAGRE',
-                'JOAO BATISTA SOUSA SILVA',
-                'JOCICLEY DA SILVA FARIAS',
-                'JOELITON ROCHA REIS',
-                'DANILO FERREIRA DA SILVA',
-                'PEDRO SANTOS DA SILVA',
-                'MARCOS MELO MONTEIRO',
-                'CARLOS EMERSON GOES OLIVA SANTOS',
-                'RAIMUNDO NONATO GOMES DA SILVA',
-                'ANDERSON CLAYTON PRAZERES BARRETO'
+        if data_inicio_minima and data_inicio_minima > data_inicio:
+            logger.info(
+                "Janela incremental (watermark) aplicada",
+                details={"data_inicio_janela": data_inicio.isoformat(), "data_inicio": data_inicio_minima.isoformat()},
             )
+            data_inicio = min(data_inicio_minima, data_fim)
+        sql = SQL_CHAVES_POR_DATA if somente_chaves else SQL_FUNCIONARIOS_POR_DATA
+        params = [data_inicio, data_fim]
 
-        ORDER BY F.DATAADMISSAO ASC;
-    """
+    nomes_excluidos = carregar_nomes_excluidos(NOMES_EXCLUIDOS_PATH)
+    logger.info(
+        "Lista de exclusao carregada",
+        details={"path": NOMES_EXCLUIDOS_PATH, "existe": os.path.exists(NOMES_EXCLUIDOS_PATH), "total": len(nomes_excluidos)},
+    )
+
+    snapshot_ttl_seg = float(os.getenv("METAX_RM_SNAPSHOT_TTL_MIN", "30")) * 60 if usar_cache else 0
+    snapshot_chave, snapshot_descricao = montar_chave_snapshot(
+        "txt" if filtros_txt else "data",
+        data_inicio=None if filtros_txt else data_inicio,
+        data_fim=None if filtros_txt else data_fim,
+        nomes=[f"{campo}:{valor}" for campo, valores in filtros_txt.items() for valor in valores] or None,
+        extras={
+            "obra": NUMERO_OBRA,
+            "excluidos": sorted(nomes_excluidos),
+            "colunas": "chaves" if somente_chaves else "completo",
+        },
+    )
+    try:
+        snapshot = ler_snapshot(RM_SNAPSHOT_PATH, snapshot_chave, snapshot_ttl_seg)
+    except Exception as e:
+        logger.warn("Falha ao ler snapshot RM local", details={"path": RM_SNAPSHOT_PATH, "error": str(e)})
+        snapshot = None
+    telemetria.extras["snapshot"] = "HIT" if snapshot is not None else "MISS"
+    if snapshot is not None:
+        logger.info(
+            "Snapshot RM local: HIT (query SQL nao executada)",
+            details={"rows": len(snapshot), "ttl_seg": snapshot_ttl_seg, "modo": snapshot_descricao["modo"]},
+        )
+        for i in range(0, len(snapshot), batch_size):
+            yield snapshot[i:i + batch_size]
+        return
+    logger.info(
+        "Snapshot RM local: MISS",
+        details={"ttl_seg": snapshot_ttl_seg, "modo": snapshot_descricao["modo"], "habilitado": snapshot_ttl_seg > 0},
+    )
 
     sql_preview = sql.replace("\n", " ").strip()
     if len(sql_preview) > 300:
@@ -291,57 +297,322 @@ def buscar_funcionarios_para_cadastro(data_admissao: str = None, filtro_nomes: l
         "Executing SQL Query",
         details={"sql_preview": sql_preview, "sql_len": len(sql), "has_params": bool(params)},
     )
-    with obter_conexao() as conn:
-        cursor = conn.cursor()
-        if os.getenv("METAX_SQL_READ_UNCOMMITTED", "1") == "1":
-            try:
-                cursor.execute("SET TRANSACTION ISOLATION LEVEL READ UNCOMMITTED")
-                logger.info("SQL isolation READ UNCOMMITTED habilitado")
-            except Exception as e:
-                logger.warn("Falha ao setar isolation level", details={"error": str(e)})
-        lock_timeout_ms = os.getenv("METAX_SQL_LOCK_TIMEOUT_MS", "30000")
-        if lock_timeout_ms:
-            try:
-                cursor.execute(f"SET LOCK_TIMEOUT {int(lock_timeout_ms)}")
-            except Exception as e:
-                logger.warn("Falha ao setar LOCK_TIMEOUT", details={"error": str(e)})
+    with _conexao_medida(telemetria) as conn:
+        with telemetria.fase("referencias"):
+            referencias, secoes_obra = _carregar_referencias_obra(conn.cursor())
 
-        max_retries = int(os.getenv("METAX_SQL_RETRIES", "2"))
-        backoff_sec = int(os.getenv("METAX_SQL_RETRY_BACKOFF_SEC", "5"))
+    linhas_snapshot = [] if snapshot_ttl_seg > 0 else None
+    if filtros_txt:
+        lotes = _iterar_consultas_em_chunks(consultas, nomes_excluidos, secoes_obra, referencias, telemetria)
+    else:
+        lotes = _iterar_query_streaming(
+            sql, params, batch_size, nomes_excluidos, secoes_obra, referencias, telemetria
+        )
+    for lote in lotes:
+        if linhas_snapshot is not None:
+            linhas_snapshot.extend(lote)
+        yield lote
 
-        logger.info("SQL Query iniciada", details={"lock_timeout_ms": lock_timeout_ms, "retries": max_retries})
-        exec_started = datetime.now()
-        last_error = None
-        for attempt in range(1, max_retries + 2):
-            try:
-                if params:
-                    cursor.execute(sql, params)
-                else:
-                    cursor.execute(sql)
-                last_error = None
-                break
-            except Exception as e:
-                last_error = e
-                msg = str(e)
-                is_lock_timeout = "Lock request time out period exceeded" in msg or "1222" in msg
-                if is_lock_timeout and attempt <= max_retries:
-                    logger.warn(
-                        "Timeout de lock na query, tentando novamente",
-                        details={"attempt": attempt, "error": msg},
-                    )
-                    time.sleep(backoff_sec)
-                    continue
-                raise
-        if last_error:
-            raise last_error
-        exec_elapsed = int((datetime.now() - exec_started).total_seconds())
-        logger.info("SQL Query executada, lendo resultados...", details={"exec_time_sec": exec_elapsed})
+    if linhas_snapshot is not None:
+        try:
+            gravar_snapshot(RM_SNAPSHOT_PATH, snapshot_chave, snapshot_descricao, linhas_snapshot, snapshot_ttl_seg)
+        except Exception as e:
+            logger.warn("Falha ao gravar snapshot RM local", details={"path": RM_SNAPSHOT_PATH, "error": str(e)})
+
+
+def buscar_detalhes_funcionarios(funcionarios: list[dict], telemetria: TelemetriaSQL | None = None) -> list[dict]:
+    """
+    Segunda fase da coleta: colunas completas (documentos, endereco, pai/mae) so para
+    os funcionarios informados, casados por (CODCOLIGADA, CHAPA) via #CHAVES_DETALHE.
+    Completa os dicts in place e retorna os que ficaram sem detalhe.
+    """
+    telemetria = telemetria or TelemetriaSQL()
+    chaves = sorted({chave_funcionario(func) for func in funcionarios})
+    if not chaves:
+        return []
+    nomes_excluidos = carregar_nomes_excluidos(NOMES_EXCLUIDOS_PATH)
+    started = time.perf_counter()
+    with _conexao_medida(telemetria) as conn:
+        with telemetria.fase("referencias"):
+            referencias, secoes_obra = _carregar_referencias_obra(conn.cursor())
+        cursor = _preparar_sessao_sql(conn, nomes_excluidos, secoes_obra, telemetria)
+        with telemetria.fase("setup") as fase:
+            cursor.execute(SQL_PREPARAR_CHAVES_DETALHE)
+            cursor.fast_executemany = True
+            cursor.executemany(SQL_INSERIR_CHAVE_DETALHE, chaves)
+            cursor.fast_executemany = False
+            fase["rows"] = len(chaves)
+        _executar_sql_com_retry(cursor, SQL_FUNCIONARIOS_DETALHE, [], telemetria)
+        colunas = [c[0] for c in cursor.description]
+        detalhes = _ler_lote(cursor, colunas, referencias, telemetria, None)
+        _coletar_mensagens_finais(cursor, telemetria)
+
+    sem_detalhe = mesclar_detalhes(funcionarios, detalhes)
+    resumo = telemetria.extras.setdefault("detalhe", {"consultas": 0, "chaves": 0, "rows": 0, "sem_detalhe": 0})
+    resumo["consultas"] += 1
+    resumo["chaves"] += len(chaves)
+    resumo["rows"] += len(detalhes)
+    resumo["sem_detalhe"] += len(sem_detalhe)
+    logger.info(
+        "SQL detalhe finalizado",
+        details={
+            "chaves": len(chaves),
+            "rows": len(detalhes),
+            "sem_detalhe": len(sem_detalhe),
+            "time_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    )
+    return sem_detalhe
+
+
+@contextmanager
+def _conexao_medida(telemetria: TelemetriaSQL):
+    """Conexao do pool com o tempo de aquisicao (connect ou reuso) registrado na telemetria."""
+    started = time.perf_counter()
+    with POOL_SQL.conexao() as conn:
+        telemetria.registrar("connect", (time.perf_counter() - started) * 1000)
+        yield conn
+
+
+def _carregar_referencias_obra(cursor) -> tuple[dict, list[tuple[int, str]]]:
+    ref_cache_path = os.path.join(CACHE_DIR, "rm_referencias.json")
+    referencias, ref_cache_hit = obter_referencias(
+        cursor, ref_cache_path, ttl_horas=float(os.getenv("METAX_RM_REF_CACHE_HORAS", "24"))
+    )
+    secoes_obra = secoes_da_obra(referencias, NUMERO_OBRA)
+    logger.info(
+        "Referencias RM (PSECAO/PFUNCAO) prontas",
+        details={
+            "cache_hit": ref_cache_hit,
+            "path": ref_cache_path,
+            "obra": NUMERO_OBRA,
+            "secoes_obra": len(secoes_obra),
+        },
+    )
+    if not secoes_obra:
+        logger.warn("Nenhuma secao encontrada para a obra no cache de referencias", details={"obra": NUMERO_OBRA})
+    return referencias, secoes_obra
+
+
+def _preparar_sessao_sql(
+    conn,
+    nomes_excluidos: list[str],
+    secoes_obra: list[tuple[int, str]],
+    telemetria: TelemetriaSQL,
+):
+    """Isolation, LOCK_TIMEOUT e tabelas temporarias da sessao; retorna o cursor pronto."""
+    with telemetria.fase("setup") as fase:
+        cursor = _preparar_cursor_sessao(conn, nomes_excluidos, secoes_obra)
+        fase["rows"] = len(nomes_excluidos) + len(secoes_obra)
+    if telemetria.capturar_estatisticas:
+        cursor.execute("SET STATISTICS IO, TIME ON")
+    return cursor
+
+
+def _preparar_cursor_sessao(conn, nomes_excluidos: list[str], secoes_obra: list[tuple[int, str]]):
+    cursor = conn.cursor()
+    if os.getenv("METAX_SQL_READ_UNCOMMITTED", "1") == "1":
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL READ UNCOMMITTED")
+            logger.info("SQL isolation READ UNCOMMITTED habilitado")
+        except Exception as e:
+            logger.warn("Falha ao setar isolation level", details={"error": str(e)})
+    lock_timeout_ms = os.getenv("METAX_SQL_LOCK_TIMEOUT_MS", "30000")
+    if lock_timeout_ms:
+        try:
+            cursor.execute(f"SET LOCK_TIMEOUT {int(lock_timeout_ms)}")
+        except Exception as e:
+            logger.warn("Falha ao setar LOCK_TIMEOUT", details={"error": str(e)})
+
+    cursor.execute(SQL_PREPARAR_NOMES_EXCLUIDOS)
+    if nomes_excluidos:
+        cursor.fast_executemany = True
+        cursor.executemany(SQL_INSERIR_NOME_EXCLUIDO, [(nome,) for nome in nomes_excluidos])
+        cursor.fast_executemany = False
+
+    cursor.execute(SQL_PREPARAR_SECOES_OBRA)
+    if secoes_obra:
+        cursor.fast_executemany = True
+        cursor.executemany(SQL_INSERIR_SECAO_OBRA, secoes_obra)
+        cursor.fast_executemany = False
+    return cursor
+
+
+def _executar_sql_com_retry(cursor, sql: str, params: list, telemetria: TelemetriaSQL):
+    max_retries = int(os.getenv("METAX_SQL_RETRIES", "2"))
+    backoff_sec = int(os.getenv("METAX_SQL_RETRY_BACKOFF_SEC", "5"))
+
+    logger.info(
+        "SQL Query iniciada",
+        details={"lock_timeout_ms": os.getenv("METAX_SQL_LOCK_TIMEOUT_MS", "30000"), "retries": max_retries},
+    )
+    exec_started = time.perf_counter()
+    last_error = None
+    for attempt in range(1, max_retries + 2):
+        try:
+            if params:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql)
+            last_error = None
+            break
+        except Exception as e:
+            last_error = e
+            msg = str(e)
+            is_lock_timeout = "Lock request time out period exceeded" in msg or "1222" in msg
+            if is_lock_timeout and attempt <= max_retries:
+                logger.warn(
+                    "Timeout de lock na query, tentando novamente",
+                    details={"attempt": attempt, "error": msg},
+                )
+                time.sleep(backoff_sec)
+                continue
+            raise
+    if last_error:
+        raise last_error
+    exec_elapsed_ms = (time.perf_counter() - exec_started) * 1000
+    telemetria.registrar("execute", exec_elapsed_ms)
+    telemetria.coletar_mensagens("execute", cursor)
+    logger.info(
+        "SQL Query executada, lendo resultados...",
+        details={"exec_time_sec": int(exec_elapsed_ms / 1000), "exec_time_ms": round(exec_elapsed_ms, 1)},
+    )
+
+
+def _ler_lote(cursor, colunas: list[str], referencias: dict, telemetria: TelemetriaSQL, batch_size: int | None) -> list[dict]:
+    """fetchmany (ou fetchall, sem batch_size) + conversao para dict, medidos separadamente."""
+    started = time.perf_counter()
+    rows = cursor.fetchmany(batch_size) if batch_size else cursor.fetchall()
+    telemetria.registrar("fetch", (time.perf_counter() - started) * 1000, rows=len(rows))
+    if not rows:
+        return []
+    started = time.perf_counter()
+    lote = [enriquecer_funcionario(dict(zip(colunas, row)), referencias) for row in rows]
+    telemetria.registrar("to_dict", (time.perf_counter() - started) * 1000, rows=len(lote))
+    return lote
+
+
+def _coletar_mensagens_finais(cursor, telemetria: TelemetriaSQL):
+    """Mensagens de STATISTICS IO/TIME chegam depois do ultimo resultado (nextset)."""
+    if not telemetria.capturar_estatisticas:
+        return
+    try:
+        while cursor.nextset():
+            telemetria.coletar_mensagens("fetch", cursor)
+        telemetria.coletar_mensagens("fetch", cursor)
+    except Exception as e:
+        logger.warn("Falha ao ler mensagens de STATISTICS", details={"error": str(e)})
+
+
+def _iterar_query_streaming(
+    sql: str,
+    params: list,
+    batch_size: int,
+    nomes_excluidos: list[str],
+    secoes_obra: list[tuple[int, str]],
+    referencias: dict,
+    telemetria: TelemetriaSQL,
+) -> Iterator[list[dict]]:
+    with _conexao_medida(telemetria) as conn:
+        cursor = _preparar_sessao_sql(conn, nomes_excluidos, secoes_obra, telemetria)
+        _executar_sql_com_retry(cursor, sql, params, telemetria)
         colunas = [c[0] for c in cursor.description]
         fetch_started = datetime.now()
-        rows = cursor.fetchall()
+        total_rows = 0
+        total_lotes = 0
+        while True:
+            lote = _ler_lote(cursor, colunas, referencias, telemetria, batch_size)
+            if not lote:
+                break
+            total_rows += len(lote)
+            total_lotes += 1
+            yield lote
+        _coletar_mensagens_finais(cursor, telemetria)
         fetch_elapsed = int((datetime.now() - fetch_started).total_seconds())
-        logger.info("SQL Query finalizada", details={"rows": len(rows), "fetch_time_sec": fetch_elapsed})
-        return [dict(zip(colunas, row)) for row in rows]
+        logger.info(
+            "SQL Query finalizada",
+            details={"rows": total_rows, "batches": total_lotes, "batch_size": batch_size, "fetch_time_sec": fetch_elapsed},
+        )
+
+
+def _buscar_chunk_txt(
+    sql: str,
+    chunk: list[str],
+    nomes_excluidos: list[str],
+    secoes_obra: list[tuple[int, str]],
+    referencias: dict,
+    telemetria: TelemetriaSQL,
+) -> list[dict]:
+    with _conexao_medida(telemetria) as conn:
+        cursor = _preparar_sessao_sql(conn, nomes_excluidos, secoes_obra, telemetria)
+        _executar_sql_com_retry(cursor, sql, chunk, telemetria)
+        colunas = [c[0] for c in cursor.description]
+        lote = _ler_lote(cursor, colunas, referencias, telemetria, None)
+        _coletar_mensagens_finais(cursor, telemetria)
+        return lote
+
+
+def _iterar_consultas_em_chunks(
+    consultas: list[tuple[str, list]],
+    nomes_excluidos: list[str],
+    secoes_obra: list[tuple[int, str]],
+    referencias: dict,
+    telemetria: TelemetriaSQL,
+) -> Iterator[list[dict]]:
+    """
+    Executa os chunks (sql, params) da fila TXT em paralelo (conexoes do pool) e entrega
+    sem CPF repetido: a mesma pessoa pode vir por nome, CPF e CHAPA.
+    """
+    workers = max(1, min(len(consultas), POOL_SQL.tamanho_max))
+    logger.info(
+        "Filtro TXT em chunks",
+        details={"chunks": len(consultas), "chunk_sizes": sorted({len(c[1]) for c in consultas}), "workers": workers},
+    )
+    fetch_started = datetime.now()
+    cpfs_vistos = set()
+    total_rows = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql_nomes") as executor:
+        futuros = [
+            executor.submit(_buscar_chunk_txt, sql, chunk, nomes_excluidos, secoes_obra, referencias, telemetria)
+            for sql, chunk in consultas
+        ]
+        for futuro in as_completed(futuros):
+            lote = []
+            for func in futuro.result():
+                total_rows += 1
+                cpf = "".join(filter(str.isdigit, str(func.get("CPF", ""))))
+                if cpf and cpf in cpfs_vistos:
+                    continue
+                cpfs_vistos.add(cpf)
+                lote.append(func)
+            if lote:
+                yield lote
+    fetch_elapsed = int((datetime.now() - fetch_started).total_seconds())
+    logger.info(
+        "SQL Query finalizada",
+        details={"rows": total_rows, "unicos": len(cpfs_vistos), "chunks": len(consultas), "fetch_time_sec": fetch_elapsed},
+    )
+
+
+def buscar_funcionarios_para_cadastro(
+    data_admissao: str = None,
+    filtro_nomes: list[str] = None,
+    filtro_cpfs: list[str] = None,
+    filtro_chapas: list[str] = None,
+) -> list[dict]:
+    """
+    Busca funcionarios (lista completa).
+    Wrapper sobre iterar_funcionarios_para_cadastro para quem precisa do resultado inteiro.
+    """
+    funcionarios = []
+    for lote in iterar_funcionarios_para_cadastro(
+        data_admissao=data_admissao,
+        filtro_nomes=filtro_nomes,
+        filtro_cpfs=filtro_cpfs,
+        filtro_chapas=filtro_chapas,
+    ):
+        funcionarios.extend(lote)
+    return funcionarios
 
 
 from notification import enviar_relatorio_email
@@ -354,16 +625,6 @@ from reporting import (
 )
 
 
-def _normalizar_nome(raw: str) -> str:
-    if not raw:
-        return ""
-    texto = raw.strip()
-    texto = unicodedata.normalize("NFKD", texto)
-    texto = "".join([c for c in texto if not unicodedata.combining(c)])
-    texto = " ".join(texto.split())
-    return texto.upper()
-
-
 def _extrair_bloco_centro_custo(centro_custo: str) -> str | None:
     if not centro_custo:
         return None
@@ -402,6 +663,159 @@ def _resolver_contrato_config(chave: str) -> tuple[str | None, str | None]:
     return None, None
 
 
+CONTRATOS_PORTAL = ("MECANICA", "ELETROMECANICA")
+
+
+def _exigir_contrato_config(chave: str) -> tuple[str | None, str | None]:
+    contrato_value, contrato_label = _resolver_contrato_config(chave)
+    if not (contrato_value or contrato_label):
+        raise ValueError(
+            f"Contrato {chave} nao configurado. "
+            f"Defina METAX_CONTRATO_{chave}_VALUE ou METAX_CONTRATO_{chave}_LABEL no .env"
+        )
+    return contrato_value, contrato_label
+
+
+def _grupos_vazios() -> dict[str, list[dict]]:
+    return {"MECANICA": [], "ELETROMECANICA": [], "DESCONHECIDO": []}
+
+
+def _coletar_funcionarios_sql(
+    entradas_txt: dict[str, list[str]],
+    data_inicio_minima,
+    telemetria: TelemetriaSQL,
+    somente_chaves: bool = False,
+    janela: tuple[date, date] | None = None,
+    ledger_path: str | None = None,
+    sinal_pendentes: threading.Event | None = None,
+) -> dict:
+    """
+    Consome a query RM em streaming: dedup por CPF e agrupamento por contrato.
+    Roda na thread de coleta enquanto o login no portal acontece na thread principal.
+    Com ledger_path, quem ja esta concluido com a mesma linha RM vai para ja_concluidos
+    e nao entra nos grupos; sinal_pendentes e setado no primeiro pendente encontrado.
+    """
+    started = time.perf_counter()
+    unique_by_cpf: dict[str, dict] = {}
+    grupos = _grupos_vazios()
+    ja_concluidos: list[tuple[dict, dict]] = []
+    dup_count = 0
+    sql_error = None
+    try:
+        for lote in iterar_funcionarios_para_cadastro(
+            filtro_nomes=entradas_txt.get("NOME"),
+            filtro_cpfs=entradas_txt.get("CPF"),
+            filtro_chapas=entradas_txt.get("CHAPA"),
+            data_inicio_minima=data_inicio_minima,
+            telemetria=telemetria,
+            somente_chaves=somente_chaves,
+            janela=janela,
+        ):
+            novos = []
+            for func in lote:
+                cpf = "".join(filter(str.isdigit, str(func.get("CPF", ""))))
+                if not cpf:
+                    continue
+                if cpf in unique_by_cpf:
+                    dup_count += 1
+                    continue
+                unique_by_cpf[cpf] = func
+                novos.append(func)
+            pendentes = novos
+            if ledger_path and novos:
+                try:
+                    pendentes, concluidos_lote = separar_ja_concluidos(ledger_path, novos)
+                    ja_concluidos.extend(concluidos_lote)
+                except Exception as e:
+                    logger.warn("Falha ao consultar ledger de outcomes", details={"path": ledger_path, "error": str(e)})
+                    pendentes = novos
+            for func in pendentes:
+                grupos[_classificar_contrato_por_centro_custo(func.get("CENTRO_CUSTO"))].append(func)
+            if pendentes and sinal_pendentes is not None:
+                sinal_pendentes.set()
+            logger.info(
+                "Lote SQL recebido",
+                details={"lote": len(lote), "acumulado": len(unique_by_cpf), "ja_concluidos": len(ja_concluidos)},
+            )
+    except Exception as e:
+        sql_error = str(e)
+        logger.error("Falha ao buscar funcionarios", details={"error": sql_error})
+        unique_by_cpf = {}
+        grupos = _grupos_vazios()
+        ja_concluidos = []
+    return {
+        "unique_by_cpf": unique_by_cpf,
+        "grupos": grupos,
+        "ja_concluidos": ja_concluidos,
+        "dup_count": dup_count,
+        "sql_error": sql_error,
+        "duracao_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _iniciar_sessao_antecipada(
+    headless: bool,
+    futuro_sql,
+    sinal_pendentes: threading.Event,
+    estado_sessao_dir: str | None = None,
+) -> dict | None:
+    """
+    Abre o browser e passa pelo login/CAPTCHA enquanto a query RM ainda roda.
+    O browser so sobe quando a coleta sinaliza o primeiro pendente (ledger); se ela
+    termina sem nenhum, o Chrome nem e aberto. O contrato so e escolhido quando a
+    coleta termina (primeiro grupo com pessoas). Falhas caem no fluxo sequencial.
+    """
+    while not sinal_pendentes.wait(0.2):
+        if futuro_sql.done():
+            if not sinal_pendentes.is_set():
+                logger.info("Sessao antecipada nao aberta: coleta sem funcionarios pendentes.")
+                return None
+            break
+    escolha = {}
+
+    def _resolver():
+        coleta = futuro_sql.result()
+        for chave in CONTRATOS_PORTAL:
+            if not coleta["grupos"][chave]:
+                continue
+            contrato_value, contrato_label = _resolver_contrato_config(chave)
+            if not (contrato_value or contrato_label):
+                return None
+            escolha["chave"] = chave
+            return contrato_value, contrato_label
+        return None
+
+    logger.info("Iniciando sessao MetaX em paralelo com a query RM...")
+    started = time.perf_counter()
+    try:
+        p, browser, page = iniciar_sessao(
+            headless=headless, resolver_contrato=_resolver, estado_sessao_dir=estado_sessao_dir
+        )
+    except Exception as e:
+        logger.warn(
+            "Sessao antecipada falhou; login sera refeito apos a coleta.",
+            details={"error": str(e)},
+        )
+        return None
+    if page is None:
+        return None
+    return {
+        "chave": escolha["chave"],
+        "p": p,
+        "browser": browser,
+        "page": page,
+        "duracao_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _fechar_sessao(p, browser):
+    if browser:
+        logger.info("Fechando navegador...")
+        browser.close()
+    if p:
+        p.stop()
+
+
 def _criar_registro_base(nome: str, cpf_limpo: str, pessoa_started_at: str) -> dict:
     return {
         "nome": nome,
@@ -506,29 +920,11 @@ def _persistir_manifest(output_manager: OutputManager, manifest: dict, filename:
 
 def carregar_lista_nomes_txt(path: str) -> list[str]:
     """
-    Carrega uma lista de nomes a partir de um TXT.
-    - Um nome por linha
-    - Ignora linhas vazias
-    - Ignora comentarios iniciados com #
-    - Normaliza (upper, remove acentos, strip, colapsa espacos)
-    - Remove duplicados preservando ordem
+    Carrega a lista de nomes de um TXT (um por linha, # comenta, normalizado, sem repetidos).
+    Linhas com CPF/CHAPA sao ignoradas aqui; use entrada_txt.carregar_entradas_txt.
     """
-    if not os.path.exists(path):
-        return []
-
-    nomes = []
-    vistos = set()
-    with open(path, "r", encoding="utf-8") as f:
-        for linha in f:
-            linha = linha.strip()
-            if not linha or linha.startswith("#"):
-                continue
-            nome = _normalizar_nome(linha)
-            if not nome or nome in vistos:
-                continue
-            vistos.add(nome)
-            nomes.append(nome)
-    return nomes
+    _, entradas = carregar_entradas_txt(path)
+    return entradas.get("NOME", [])
 
 
 def _adquirir_lock(lock_path: str) -> bool:
@@ -555,54 +951,6 @@ def _liberar_lock(lock_path: str):
         pass
 
 
-def _carregar_txt_com_linhas(path: str):
-    if not os.path.exists(path):
-        return [], []
-    with open(path, "r", encoding="utf-8") as f:
-        linhas = f.readlines()
-    nomes = []
-    vistos = set()
-    for linha in linhas:
-        raw = linha.strip()
-        if not raw or raw.startswith("#"):
-            continue
-        nome = _normalizar_nome(raw)
-        if not nome or nome in vistos:
-            continue
-        vistos.add(nome)
-        nomes.append(nome)
-    return linhas, nomes
-
-
-def _atualizar_fila_txt(path: str, nomes_processados: set[str]) -> int:
-    if not os.path.exists(path):
-        return 0
-    with open(path, "r", encoding="utf-8") as f:
-        linhas = f.readlines()
-
-    novas_linhas = []
-    removidos = 0
-    for linha in linhas:
-        raw = linha.strip()
-        if not raw or raw.startswith("#"):
-            novas_linhas.append(linha)
-            continue
-        nome = _normalizar_nome(raw)
-        if nome in nomes_processados:
-            removidos += 1
-            continue
-        novas_linhas.append(linha)
-
-    nomes_restantes = [l for l in novas_linhas if l.strip() and not l.strip().startswith("#")]
-    if not nomes_restantes:
-        os.remove(path)
-        return removidos
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.writelines(novas_linhas)
-    return removidos
-
-
 def _escrever_documento_operacional_publico():
     os.makedirs(PUBLIC_INPUTS_DIR, exist_ok=True)
     path = os.path.join(PUBLIC_BASE_DIR, "COMO_USAR_METAX.txt")
@@ -615,7 +963,8 @@ def _escrever_documento_operacional_publico():
         f"5) Confira relatorios em: {PUBLIC_RELATORIOS_DIR}\\n"
         f"6) Confira logs em: {PUBLIC_LOGS_DIR}\\n"
         f"7) Confira screenshots em: {PUBLIC_SCREENSHOTS_DIR}\\n"
-        "8) O TXT se auto-limpa: nomes processados sao removidos.\\n"
+        "8) O TXT se auto-limpa: entradas processadas sao removidas.\\n"
+        "   Uma entrada por linha: NOME COMPLETO, CPF:000.000.000-00 ou CHAPA:00123.\\n"
         "9) Evidencias de falha de verificacao:\\n"
         f"   - {os.path.join(PUBLIC_SCREENSHOTS_DIR, 'verify_fail_<cpf>_...png')}\\n"
         f"   - {os.path.join(PUBLIC_JSON_DIR, 'verify_debug_<cpf>_...json')}\\n"
@@ -744,11 +1093,1061 @@ def _montar_erros_auditoria(manifest: dict) -> list[dict]:
     return erros
 
 
+def _registrar_centro_custo_desconhecido(
+    funcs: list[dict],
+    manifest: dict,
+    execution_id: str,
+    started_at: datetime,
+):
+    for func in funcs:
+        cpf = func["CPF"]
+        cpf_limpo = "".join(filter(str.isdigit, str(cpf)))
+        nome = func["NOME"]
+        caminho_foto = None
+        centro_custo = func.get("CENTRO_CUSTO")
+        pessoa_started_at = datetime.now().isoformat()
+        registro = _criar_registro_base(nome, cpf_limpo, pessoa_started_at)
+        registro["dados_funcionario"] = _snapshot_funcionario(func)
+        registro["contrato_chave"] = _classificar_contrato_por_centro_custo(centro_custo)
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = f"Centro de custo desconhecido: {centro_custo}"
+        logger.warn(
+            f"Centro de custo desconhecido para {nome}. Pulando cadastro.",
+            details={"cpf": cpf_limpo, "centro_custo": centro_custo},
+        )
+        manifest["people"].append(registro)
+        registro["foto_path"] = _classificar_foto_pos_processamento(
+            caminho_foto, registro["status_final"], execution_id, started_at
+        )
+        registro["foto_publica_path"] = registro["foto_path"]
+
+
+def _registrar_concluidos_ledger(
+    ja_concluidos: list[tuple[dict, dict]],
+    manifest: dict,
+    chaves_processadas_no_run: set[tuple[str, str]],
+):
+    for func, entrada in ja_concluidos:
+        cpf_limpo = "".join(filter(str.isdigit, str(func["CPF"])))
+        registro = _criar_registro_base(func["NOME"], cpf_limpo, datetime.now().isoformat())
+        registro["dados_funcionario"] = _snapshot_funcionario(func)
+        registro["contrato_chave"] = entrada.get("contrato_chave") or _classificar_contrato_por_centro_custo(
+            func.get("CENTRO_CUSTO")
+        )
+        registro["status_final"] = "SKIPPED"
+        registro["outcome"] = OUTCOME_SKIPPED_ALREADY_EXISTS
+        registro["ledger_skip"] = True
+        registro["errors"]["action_error"] = (
+            f"Ignorado: concluido em execucao anterior ({entrada['outcome']} em {entrada['atualizado_em']})."
+        )
+        manifest["people"].append(registro)
+        chaves_processadas_no_run.update(chaves_do_funcionario(func))
+
+
+def _etapa_classificar(
+    item: dict,
+    *,
+    chave: str,
+    rascunhos_existentes: set[str],
+    falha_detalhe: str | None,
+    chaves_processadas_no_run: set[tuple[str, str]],
+    cpfs_processados_no_run: set[str],
+    cpfs_no_grupo: set[str],
+    fotos_cache: dict[str, str | None],
+    preflight: dict[str, dict] | None = None,
+    fila: FilaCompartilhada | None = None,
+) -> dict | None:
+    """
+    Monta o registro e decide quem segue para o portal (rascunho existente, falha de
+    detalhe do grupo ou do item e erro na pre-validacao ja finalizam).
+    """
+    func = item["func"]
+    cpf = func["CPF"]
+    cpf_limpo = "".join(filter(str.isdigit, str(cpf)))
+    nome = func["NOME"]
+    if cpf_limpo in cpfs_processados_no_run or cpf_limpo in cpfs_no_grupo:
+        logger.warn(
+            f"CPF duplicado no run. Pulando {nome}.",
+            details={"cpf": cpf_limpo},
+        )
+        item["descartado"] = True
+        return None
+    if fila is not None and not fila.reivindicar(cpf_limpo):
+        logger.info(f"{nome} com outra maquina ou ja concluido na fila compartilhada.", details={"cpf": cpf_limpo})
+        item["descartado"] = True
+        return None
+    cpfs_no_grupo.add(cpf_limpo)
+
+    pessoa_started_at = datetime.now().isoformat()
+    registro = _criar_registro_base(nome, cpf_limpo, pessoa_started_at)
+    registro["dados_funcionario"] = _snapshot_funcionario(func)
+    registro["contrato_chave"] = chave
+    caminho_foto = fotos_cache.get(cpf_limpo)
+    registro["foto_path"] = caminho_foto
+    registro["foto_publica_path"] = caminho_foto
+    item.update({"cpf_limpo": cpf_limpo, "registro": registro, "finalizado": False, "classificar_foto": True})
+    apontamentos = (preflight or {}).get(cpf_limpo)
+    if apontamentos:
+        registro["preflight"] = apontamentos
+
+    if cpf_limpo in rascunhos_existentes:
+        logger.info(f"Funcionario {nome} ja consta nos rascunhos (CACHE). Pulando...", details={"cpf": cpf})
+        registro["attempted"] = False
+        registro["status_final"] = "SKIPPED"
+        registro["outcome"] = OUTCOME_SKIPPED_ALREADY_EXISTS
+        registro["errors"]["action_error"] = "Ignorado: rascunho ja existente (cache)."
+        chaves_processadas_no_run.update(chaves_do_funcionario(func))
+        item["finalizado"] = True
+    elif falha_detalhe or item.get("falha_detalhe"):
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = falha_detalhe or item["falha_detalhe"]
+        item["finalizado"] = True
+        item["classificar_foto"] = False
+    elif apontamentos and apontamentos["erros"]:
+        logger.warn(
+            f"Pre-validacao reprovou {nome}; cadastro nao iniciado.",
+            details={"cpf": cpf_limpo, "erros": apontamentos["erros"]},
+        )
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = "Pre-validacao: " + "; ".join(apontamentos["erros"])
+        item["finalizado"] = True
+        item["classificar_foto"] = False
+    return item
+
+
+def _etapa_foto(item: dict, *, fotos_cache: dict[str, str | None]) -> dict:
+    """Download da foto (SharePoint/local) e reducao com Pillow, fora da thread do browser."""
+    if item["finalizado"]:
+        return item
+    func = item["func"]
+    cpf = func["CPF"]
+    cpf_limpo = item["cpf_limpo"]
+    nome = func["NOME"]
+    registro = item["registro"]
+    if cpf_limpo not in fotos_cache:
+        try:
+            fotos_cache[cpf_limpo] = baixar_foto_funcionario(
+                func,
+                pasta_destino=FOTOS_EM_PROCESSAMENTO_DIR,
+                pastas_busca=FOTOS_BUSCA_DIRS,
+            )
+        except Exception as e:
+            logger.error(
+                f"Falha ao obter foto de {nome}: {e}",
+                details={"error": str(e), "cpf": cpf},
+            )
+            fotos_cache[cpf_limpo] = None
+
+    caminho_foto = fotos_cache.get(cpf_limpo)
+    registro["foto_path"] = caminho_foto
+    registro["foto_publica_path"] = caminho_foto
+
+    if caminho_foto:
+        logger.info(f"Foto pronta para {nome}", details={"cpf": cpf, "foto": caminho_foto})
+        item["foto_reduzida"] = reduzir_foto_para_metax(caminho_foto)
+    else:
+        logger.warn(f"Foto nao encontrada para {nome}", details={"cpf": cpf})
+        registro["no_photo"] = True
+    return item
+
+
+def _etapa_portal(
+    item: dict,
+    sessao: dict,
+    *,
+    chave: str,
+    output_manager: OutputManager,
+    rascunhos_existentes: set[str],
+    chaves_processadas_no_run: set[tuple[str, str]],
+    cpfs_processados_no_run: set[str],
+    verificacao_lote: bool = False,
+    prazo: float | None = None,
+) -> dict:
+    """
+    Cadastro e verificacao na page do worker (unico estagio que usa o browser). Com
+    verificacao_lote o salvo fica pendente para a varredura unica no fim do grupo.
+    Com prazo (epoch do fim do orcamento), quem nao cabe no tempo restante e adiado.
+    """
+    if item["finalizado"]:
+        return item
+    page = sessao["page"]
+    func = item["func"]
+    cpf = func["CPF"]
+    cpf_limpo = item["cpf_limpo"]
+    nome = func["NOME"]
+    registro = item["registro"]
+    if prazo is not None and time.time() + item.get("custo_previsto_s", 0) > prazo:
+        # Nada falhou: fica fora do manifest (so em metricas["orcamento"]) e volta na proxima execucao.
+        logger.warn(
+            f"Orcamento de tempo esgotado; {nome} adiado.",
+            details={"cpf": cpf_limpo, "custo_previsto_s": item.get("custo_previsto_s")},
+        )
+        registro["adiado_orcamento"] = True
+        item["classificar_foto"] = False
+        return item
+    logger.info(f"Iniciando cadastro de {nome} ({cpf})", details={"funcionario": nome, "cpf": cpf})
+
+    try:
+        action = cadastrar_funcionario(
+            page,
+            func,
+            output_manager,
+            registro["foto_path"],
+            contrato_chave=chave,
+            foto_reduzida=item.get("foto_reduzida"),
+        )
+    except Exception as e:
+        logger.error(f"Falha ao cadastrar {nome}: {e}", details={"cpf": cpf, "erro": str(e)})
+        registro["attempted"] = False
+        registro["action_saved"] = False
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = str(e)
+
+        try:
+            page.goto("https://portal.metax.ind.br/", timeout=5000)
+        except Exception:
+            pass
+        return item
+
+    # Blindagem do contrato de retorno do action
+    if not isinstance(action, dict):
+        action = {"attempted": False, "saved": False, "no_photo": False, "error": "Retorno invalido", "detail": ""}
+    action = {
+        "attempted": bool(action.get("attempted", False)),
+        "saved": bool(action.get("saved", False)),
+        "no_photo": bool(action.get("no_photo", False)),
+        "error": str(action.get("error", "")),
+        "detail": str(action.get("detail", "")),
+    }
+
+    registro["attempted"] = action["attempted"]
+    registro["action_saved"] = action["saved"]
+    if action.get("no_photo"):
+        registro["no_photo"] = True
+    if registro["attempted"]:
+        chaves_processadas_no_run.update(chaves_do_funcionario(func))
+        cpfs_processados_no_run.add(cpf_limpo)
+
+    if registro["action_saved"] and verificacao_lote:
+        registro["timestamps"]["saved_at"] = datetime.now().isoformat()
+        # Provisorio ate a varredura: se o processo cair antes dela, o journal ja tem o salvo.
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_SAVED_NOT_VERIFIED
+        registro["errors"]["verification_error"] = "Verificacao em lote pendente."
+        registro["verificacao_lote_pendente"] = True
+        item["verificacao_pendente"] = True
+    elif registro["action_saved"]:
+        registro["timestamps"]["saved_at"] = datetime.now().isoformat()
+        logger.info(f"[VERIFY] start cpf={cpf_limpo}, nome={nome}")
+        try:
+            verificado, detalhe = verificar_cadastro(page, func, output_manager)
+        except Exception as e:
+            verificado, detalhe = False, f"Erro na verificacao: {e}"
+        logger.info(f"[VERIFY] result cpf={cpf_limpo} verified={bool(verificado)} detail={detalhe}")
+
+        registro["verified"] = bool(verificado)
+        if verificado:
+            registro["timestamps"]["verified_at"] = datetime.now().isoformat()
+            registro["status_final"] = "SUCCESS"
+            registro["outcome"] = OUTCOME_VERIFIED_SUCCESS
+            rascunhos_existentes.add(cpf_limpo)
+            logger.info("Cache de rascunhos atualizado.", details={"cpf": cpf_limpo})
+        else:
+            logger.warn(f"Verificacao falhou para {nome}: {detalhe}", details={"cpf": cpf, "motivo": detalhe})
+            registro["status_final"] = "FAILED"
+            if detalhe and detalhe.lower().startswith("erro na verificacao"):
+                registro["outcome"] = OUTCOME_FAILED_VERIFICATION
+            else:
+                registro["outcome"] = OUTCOME_SAVED_NOT_VERIFIED
+            registro["errors"]["verification_error"] = detalhe or "CPF nao encontrado na lista de rascunhos."
+            item["inconsistente"] = True
+    else:
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = action.get("error") or "Falha ao salvar rascunho."
+    return item
+
+
+def _etapa_relocar(
+    item: dict,
+    *,
+    manifest: dict,
+    execution_id: str,
+    started_at: datetime,
+    inconsistentes: list[str],
+    journal: JournalExecucao | None = None,
+    pendentes_verificacao: list[dict] | None = None,
+    fila: FilaCompartilhada | None = None,
+):
+    """
+    Registra no manifest e move a foto conforme o status (worker unico: sem disputa no
+    manifest). Adiados pelo orcamento nao entram no manifest nem no journal.
+    """
+    registro = item["registro"]
+    if item.pop("verificacao_pendente", False) and pendentes_verificacao is not None:
+        # Finalizado depois da varredura em lote; o journal ja guarda o salvo provisorio.
+        pendentes_verificacao.append(item)
+        if journal is not None:
+            journal.registrar_pessoa(registro)
+        return None
+    foto_reduzida = item.get("foto_reduzida")
+    if foto_reduzida and foto_reduzida != registro["foto_path"] and os.path.exists(foto_reduzida):
+        try:
+            os.remove(foto_reduzida)
+        except OSError:
+            pass
+    if registro.get("adiado_orcamento"):
+        if fila is not None:
+            fila.liberar(item["cpf_limpo"])
+        return None
+    manifest["people"].append(registro)
+    if item.get("inconsistente"):
+        inconsistentes.append(item["cpf_limpo"])
+    if item["classificar_foto"]:
+        registro["foto_path"] = _classificar_foto_pos_processamento(
+            registro["foto_path"], registro["status_final"], execution_id, started_at
+        )
+        registro["foto_publica_path"] = registro["foto_path"]
+    if journal is not None:
+        journal.registrar_pessoa(registro)
+    if fila is not None:
+        # Falha volta para a fila: outra maquina (ou a proxima execucao) tenta de novo.
+        if registro["outcome"] in OUTCOMES_CONCLUIDOS:
+            fila.concluir(item["cpf_limpo"], registro)
+        else:
+            fila.liberar(item["cpf_limpo"])
+    return None
+
+
+def _erro_no_item(nome_estagio: str, funcao):
+    """Guarda no item a excecao do estagio (o pipeline so conta o erro e encerra o item)."""
+
+    def _executar(item: dict, *recurso):
+        try:
+            return funcao(item, *recurso)
+        except Exception as e:
+            item["erro_pipeline"] = f"Falha inesperada no estagio {nome_estagio}: {e}"
+            raise
+
+    return _executar
+
+
+def _reconciliar_itens(
+    itens: list[dict],
+    chave: str,
+    manifest: dict,
+    journal: JournalExecucao | None = None,
+    fila: FilaCompartilhada | None = None,
+) -> int:
+    """
+    Quem entrou no pipeline e nao chegou ao manifest (excecao em algum estagio) entra
+    como FAILED_ACTION com o erro, no journal e de volta a fila. Retorna quantos.
+    """
+    no_manifest = {id(registro) for registro in manifest["people"]}
+    recuperados = 0
+    for item in itens:
+        registro = item.get("registro")
+        if item.get("descartado") or (
+            registro is not None and (id(registro) in no_manifest or registro.get("adiado_orcamento"))
+        ):
+            continue
+        func = item["func"]
+        cpf_limpo = "".join(filter(str.isdigit, str(func["CPF"])))
+        if registro is None:
+            registro = _criar_registro_base(func["NOME"], cpf_limpo, datetime.now().isoformat())
+            registro["dados_funcionario"] = _snapshot_funcionario(func)
+            registro["contrato_chave"] = chave
+        erro = item.get("erro_pipeline") or "Pessoa nao concluiu o pipeline do contrato."
+        logger.error(f"{func['NOME']} perdido no pipeline; registrado como falha.", details={"cpf": cpf_limpo, "error": erro})
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = erro
+        manifest["people"].append(registro)
+        recuperados += 1
+        try:
+            if journal is not None:
+                journal.registrar_pessoa(registro)
+            if fila is not None:
+                fila.liberar(cpf_limpo)
+        except Exception as e:
+            logger.warn("Falha ao registrar pessoa reconciliada", details={"cpf": cpf_limpo, "error": str(e)})
+    return recuperados
+
+
+def _agendar_grupo(chave: str, funcs_grupo: list[dict], fotos_cache: dict[str, str | None]) -> list[tuple[dict, int]]:
+    """Ordena o grupo por custo previsto (agendador.py) com CEPs ja buscados e falhas do ledger."""
+    cpfs = ["".join(filter(str.isdigit, str(func["CPF"]))) for func in funcs_grupo]
+    ultimos_outcomes = {}
+    ceps_conhecidos = {}
+    try:
+        if os.getenv("METAX_LEDGER", "1") == "1":
+            ultimos_outcomes = {cpf: e["outcome"] for cpf, e in consultar_ledger(LEDGER_PATH, cpfs).items()}
+        ceps_conhecidos = consultar_ceps(CEP_CACHE_PATH, [func.get("CEP") for func in funcs_grupo])
+    except Exception as e:
+        logger.warn("Falha ao ler historico para o agendador", details={"contrato": chave, "error": str(e)})
+    ordem = ordenar_por_custo(funcs_grupo, ceps_conhecidos, ultimos_outcomes, fotos_cache)
+    logger.info(
+        "Grupo ordenado por custo previsto",
+        details={
+            "contrato": chave,
+            "funcionarios": len(ordem),
+            "custo_previsto_total_s": sum(custo for _, custo in ordem),
+            "ceps_conhecidos": len(ceps_conhecidos),
+            "falhas_anteriores": sum(1 for outcome in ultimos_outcomes.values() if outcome != OUTCOME_VERIFIED_SUCCESS),
+        },
+    )
+    return ordem
+
+
+def _verificar_cadastros_em_lote(page, pendentes: list[dict], rascunhos_existentes: set[str]):
+    """
+    Varredura unica da lista de rascunhos para todos os salvos do grupo (modo
+    --verificacao-em-lote), no lugar de uma recarga de CredenciamentoLista por pessoa.
+    """
+    logger.info("[VERIFY] varredura em lote", details={"salvos": len(pendentes)})
+    try:
+        cpfs_lista = obter_todos_rascunhos(page)
+        erro_varredura = None
+    except Exception as e:
+        cpfs_lista = set()
+        erro_varredura = f"Erro na verificacao em lote: {e}"
+        logger.error(erro_varredura, details={"salvos": len(pendentes)})
+    verificado_em = datetime.now().isoformat()
+    for item in pendentes:
+        registro = item["registro"]
+        cpf_limpo = item["cpf_limpo"]
+        verificado = erro_varredura is None and cpf_limpo in cpfs_lista
+        registro.pop("verificacao_lote_pendente", None)
+        registro["verified"] = verificado
+        if verificado:
+            registro["timestamps"]["verified_at"] = verificado_em
+            registro["status_final"] = "SUCCESS"
+            registro["outcome"] = OUTCOME_VERIFIED_SUCCESS
+            registro["errors"]["verification_error"] = ""
+            rascunhos_existentes.add(cpf_limpo)
+        else:
+            registro["status_final"] = "FAILED"
+            if erro_varredura:
+                registro["outcome"] = OUTCOME_FAILED_VERIFICATION
+                registro["errors"]["verification_error"] = erro_varredura
+            else:
+                registro["outcome"] = OUTCOME_SAVED_NOT_VERIFIED
+                registro["errors"]["verification_error"] = "CPF nao encontrado na lista de rascunhos."
+            item["inconsistente"] = True
+        logger.info(f"[VERIFY] result cpf={cpf_limpo} verified={verificado} (lote)")
+
+
+def _resolver_pendentes_resume(
+    funcs_grupo: list[dict],
+    pendentes_resume: dict[str, dict],
+    rascunhos_existentes: set[str],
+    *,
+    manifest: dict,
+    chaves_processadas_no_run: set[tuple[str, str]],
+    cpfs_processados_no_run: set[str],
+    journal: JournalExecucao | None = None,
+    fila: FilaCompartilhada | None = None,
+) -> list[dict]:
+    """
+    --resume com salvos que aguardavam a verificacao em lote quando o processo caiu:
+    confere cada um na varredura nova de rascunhos. Quem esta la vira VERIFIED_SUCCESS;
+    quem nao esta volta para o grupo e e cadastrado de novo. Retorna o grupo restante.
+    """
+    restantes = []
+    for func in funcs_grupo:
+        cpf_limpo = "".join(filter(str.isdigit, str(func["CPF"])))
+        registro = pendentes_resume.get(cpf_limpo)
+        if registro is None or cpf_limpo not in rascunhos_existentes:
+            if registro is not None:
+                logger.warn(f"Salvo pendente de {func['NOME']} nao esta nos rascunhos; cadastro refeito.", details={"cpf": cpf_limpo})
+            restantes.append(func)
+            continue
+        registro.pop("verificacao_lote_pendente", None)
+        registro["verified"] = True
+        registro["timestamps"]["verified_at"] = datetime.now().isoformat()
+        registro["status_final"] = "SUCCESS"
+        registro["outcome"] = OUTCOME_VERIFIED_SUCCESS
+        registro["errors"]["verification_error"] = ""
+        manifest["people"].append(registro)
+        chaves_processadas_no_run.update(chaves_do_funcionario(func))
+        cpfs_processados_no_run.add(cpf_limpo)
+        if journal is not None:
+            journal.registrar_pessoa(registro)
+        if fila is not None:
+            fila.concluir(cpf_limpo, registro)
+        logger.info(f"[VERIFY] result cpf={cpf_limpo} verified=True (resume)")
+    return restantes
+
+
+def _processar_grupo_contrato(
+    page,
+    chave: str,
+    funcs_grupo: list[dict],
+    rascunhos_existentes: set[str],
+    *,
+    manifest: dict,
+    output_manager: OutputManager,
+    execution_id: str,
+    started_at: datetime,
+    fotos_cache: dict[str, str | None],
+    chaves_processadas_no_run: set[tuple[str, str]],
+    cpfs_processados_no_run: set[str],
+    telemetria_sql: TelemetriaSQL,
+    duas_fases: bool,
+    paginas_paralelas: int = 1,
+    headless: bool = False,
+    journal: JournalExecucao | None = None,
+    verificacao_lote: bool = False,
+    agendar: bool = False,
+    prazo: float | None = None,
+    fila: FilaCompartilhada | None = None,
+    pendentes_resume: dict[str, dict] | None = None,
+) -> bool:
+    """
+    Processa um grupo de contrato com a sessao ja aberta nesse contrato, em pipeline:
+    classificar -> foto (download/reducao em threads) -> portal (browser) -> relocar/manifest.
+    rascunhos_existentes e atualizado com os CPFs verificados (reaproveitado entre janelas
+    do backfill). Com paginas_paralelas > 1 o estagio do portal ganha paginas extras
+    abertas do storage_state da sessao logada. Com verificacao_lote os salvos sao
+    verificados juntos numa unica leitura da lista de rascunhos ao fim do pipeline.
+    Com agendar o grupo segue a ordem de custo previsto em vez da admissao (o estagio de
+    foto entrega ao portal nessa mesma ordem). Com fila, so segue quem esta execucao
+    reivindicar na fila compartilhada entre maquinas. Excecao inesperada num estagio vira
+    FAILED_ACTION da pessoa. pendentes_resume sao salvos do --resume ainda sem
+    verificacao, conferidos contra rascunhos_existentes (varredura nova) antes do pipeline.
+    Retorna True se algum cadastro ficou inconsistente.
+    """
+    if pendentes_resume:
+        funcs_grupo = _resolver_pendentes_resume(
+            funcs_grupo,
+            pendentes_resume,
+            rascunhos_existentes,
+            manifest=manifest,
+            chaves_processadas_no_run=chaves_processadas_no_run,
+            cpfs_processados_no_run=cpfs_processados_no_run,
+            journal=journal,
+            fila=fila,
+        )
+    falha_detalhe = None
+    cpfs_sem_detalhe: set[str] = set()
+    if duas_fases:
+        pendentes = [
+            func for func in funcs_grupo
+            if "".join(filter(str.isdigit, str(func["CPF"]))) not in rascunhos_existentes
+            and "".join(filter(str.isdigit, str(func["CPF"]))) not in cpfs_processados_no_run
+        ]
+        logger.info(
+            "Detalhe RM apenas para pendentes",
+            details={"contrato": chave, "grupo": len(funcs_grupo), "pendentes": len(pendentes)},
+        )
+        try:
+            sem_detalhe = buscar_detalhes_funcionarios(pendentes, telemetria_sql)
+            # So com as colunas-chave o formulario quebra no meio ou salva rascunho incompleto.
+            cpfs_sem_detalhe = {"".join(filter(str.isdigit, str(f["CPF"]))) for f in sem_detalhe}
+            if sem_detalhe:
+                logger.warn(
+                    "Funcionarios sem detalhe no RM (fora do filtro entre as fases)",
+                    details={"cpfs": sorted(cpfs_sem_detalhe)},
+                )
+        except Exception as e:
+            falha_detalhe = f"Falha ao buscar detalhes no RM: {e}"
+            logger.error(falha_detalhe, details={"contrato": chave, "error": str(e)})
+
+    preflight = {}
+    if falha_detalhe is None and os.getenv("METAX_PREFLIGHT", "1") == "1":
+        # Depois do detalhe RM (duas fases) e antes de qualquer formulario; quem ja esta
+        # nos rascunhos continua SKIPPED mesmo com dado invalido.
+        fora_do_preflight = rascunhos_existentes | cpfs_sem_detalhe
+        preflight = validar_lote(
+            [func for func in funcs_grupo if "".join(filter(str.isdigit, str(func["CPF"]))) not in fora_do_preflight]
+        )
+        resumo_preflight = {
+            "reprovados": sum(1 for a in preflight.values() if a["erros"]),
+            "com_alertas": sum(1 for a in preflight.values() if a["alertas"]),
+        }
+        manifest.setdefault("run_context", {}).setdefault("preflight", {})[chave] = resumo_preflight
+        logger.info("Pre-validacao offline do grupo", details={"contrato": chave, **resumo_preflight})
+
+    if agendar and falha_detalhe is None:
+        ordem = _agendar_grupo(chave, funcs_grupo, fotos_cache)
+    else:
+        ordem = [(func, 0) for func in funcs_grupo]
+    itens = [{"func": func, "custo_previsto_s": custo} for func, custo in ordem]
+    for item in itens:
+        if "".join(filter(str.isdigit, str(item["func"]["CPF"]))) in cpfs_sem_detalhe:
+            item["falha_detalhe"] = "Sem detalhe no RM entre as fases (saiu do filtro apos a consulta de chaves)."
+
+    paginas = max(1, min(int(paginas_paralelas or 1), len(funcs_grupo)))
+    storage_state = exportar_estado_sessao(page) if paginas > 1 else None
+
+    def _abrir_pagina(indice: int) -> dict:
+        # Pagina 0 e a sessao ja aberta (thread atual); extras sobem do storage_state.
+        if indice == 0:
+            return {"page": page, "p": None, "browser": None}
+        p, browser, pagina = abrir_sessao_com_estado(storage_state, headless=headless)
+        return {"page": pagina, "p": p, "browser": browser}
+
+    def _fechar_pagina(sessao: dict):
+        if sessao["p"] is not None:
+            _fechar_sessao(sessao["p"], sessao["browser"])
+
+    inconsistentes: list[str] = []
+    pendentes_verificacao: list[dict] = []
+    estagios = [
+        Estagio(
+            "classificar",
+            partial(
+                _etapa_classificar,
+                chave=chave,
+                rascunhos_existentes=rascunhos_existentes,
+                falha_detalhe=falha_detalhe,
+                chaves_processadas_no_run=chaves_processadas_no_run,
+                cpfs_processados_no_run=cpfs_processados_no_run,
+                cpfs_no_grupo=set(),
+                fotos_cache=fotos_cache,
+                preflight=preflight,
+                fila=fila,
+            ),
+        ),
+        Estagio(
+            "foto",
+            partial(_etapa_foto, fotos_cache=fotos_cache),
+            workers=int(os.getenv("METAX_PIPELINE_FOTO_WORKERS", "4")),
+            manter_ordem=True,
+        ),
+        Estagio(
+            "portal",
+            partial(
+                _etapa_portal,
+                chave=chave,
+                output_manager=output_manager,
+                rascunhos_existentes=rascunhos_existentes,
+                chaves_processadas_no_run=chaves_processadas_no_run,
+                cpfs_processados_no_run=cpfs_processados_no_run,
+                verificacao_lote=verificacao_lote,
+                prazo=prazo,
+            ),
+            workers=paginas,
+            na_thread_atual=True,
+            abrir_worker=_abrir_pagina,
+            fechar_worker=_fechar_pagina,
+        ),
+        Estagio(
+            "relocar",
+            partial(
+                _etapa_relocar,
+                manifest=manifest,
+                execution_id=execution_id,
+                started_at=started_at,
+                inconsistentes=inconsistentes,
+                journal=journal,
+                pendentes_verificacao=pendentes_verificacao if verificacao_lote else None,
+                fila=fila,
+            ),
+        ),
+    ]
+    for estagio in estagios:
+        estagio.funcao = _erro_no_item(estagio.nome, estagio.funcao)
+    if paginas > 1:
+        logger.info("Cadastro com paginas paralelas", details={"paginas": paginas, "funcionarios": len(funcs_grupo)})
+    metricas = executar_pipeline(
+        iter(itens),
+        estagios,
+        capacidade=int(os.getenv("METAX_PIPELINE_FILA", "8")),
+    )
+    if pendentes_verificacao:
+        started = time.perf_counter()
+        _verificar_cadastros_em_lote(page, pendentes_verificacao, rascunhos_existentes)
+        for item in pendentes_verificacao:
+            try:
+                _etapa_relocar(
+                    item,
+                    manifest=manifest,
+                    execution_id=execution_id,
+                    started_at=started_at,
+                    inconsistentes=inconsistentes,
+                    journal=journal,
+                    fila=fila,
+                )
+            except Exception as e:
+                item["erro_pipeline"] = f"Falha inesperada ao registrar apos verificacao em lote: {e}"
+        metricas["verificacao_lote"] = {
+            "itens": len(pendentes_verificacao),
+            "ocupado_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    recuperados = _reconciliar_itens(itens, chave, manifest, journal, fila)
+    if recuperados:
+        metricas["reconciliados"] = {"itens": recuperados}
+    if CEPS_CONSULTADOS:
+        try:
+            gravar_ceps(CEP_CACHE_PATH, dict(CEPS_CONSULTADOS))
+        except Exception as e:
+            logger.warn("Falha ao gravar cache de CEPs", details={"path": CEP_CACHE_PATH, "error": str(e)})
+    adiados = [
+        {
+            "cpf": item["cpf_limpo"],
+            "nome": item["func"]["NOME"],
+            "DATAADMISSAO": _serializar_valor_manifest(item["func"].get("DATAADMISSAO")),
+            "custo_previsto_s": item.get("custo_previsto_s"),
+        }
+        for item in itens
+        if (item.get("registro") or {}).get("adiado_orcamento")
+    ]
+    if adiados:
+        metricas["orcamento"] = {"adiados": len(adiados), "pessoas": adiados}
+        logger.warn(
+            "Funcionarios adiados por orcamento de tempo",
+            details={"contrato": chave, "cpfs": [adiado["cpf"] for adiado in adiados]},
+        )
+    manifest.setdefault("run_context", {}).setdefault("pipeline", {})[chave] = metricas
+    logger.info("Pipeline do contrato concluido", details={"contrato": chave, "estagios": metricas})
+    return bool(inconsistentes)
+
+
+def _registrar_falha_contrato(funcs: list[dict], chave: str, erro: str, manifest: dict, cpfs_no_manifest: set[str]):
+    """Quem do grupo nao voltou no manifest parcial (processo do contrato caiu) entra como FAILED_ACTION."""
+    for func in funcs:
+        cpf_limpo = "".join(filter(str.isdigit, str(func["CPF"])))
+        if cpf_limpo in cpfs_no_manifest:
+            continue
+        registro = _criar_registro_base(func["NOME"], cpf_limpo, datetime.now().isoformat())
+        registro["dados_funcionario"] = _snapshot_funcionario(func)
+        registro["contrato_chave"] = chave
+        registro["status_final"] = "FAILED"
+        registro["outcome"] = OUTCOME_FAILED_ACTION
+        registro["errors"]["action_error"] = erro
+        manifest["people"].append(registro)
+
+
+def _pendentes_do_grupo(pendentes_resume: dict[str, dict] | None, funcs_grupo: list[dict]) -> dict[str, dict]:
+    """Tira de pendentes_resume os salvos pendentes que pertencem a este grupo."""
+    if not pendentes_resume:
+        return {}
+    cpfs = {"".join(filter(str.isdigit, str(func["CPF"]))) for func in funcs_grupo}
+    return {cpf: pendentes_resume.pop(cpf) for cpf in cpfs & set(pendentes_resume)}
+
+
+def _processar_contrato_em_processo(tarefa: dict) -> dict:
+    """
+    Worker do modo --contratos-paralelos (processo proprio, spawn): abre a sessao do
+    contrato, processa o grupo e devolve o manifest parcial. Log em arquivo separado
+    (execution_id com sufixo do contrato) para nao disputar o JSONL do processo principal.
+    """
+    chave = tarefa["chave"]
+    execution_id = tarefa["execution_id"]
+    started_at = tarefa["started_at"]
+    output_manager = OutputManager(
+        execution_id=execution_id,
+        object_name=OBJECT_NAME,
+        public_base_dir=PUBLIC_BASE_DIR,
+        local_root=ROOT_DIR,
+        started_at=started_at,
+    )
+    logger.configure(
+        output_manager,
+        f"{execution_id}__{chave.lower()}",
+        started_at,
+        log_level=tarefa["log_level"],
+        robot_name=OBJECT_NAME,
+        robot_version=tarefa["robot_version"],
+        environment_name=tarefa["environment_name"],
+    )
+    manifest_parcial = {"execution_id": execution_id, "contrato_chave": chave, "people": []}
+    chaves_processadas: set[tuple[str, str]] = set()
+    cpfs_processados = set(tarefa["cpfs_processados_no_run"])
+    telemetria_sql = TelemetriaSQL(capturar_estatisticas=tarefa["sql_stats"])
+    resultado = {"chave": chave, "inconsistente": False, "erro": None, "log_filename": logger.log_filename}
+    started = time.perf_counter()
+    p = browser = None
+    journal = JournalExecucao(caminho_journal(tarefa["journal_dir"], execution_id, chave.lower()))
+    fila = None
+    if tarefa["fila_dir"]:
+        fila = FilaCompartilhada(tarefa["fila_dir"], tarefa["maquina"], execution_id)
+        fila.iniciar_heartbeat()
+    try:
+        contrato_value, contrato_label = _exigir_contrato_config(chave)
+        logger.info(f"Iniciando sessao para contrato {chave} (processo {os.getpid()})...")
+        p, browser, page = iniciar_sessao(
+            headless=tarefa["headless"],
+            contrato_value=contrato_value,
+            contrato_label=contrato_label,
+            estado_sessao_dir=tarefa["estado_sessao_dir"],
+        )
+        rascunhos = tarefa["rascunhos_journal"]
+        if rascunhos is None:
+            rascunhos = obter_todos_rascunhos(page)
+            journal.registrar_rascunhos(chave, rascunhos)
+        resultado["inconsistente"] = _processar_grupo_contrato(
+            page,
+            chave,
+            tarefa["funcs"],
+            rascunhos,
+            manifest=manifest_parcial,
+            output_manager=output_manager,
+            execution_id=execution_id,
+            started_at=started_at,
+            fotos_cache={},
+            chaves_processadas_no_run=chaves_processadas,
+            cpfs_processados_no_run=cpfs_processados,
+            telemetria_sql=telemetria_sql,
+            duas_fases=tarefa["duas_fases"],
+            paginas_paralelas=tarefa["paginas_paralelas"],
+            headless=tarefa["headless"],
+            journal=journal,
+            verificacao_lote=tarefa["verificacao_lote"],
+            agendar=tarefa["agendar"],
+            prazo=tarefa["prazo"],
+            fila=fila,
+            pendentes_resume=tarefa["pendentes_resume"],
+        )
+    except Exception as e:
+        resultado["erro"] = f"Falha no processo do contrato {chave}: {e}"
+        logger.error(resultado["erro"], details={"contrato": chave, "error": str(e)})
+    finally:
+        try:
+            _fechar_sessao(p, browser)
+        except Exception as e:
+            logger.warn("Falha ao fechar navegador do contrato", details={"contrato": chave, "error": str(e)})
+        POOL_SQL.fechar()
+        journal.fechar()
+        if fila is not None:
+            fila.fechar()
+            resultado["fila"] = fila.contagem
+        resultado["timeouts_portal"] = gravar_timeouts_adaptativos()
+        _persistir_manifest(
+            output_manager,
+            manifest_parcial,
+            f"{_nome_base_execucao(started_at, 'running')}__manifest_contrato_{chave.lower()}.json",
+        )
+        logger.flush()
+    resultado.update(
+        {
+            "people": manifest_parcial["people"],
+            "chaves_processadas": chaves_processadas,
+            "cpfs_processados": cpfs_processados,
+            "sql_telemetria": telemetria_sql.como_dict(),
+            "pipeline": manifest_parcial.get("run_context", {}).get("pipeline"),
+            "duracao_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+    return resultado
+
+
+def _processar_contratos_em_processos(
+    chaves: list[str],
+    grupos: dict[str, list[dict]],
+    *,
+    manifest: dict,
+    execution_id: str,
+    started_at: datetime,
+    args,
+    robot_version: str,
+    environment_name: str,
+    chaves_processadas_no_run: set[tuple[str, str]],
+    cpfs_processados_no_run: set[str],
+    duas_fases: bool,
+    rascunhos_journal: dict[str, set[str]] | None = None,
+    prazo: float | None = None,
+    fila_dir: str | None = None,
+    pendentes_resume: dict[str, dict] | None = None,
+) -> bool:
+    """
+    Um processo por contrato, com login/CAPTCHA e cadastro simultaneos. Os manifests
+    parciais voltam pelo resultado do processo e sao mesclados no manifest da execucao.
+    Retorna True se algum contrato ficou inconsistente.
+    """
+    for chave in chaves:
+        _exigir_contrato_config(chave)
+    tarefas = [
+        {
+            "chave": chave,
+            "funcs": grupos[chave],
+            "execution_id": execution_id,
+            "started_at": started_at,
+            "headless": args.headless,
+            "log_level": args.log_level,
+            "robot_version": robot_version,
+            "environment_name": environment_name,
+            "sql_stats": args.sql_stats,
+            "duas_fases": duas_fases,
+            "paginas_paralelas": args.paginas_paralelas,
+            "verificacao_lote": args.verificacao_em_lote,
+            "agendar": os.getenv("METAX_AGENDADOR", "1") == "1",
+            "prazo": prazo,
+            "fila_dir": fila_dir,
+            "maquina": socket.gethostname(),
+            "estado_sessao_dir": _estado_sessao_dir(args),
+            "journal_dir": JOURNAL_DIR,
+            "rascunhos_journal": (rascunhos_journal or {}).get(chave),
+            "pendentes_resume": _pendentes_do_grupo(pendentes_resume, grupos[chave]),
+            "cpfs_processados_no_run": set(cpfs_processados_no_run),
+        }
+        for chave in chaves
+    ]
+    logger.info("Processando contratos em processos paralelos", details={"contratos": chaves})
+    inconsistente = False
+    resumo = manifest["run_context"].setdefault("contratos_paralelos", {})
+    # spawn: mesmo comportamento no Windows (padrao) e no Linux, sem herdar Playwright/pyodbc do pai.
+    with ProcessPoolExecutor(max_workers=len(tarefas), mp_context=multiprocessing.get_context("spawn")) as executor:
+        futuros = {executor.submit(_processar_contrato_em_processo, tarefa): tarefa for tarefa in tarefas}
+        for futuro in as_completed(futuros):
+            tarefa = futuros[futuro]
+            chave = tarefa["chave"]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultado = {"chave": chave, "inconsistente": False, "erro": f"Processo do contrato {chave} encerrou: {e}"}
+            people = resultado.get("people") or []
+            manifest["people"].extend(people)
+            chaves_processadas_no_run.update(resultado.get("chaves_processadas") or set())
+            cpfs_processados_no_run.update(resultado.get("cpfs_processados") or set())
+            if resultado.get("erro"):
+                logger.error(resultado["erro"], details={"contrato": chave})
+                _registrar_falha_contrato(
+                    tarefa["funcs"], chave, resultado["erro"], manifest, {person.get("cpf") for person in people}
+                )
+            if resultado.get("inconsistente"):
+                inconsistente = True
+            if resultado.get("fila"):
+                contagem_fila = manifest["run_context"].setdefault("fila", {}).setdefault("contagem", {})
+                for campo, valor in resultado["fila"].items():
+                    contagem_fila[campo] = contagem_fila.get(campo, 0) + valor
+            resumo[chave] = {
+                "funcionarios": len(tarefa["funcs"]),
+                "people": len(people),
+                "erro": resultado.get("erro"),
+                "duracao_ms": resultado.get("duracao_ms"),
+                "log_filename": resultado.get("log_filename"),
+                "sql_telemetria": resultado.get("sql_telemetria"),
+                "pipeline": resultado.get("pipeline"),
+            }
+            logger.info(f"Contrato {chave} concluido no processo paralelo", details=resumo[chave])
+    return inconsistente
+
+
+def _adiados_orcamento(run_context: dict) -> list[dict]:
+    """Adiados pelo orcamento em todos os contratos (pipeline local e processos por contrato)."""
+    metricas_contratos = list((run_context.get("pipeline") or {}).values())
+    metricas_contratos += [
+        resumo.get("pipeline") or {} for resumo in (run_context.get("contratos_paralelos") or {}).values()
+    ]
+    return [pessoa for metricas in metricas_contratos for pessoa in (metricas.get("orcamento") or {}).get("pessoas", [])]
+
+
+def _gravar_resultado_particao(manifest: dict):
+    """Resumo para o launcher de obras (METAX_RESULTADO_PATH), lido apos o fim do processo."""
+    resultado_path = os.getenv("METAX_RESULTADO_PATH")
+    if not resultado_path:
+        return
+    run_context = manifest.get("run_context", {})
+    resultado = {
+        "obra": run_context.get("obra"),
+        "execution_id": run_context.get("execution_id"),
+        "run_status": run_context.get("run_status"),
+        "started_at": run_context.get("started_at"),
+        "finished_at": run_context.get("finished_at"),
+        "duration_sec": run_context.get("duration_sec"),
+        "manifest_path": run_context.get("manifest_path"),
+        "report_path": run_context.get("report_path"),
+        "totals": manifest.get("totals"),
+    }
+    try:
+        os.makedirs(os.path.dirname(resultado_path) or ".", exist_ok=True)
+        with open(resultado_path, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+    except Exception as e:
+        logger.warn("Falha ao gravar resultado da particao", details={"path": resultado_path, "error": str(e)})
+
+
+def _estado_sessao_dir(args) -> str | None:
+    """Diretorio das sessoes salvas do portal, ou None para sempre fazer login completo."""
+    if args.novo_login or os.getenv("METAX_SESSAO_PERSISTIDA", "1") != "1":
+        return None
+    return SESSAO_PORTAL_DIR
+
+
 def _parse_args():
     parser = argparse.ArgumentParser(description="RPA MetaXg")
     parser.add_argument("--txt", dest="txt_path", help="Caminho do TXT para modo manual")
     parser.add_argument("--dry-run", action="store_true", help="Nao envia e-mail (somente relatórios)")
     parser.add_argument("--no-email", action="store_true", help="Nao envia e-mail")
+    parser.add_argument(
+        "--full-window",
+        action="store_true",
+        help="Ignora o watermark incremental e consulta toda a janela de DIAS_RETROATIVOS",
+    )
+    parser.add_argument(
+        "--refresh-sql-cache",
+        action="store_true",
+        help="Descarta o snapshot local da query RM e consulta o SQL Server",
+    )
+    parser.add_argument(
+        "--sql-stats",
+        action="store_true",
+        default=os.getenv("METAX_SQL_STATS", "0") == "1",
+        help="Captura SET STATISTICS IO, TIME da query RM na telemetria do manifest",
+    )
+    parser.add_argument(
+        "--ignore-ledger",
+        action="store_true",
+        help="Nao filtra pelo ledger de outcomes (reprocessa quem ja foi concluido)",
+    )
+    parser.add_argument(
+        "--backfill",
+        nargs=2,
+        metavar=("DE", "ATE"),
+        help="Processa admissoes de DE a ATE (YYYY-MM-DD) em janelas, com checkpoint para retomar",
+    )
+    parser.add_argument(
+        "--backfill-dias",
+        type=int,
+        default=int(os.getenv("METAX_BACKFILL_DIAS", "7")),
+        help="Tamanho (dias) de cada janela do backfill",
+    )
+    parser.add_argument(
+        "--contratos-paralelos",
+        action="store_true",
+        default=os.getenv("METAX_CONTRATOS_PARALELOS", "0") == "1",
+        help="Processa MECANICA e ELETROMECANICA ao mesmo tempo, um processo por contrato",
+    )
+    parser.add_argument(
+        "--paginas-paralelas",
+        type=int,
+        default=int(os.getenv("METAX_PAGINAS_PARALELAS", "1")),
+        help="Paginas do portal cadastrando ao mesmo tempo por contrato (mesmo login)",
+    )
+    parser.add_argument(
+        "--verificacao-em-lote",
+        action="store_true",
+        default=os.getenv("METAX_VERIFICACAO_LOTE", "0") == "1",
+        help="Verifica os cadastros salvos numa unica varredura de rascunhos ao fim de cada contrato",
+    )
+    parser.add_argument(
+        "--orcamento-min",
+        type=int,
+        default=int(os.getenv("METAX_ORCAMENTO_MIN", "0")),
+        help="Orcamento de tempo da execucao em minutos; quem nao couber fica para a proxima (0 = sem limite)",
+    )
+    parser.add_argument(
+        "--fila",
+        metavar="NOME",
+        default=os.getenv("METAX_FILA") or None,
+        help="Fila compartilhada na pasta publica: varias maquinas dividem os funcionarios da mesma janela",
+    )
+    parser.add_argument(
+        "--novo-login",
+        action="store_true",
+        help="Ignora a sessao salva do portal e faz login completo (CAPTCHA)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="EXECUTION_ID",
+        help="Retoma uma execucao interrompida pelo journal (use os mesmos argumentos de modo da execucao original)",
+    )
     parser.add_argument("--headless", action="store_true", help="Executa browser em modo headless")
     parser.add_argument("--log-level", default=os.getenv("METAX_LOG_LEVEL", "INFO"), help="INFO|DEBUG|WARN|ERROR")
     return parser.parse_args()
@@ -756,7 +2155,8 @@ def _parse_args():
 
 def main():
     args = _parse_args()
-    execution_id = str(uuid.uuid4())
+    # --resume continua a execucao interrompida com o mesmo execution_id (mesmo journal).
+    execution_id = args.resume or str(uuid.uuid4())
     started_at = datetime.now()
     robot_version = _read_robot_version()
     environment_name = os.getenv("METAX_ENV", "Producao")
@@ -802,6 +2202,7 @@ def main():
         "environment": {
             "cwd": ROOT_DIR,
         },
+        "obra": NUMERO_OBRA,
     }
 
     manifest = {
@@ -820,293 +2221,458 @@ def main():
     inconsistente = False
     funcionarios = []
     sql_error = None
+    sessao_antecipada = None
+    sessoes: dict[str, dict] = {}
+    ledger_habilitado = os.getenv("METAX_LEDGER", "1") == "1"
+    journal = None
+    fila = None
     try:
+        backfill_janelas: list = []
+        backfill_checkpoint = None
+        if args.backfill:
+            backfill_inicio, backfill_fim = (parse_data_backfill(v) for v in args.backfill)
+            todas_janelas = dividir_periodo(backfill_inicio, backfill_fim, args.backfill_dias)
+            backfill_checkpoint = ler_checkpoint(BACKFILL_CHECKPOINT_PATH)
+            if not checkpoint_compativel(backfill_checkpoint, backfill_inicio, backfill_fim):
+                backfill_checkpoint = novo_checkpoint(backfill_inicio, backfill_fim, args.backfill_dias)
+            backfill_janelas = janelas_pendentes(todas_janelas, backfill_checkpoint)
+            run_context["backfill"] = {
+                "inicio": backfill_inicio.isoformat(),
+                "fim": backfill_fim.isoformat(),
+                "dias_por_janela": args.backfill_dias,
+                "total_janelas": len(todas_janelas),
+                "janelas_pendentes": len(backfill_janelas),
+                "janelas_processadas": 0,
+                "checkpoint_path": BACKFILL_CHECKPOINT_PATH,
+            }
+            logger.info("Modo backfill ativo", details=run_context["backfill"])
+
         txt_path = args.txt_path or os.path.join(PUBLIC_INPUTS_DIR, "cadastrar_metax.txt")
         lock_path = f"{txt_path}.lock"
-        if os.path.exists(txt_path):
+        if args.backfill:
+            logger.info("Modo backfill: fila TXT ignorada nesta execucao.")
+            entradas_txt = {}
+        elif os.path.exists(txt_path):
             lock_ok = _adquirir_lock(lock_path)
             if not lock_ok:
                 logger.warn("Arquivo TXT em uso (lock ativo). Rodando em modo normal (SQL).")
-                nomes_txt = []
+                entradas_txt = {}
             else:
-                _, nomes_txt = _carregar_txt_com_linhas(txt_path)
+                _, entradas_txt = carregar_entradas_txt(txt_path)
         else:
             logger.info("TXT público não encontrado; rodando modo normal (SQL).")
-            nomes_txt = []
+            entradas_txt = {}
 
         logger.ok("Preparacao inicial concluida.")
         logger.stage(2, 5, "Coleta de itens")
-        if nomes_txt:
-            logger.info("Modo TXT ativo: filtrando SQL por lista manual.")
-            try:
-                funcionarios = buscar_funcionarios_para_cadastro(filtro_nomes=nomes_txt)
-            except Exception as e:
-                sql_error = str(e)
-                logger.error("Falha ao buscar funcionarios", details={"error": sql_error})
-                funcionarios = []
+        if entradas_txt:
+            logger.info(
+                "Modo TXT ativo: filtrando SQL por lista manual.",
+                details={tipo.lower(): len(valores) for tipo, valores in entradas_txt.items()},
+            )
         else:
             logger.info("Modo normal: sem TXT, buscando via SQL padrao.")
-            try:
-                funcionarios = buscar_funcionarios_para_cadastro(filtro_nomes=None)
-            except Exception as e:
-                sql_error = str(e)
-                logger.error("Falha ao buscar funcionarios", details={"error": sql_error})
-                funcionarios = []
 
-        if not funcionarios:
-            logger.info("Nenhum funcionario encontrado para processar.")
+        watermark_atual = ler_watermark(WATERMARK_PATH)
+        data_inicio_minima = None
+        if not entradas_txt and not args.full_window and not args.backfill:
+            data_inicio_minima = data_inicio_incremental(
+                watermark_atual, int(os.getenv("METAX_WATERMARK_OVERLAP_DIAS", "1"))
+            )
+        run_context["watermark"] = {
+            "path": WATERMARK_PATH,
+            "atual": watermark_atual,
+            "full_window": bool(args.full_window),
+            "data_inicio_minima": data_inicio_minima.isoformat() if data_inicio_minima else None,
+            "novo": None,
+        }
+
+        if args.backfill and not backfill_janelas:
+            logger.info("Backfill ja concluido para o periodo informado (checkpoint).", details=run_context["backfill"])
             return
 
-        # Dedup por CPF para evitar processamento duplicado
-        unique_by_cpf: dict[str, dict] = {}
-        dup_count = 0
-        for func in funcionarios:
-            cpf = "".join(filter(str.isdigit, str(func.get("CPF", ""))))
-            if not cpf:
-                continue
-            if cpf in unique_by_cpf:
-                dup_count += 1
-                continue
-            unique_by_cpf[cpf] = func
-        if dup_count > 0:
-            logger.warn("Duplicatas removidas por CPF", details={"dup_count": dup_count})
-        funcionarios = list(unique_by_cpf.values())
+        if args.refresh_sql_cache:
+            removidos = invalidar_snapshots(RM_SNAPSHOT_PATH)
+            logger.info("Snapshot RM local invalidado", details={"removidos": removidos})
 
-        logger.info(f"Funcionarios a processar: {len(funcionarios)}", details={"total": len(funcionarios)})
-        logger.ok("Coleta de itens concluida.", details={"total": len(funcionarios)})
-        logger.stage(3, 5, "Processamento")
+        # Query RM na thread de coleta; login/CAPTCHA do primeiro contrato em paralelo nesta thread
+        # (Playwright sync fica preso a thread que o iniciou). Tempo total ~ max(query, login).
+        telemetria_sql = TelemetriaSQL(capturar_estatisticas=args.sql_stats)
+        sessao_paralela = os.getenv("METAX_SESSAO_PARALELA_SQL", "1") == "1"
+        # Duas fases: chaves leves agora, colunas completas so para quem passar pelo filtro de rascunhos.
+        duas_fases = os.getenv("METAX_SQL_DUAS_FASES", "1") == "1"
 
         # Download lazy por CPF: evita baixar foto de quem sera pulado por rascunho existente.
         fotos_cache: dict[str, str | None] = {}
-
-        grupos = {"MECANICA": [], "ELETROMECANICA": [], "DESCONHECIDO": []}
-        for func in funcionarios:
-            centro_custo = func.get("CENTRO_CUSTO")
-            chave = _classificar_contrato_por_centro_custo(centro_custo)
-            grupos[chave].append(func)
-
-        logger.info(
-            "Resumo por contrato (centro de custo)",
-            details={
-                "mecanica": len(grupos["MECANICA"]),
-                "eletromecanica": len(grupos["ELETROMECANICA"]),
-                "desconhecido": len(grupos["DESCONHECIDO"]),
-            },
-        )
-
-        nomes_processados_no_run = set()
+        # Chaves (NOME/CPF/CHAPA) tratadas no run; removem da fila TXT a linha que as pediu.
+        chaves_processadas_no_run: set[tuple[str, str]] = set()
         cpfs_processados_no_run = set()
-
-        if grupos["DESCONHECIDO"]:
-            for func in grupos["DESCONHECIDO"]:
-                cpf = func["CPF"]
-                cpf_limpo = "".join(filter(str.isdigit, str(cpf)))
-                nome = func["NOME"]
-                caminho_foto = None
-                centro_custo = func.get("CENTRO_CUSTO")
-                pessoa_started_at = datetime.now().isoformat()
-                registro = _criar_registro_base(nome, cpf_limpo, pessoa_started_at)
-                registro["dados_funcionario"] = _snapshot_funcionario(func)
-                registro["contrato_chave"] = _classificar_contrato_por_centro_custo(centro_custo)
-                registro["status_final"] = "FAILED"
-                registro["outcome"] = OUTCOME_FAILED_ACTION
-                registro["errors"]["action_error"] = f"Centro de custo desconhecido: {centro_custo}"
+        # No backfill as sessoes por contrato ficam abertas entre janelas; no modo normal
+        # cada uma fecha ao fim do seu grupo.
+        manter_sessoes = bool(args.backfill)
+        estado_sessao_dir = _estado_sessao_dir(args)
+        # Um processo por contrato. No backfill fica desligado: as sessoes abertas sao
+        # reaproveitadas entre janelas, o que nao se aplica a processos descartaveis.
+        contratos_paralelos = bool(args.contratos_paralelos) and not args.backfill
+        if args.contratos_paralelos and args.backfill:
+            logger.warn("--contratos-paralelos ignorado no modo backfill (sessoes reaproveitadas entre janelas).")
+        processamento_iniciado = False
+        # Orcamento de tempo contado do inicio da execucao; com o agendador os mais caros ficam por ultimo.
+        prazo_orcamento = started_at.timestamp() + args.orcamento_min * 60 if args.orcamento_min > 0 else None
+        if prazo_orcamento:
+            run_context["orcamento_min"] = args.orcamento_min
+        # Ledger de outcomes: filtra concluidos sem mudanca na linha RM antes de qualquer sessao.
+        ledger_path = None if args.ignore_ledger or not ledger_habilitado else LEDGER_PATH
+        run_context["ledger"] = {
+            "path": LEDGER_PATH,
+            "habilitado": ledger_habilitado,
+            "filtro_ativo": bool(ledger_path),
+            "filtrados": 0,
+            "gravados": 0,
+        }
+
+        # Journal por pessoa concluida (fsync); no --resume reconstroi o manifest e as
+        # varreduras de rascunhos da execucao interrompida.
+        limpar_journals_antigos(JOURNAL_DIR, int(os.getenv("METAX_JOURNAL_DIAS", "7")))
+        cpfs_journal: set[str] = set()
+        rascunhos_journal: dict[str, set[str]] = {}
+        # Salvos que ainda aguardavam a verificacao em lote: conferidos de novo, nao restaurados como finais.
+        pendentes_resume: dict[str, dict] = {}
+        if args.resume:
+            estado_journal = ler_journal(JOURNAL_DIR, execution_id)
+            rascunhos_journal = estado_journal["rascunhos"]
+            for registro in estado_journal["people"]:
+                if registro.get("verificacao_lote_pendente"):
+                    pendentes_resume[registro.get("cpf")] = registro
+                    continue
+                manifest["people"].append(registro)
+                cpfs_journal.add(registro.get("cpf"))
+                dados = registro.get("dados_funcionario") or {}
+                if registro.get("attempted") or registro.get("status_final") == "SKIPPED":
+                    chaves_processadas_no_run.update(chaves_do_funcionario(dados))
+                if registro.get("attempted"):
+                    cpfs_processados_no_run.add(registro.get("cpf"))
+                if registro.get("outcome") == OUTCOME_VERIFIED_SUCCESS and registro.get("contrato_chave") in rascunhos_journal:
+                    rascunhos_journal[registro["contrato_chave"]].add(registro.get("cpf"))
+            # A varredura gravada e anterior a esses salvos; o contrato deles faz uma nova.
+            for registro in pendentes_resume.values():
+                rascunhos_journal.pop(registro.get("contrato_chave"), None)
+            run_context["resume"] = {
+                "journal_dir": JOURNAL_DIR,
+                "restaurados": len(estado_journal["people"]) - len(pendentes_resume),
+                "pendentes_verificacao": len(pendentes_resume),
+                "rascunhos_restaurados": sorted(rascunhos_journal),
+            }
+            if estado_journal["people"] or rascunhos_journal:
+                logger.info("Execucao retomada a partir do journal", details=run_context["resume"])
+            else:
+                logger.warn("Journal da execucao nao encontrado; seguindo como execucao nova.", details={"execution_id": execution_id})
+        journal = JournalExecucao(caminho_journal(JOURNAL_DIR, execution_id))
+        if args.fila:
+            # Varias maquinas na mesma janela SQL: cada CPF vai para quem criar o lease primeiro.
+            fila = FilaCompartilhada(os.path.join(FILA_DIR, args.fila), socket.gethostname(), execution_id)
+            fila.iniciar_heartbeat()
+            run_context["fila"] = {"nome": args.fila, "dir": fila.diretorio, "maquina": fila.maquina, "contagem": {}}
+            logger.info("Fila compartilhada ativa", details={"nome": args.fila, "dir": fila.diretorio, "lease_s": fila.lease_s})
+
+        for indice_janela, janela in enumerate(backfill_janelas or [None], start=1):
+            if janela and orcamento_esgotado(prazo_orcamento):
+                # Janela nova so seria consultada para adiar todo mundo; fica para a proxima execucao.
                 logger.warn(
-                    f"Centro de custo desconhecido para {nome}. Pulando cadastro.",
-                    details={"cpf": cpf_limpo, "centro_custo": centro_custo},
+                    "Backfill: orcamento de tempo esgotado; janelas restantes ficam para a proxima execucao.",
+                    details={"proxima_janela": janela[0].isoformat(), "restantes": len(backfill_janelas) - indice_janela + 1},
                 )
-                manifest["people"].append(registro)
-                registro["foto_path"] = _classificar_foto_pos_processamento(
-                    caminho_foto, registro["status_final"], execution_id, started_at
+                break
+            adiados_janela = 0
+            if janela:
+                logger.info(
+                    f"Backfill: janela {indice_janela}/{len(backfill_janelas)}",
+                    details={"inicio": janela[0].isoformat(), "fim": janela[1].isoformat()},
                 )
-                registro["foto_publica_path"] = registro["foto_path"]
-
-        for chave in ("MECANICA", "ELETROMECANICA"):
-            funcs_grupo = grupos[chave]
-            if not funcs_grupo:
-                continue
-
-            contrato_value, contrato_label = _resolver_contrato_config(chave)
-            if not (contrato_value or contrato_label):
-                raise ValueError(
-                    f"Contrato {chave} nao configurado. "
-                    f"Defina METAX_CONTRATO_{chave}_VALUE ou METAX_CONTRATO_{chave}_LABEL no .env"
+            coleta_started = time.perf_counter()
+            sinal_pendentes = threading.Event()
+            if not ledger_path:
+                sinal_pendentes.set()
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rm-sql") as executor_sql:
+                futuro_sql = executor_sql.submit(
+                    _coletar_funcionarios_sql,
+                    entradas_txt,
+                    data_inicio_minima,
+                    telemetria_sql,
+                    duas_fases,
+                    janela,
+                    ledger_path,
+                    sinal_pendentes,
                 )
+                if sessao_paralela and not sessoes and not contratos_paralelos:
+                    sessao_antecipada = _iniciar_sessao_antecipada(
+                        args.headless, futuro_sql, sinal_pendentes, estado_sessao_dir
+                    )
+                coleta = futuro_sql.result()
+            grupos = coleta["grupos"]
+            sql_error = coleta["sql_error"]
+            run_context["coleta_paralela"] = {
+                "sessao_paralela": sessao_paralela,
+                "duas_fases": duas_fases,
+                "contrato_antecipado": sessao_antecipada["chave"] if sessao_antecipada else None,
+                "sql_ms": coleta["duracao_ms"],
+                "sessao_ms": sessao_antecipada["duracao_ms"] if sessao_antecipada else None,
+                "total_ms": round((time.perf_counter() - coleta_started) * 1000, 1),
+            }
+            run_context["sql_telemetria"] = telemetria_sql.como_dict()
+            logger.info("Telemetria SQL por fase (ms)", details=run_context["sql_telemetria"])
 
-            logger.info(f"Iniciando sessao para contrato {chave}...")
-            p, browser, page = iniciar_sessao(
-                headless=args.headless,
-                contrato_value=contrato_value,
-                contrato_label=contrato_label,
-            )
+            if coleta["dup_count"] > 0:
+                logger.warn("Duplicatas removidas por CPF", details={"dup_count": coleta["dup_count"]})
+            if sql_error:
+                break
+            if cpfs_journal:
+                ja_no_journal = []
+                for chave_grupo in CONTRATOS_PORTAL:
+                    restantes = []
+                    for func in grupos[chave_grupo]:
+                        if "".join(filter(str.isdigit, str(func["CPF"]))) in cpfs_journal:
+                            ja_no_journal.append(func)
+                        else:
+                            restantes.append(func)
+                    grupos[chave_grupo] = restantes
+                # Ja estao no manifest (journal); contam como detectados, mas nao sao reprocessados.
+                funcionarios.extend(ja_no_journal)
+                if ja_no_journal:
+                    logger.info("Resume: concluidos no journal fora do processamento", details={"total": len(ja_no_journal)})
+            if coleta["ja_concluidos"]:
+                _registrar_concluidos_ledger(coleta["ja_concluidos"], manifest, chaves_processadas_no_run)
+                run_context["ledger"]["filtrados"] += len(coleta["ja_concluidos"])
+                logger.info(
+                    "Ledger: ja concluidos em execucoes anteriores filtrados antes do portal",
+                    details={"total": len(coleta["ja_concluidos"])},
+                )
+            funcionarios.extend(func for func, _ in coleta["ja_concluidos"])
+            funcionarios_janela = [
+                func for chave_grupo in ("MECANICA", "ELETROMECANICA", "DESCONHECIDO") for func in grupos[chave_grupo]
+            ]
+            funcionarios.extend(funcionarios_janela)
+
+            if not funcionarios_janela:
+                logger.info("Nenhum funcionario pendente para processar.")
+            else:
+                logger.info(f"Funcionarios a processar: {len(funcionarios_janela)}", details={"total": len(funcionarios_janela)})
+                logger.ok("Coleta de itens concluida.", details={"total": len(funcionarios_janela)})
+                if not processamento_iniciado:
+                    logger.stage(3, 5, "Processamento")
+                    processamento_iniciado = True
+
+                logger.info(
+                    "Resumo por contrato (centro de custo)",
+                    details={
+                        "mecanica": len(grupos["MECANICA"]),
+                        "eletromecanica": len(grupos["ELETROMECANICA"]),
+                        "desconhecido": len(grupos["DESCONHECIDO"]),
+                    },
+                )
 
-            try:
-                rascunhos_existentes = obter_todos_rascunhos(page)
-
-                for func in funcs_grupo:
-                    cpf = func["CPF"]
-                    cpf_limpo = "".join(filter(str.isdigit, str(cpf)))
-                    nome = func["NOME"]
-                    if cpf_limpo in cpfs_processados_no_run:
-                        logger.warn(
-                            f"CPF duplicado no run. Pulando {nome}.",
-                            details={"cpf": cpf_limpo},
-                        )
+                if grupos["DESCONHECIDO"]:
+                    _registrar_centro_custo_desconhecido(grupos["DESCONHECIDO"], manifest, execution_id, started_at)
+
+                chaves_com_grupo = [chave for chave in CONTRATOS_PORTAL if grupos[chave]]
+                if contratos_paralelos and len(chaves_com_grupo) > 1:
+                    if _processar_contratos_em_processos(
+                        chaves_com_grupo,
+                        grupos,
+                        manifest=manifest,
+                        execution_id=execution_id,
+                        started_at=started_at,
+                        args=args,
+                        robot_version=robot_version,
+                        environment_name=environment_name,
+                        chaves_processadas_no_run=chaves_processadas_no_run,
+                        cpfs_processados_no_run=cpfs_processados_no_run,
+                        duas_fases=duas_fases,
+                        rascunhos_journal=rascunhos_journal,
+                        prazo=prazo_orcamento,
+                        fila_dir=fila.diretorio if fila is not None else None,
+                        pendentes_resume=pendentes_resume,
+                    ):
+                        inconsistente = True
+                    chaves_com_grupo = []
+
+                # O contrato com sessao ja aberta durante a coleta e processado primeiro.
+                chave_antecipada = sessao_antecipada["chave"] if sessao_antecipada else None
+                for chave in sorted(chaves_com_grupo, key=lambda c: c != chave_antecipada):
+                    funcs_grupo = grupos[chave]
+                    if not funcs_grupo:
                         continue
 
-                    pessoa_started_at = datetime.now().isoformat()
-                    registro = _criar_registro_base(nome, cpf_limpo, pessoa_started_at)
-                    registro["dados_funcionario"] = _snapshot_funcionario(func)
-                    registro["contrato_chave"] = chave
-                    caminho_foto = fotos_cache.get(cpf_limpo)
-                    registro["foto_path"] = caminho_foto
-                    registro["foto_publica_path"] = caminho_foto
-
-                    if cpf_limpo in rascunhos_existentes:
-                        logger.info(f"Funcionario {nome} ja consta nos rascunhos (CACHE). Pulando...", details={"cpf": cpf})
-                        registro["attempted"] = False
-                        registro["status_final"] = "SKIPPED"
-                        registro["outcome"] = OUTCOME_SKIPPED_ALREADY_EXISTS
-                        registro["errors"]["action_error"] = "Ignorado: rascunho ja existente (cache)."
-                        nomes_processados_no_run.add(_normalizar_nome(nome))
-                        manifest["people"].append(registro)
-                        registro["foto_path"] = _classificar_foto_pos_processamento(
-                            caminho_foto, registro["status_final"], execution_id, started_at
-                        )
-                        registro["foto_publica_path"] = registro["foto_path"]
-                        continue
+                    contrato_value, contrato_label = _exigir_contrato_config(chave)
 
-                    if cpf_limpo not in fotos_cache:
-                        try:
-                            fotos_cache[cpf_limpo] = baixar_foto_funcionario(
-                                func,
-                                pasta_destino=FOTOS_EM_PROCESSAMENTO_DIR,
-                                pastas_busca=FOTOS_BUSCA_DIRS,
-                            )
-                        except Exception as e:
-                            logger.error(
-                                f"Falha ao obter foto de {nome}: {e}",
-                                details={"error": str(e), "cpf": cpf},
-                            )
-                            fotos_cache[cpf_limpo] = None
-
-                    caminho_foto = fotos_cache.get(cpf_limpo)
-                    registro["foto_path"] = caminho_foto
-                    registro["foto_publica_path"] = caminho_foto
-
-                    if caminho_foto:
-                        logger.info(f"Foto pronta para {nome}", details={"cpf": cpf, "foto": caminho_foto})
+                    sessao = sessoes.get(chave)
+                    if sessao:
+                        logger.info(f"Reaproveitando sessao aberta do contrato {chave}.")
+                    elif sessao_antecipada and sessao_antecipada["chave"] == chave:
+                        sessao = sessao_antecipada
+                        sessao_antecipada = None
+                        logger.info(f"Reaproveitando sessao aberta durante a coleta para contrato {chave}.")
                     else:
-                        logger.warn(f"Foto nao encontrada para {nome}", details={"cpf": cpf})
-                        registro["no_photo"] = True
-
-                    logger.info(f"Iniciando cadastro de {nome} ({cpf})", details={"funcionario": nome, "cpf": cpf})
-
-                    try:
-                        action = cadastrar_funcionario(
-                            page,
-                            func,
-                            output_manager,
-                            caminho_foto,
-                            contrato_chave=chave,
-                        )
-                    except Exception as e:
-                        logger.error(f"Falha ao cadastrar {nome}: {e}", details={"cpf": cpf, "erro": str(e)})
-                        registro["attempted"] = False
-                        registro["action_saved"] = False
-                        registro["status_final"] = "FAILED"
-                        registro["outcome"] = OUTCOME_FAILED_ACTION
-                        registro["errors"]["action_error"] = str(e)
-
-                        try:
-                            page.goto("https://portal.metax.ind.br/", timeout=5000)
-                        except Exception:
-                            pass
-
-                        manifest["people"].append(registro)
-                        registro["foto_path"] = _classificar_foto_pos_processamento(
-                            caminho_foto, registro["status_final"], execution_id, started_at
+                        logger.info(f"Iniciando sessao para contrato {chave}...")
+                        p, browser, page = iniciar_sessao(
+                            headless=args.headless,
+                            contrato_value=contrato_value,
+                            contrato_label=contrato_label,
+                            estado_sessao_dir=estado_sessao_dir,
                         )
-                        registro["foto_publica_path"] = registro["foto_path"]
-                        continue
+                        sessao = {"chave": chave, "p": p, "browser": browser, "page": page}
+                    sessoes[chave] = sessao
 
-                    # Blindagem do contrato de retorno do action
-                    if not isinstance(action, dict):
-                        action = {"attempted": False, "saved": False, "no_photo": False, "error": "Retorno invalido", "detail": ""}
-                    action = {
-                        "attempted": bool(action.get("attempted", False)),
-                        "saved": bool(action.get("saved", False)),
-                        "no_photo": bool(action.get("no_photo", False)),
-                        "error": str(action.get("error", "")),
-                        "detail": str(action.get("detail", "")),
-                    }
-
-                    registro["attempted"] = action["attempted"]
-                    registro["action_saved"] = action["saved"]
-                    if action.get("no_photo"):
-                        registro["no_photo"] = True
-                    if registro["attempted"]:
-                        nomes_processados_no_run.add(_normalizar_nome(nome))
-                        cpfs_processados_no_run.add(cpf_limpo)
-
-                    if registro["action_saved"]:
-                        registro["timestamps"]["saved_at"] = datetime.now().isoformat()
-                        logger.info(f"[VERIFY] start cpf={cpf_limpo}, nome={nome}")
-                        try:
-                            verificado, detalhe = verificar_cadastro(page, func, output_manager)
-                        except Exception as e:
-                            verificado, detalhe = False, f"Erro na verificacao: {e}"
-                        logger.info(f"[VERIFY] result cpf={cpf_limpo} verified={bool(verificado)} detail={detalhe}")
-
-                        registro["verified"] = bool(verificado)
-                        if verificado:
-                            registro["timestamps"]["verified_at"] = datetime.now().isoformat()
-                            registro["status_final"] = "SUCCESS"
-                            registro["outcome"] = OUTCOME_VERIFIED_SUCCESS
-                            rascunhos_existentes.add(cpf_limpo)
-                            logger.info("Cache de rascunhos atualizado.", details={"cpf": cpf_limpo})
-                        else:
-                            logger.warn(f"Verificacao falhou para {nome}: {detalhe}", details={"cpf": cpf, "motivo": detalhe})
-                            registro["status_final"] = "FAILED"
-                            if detalhe and detalhe.lower().startswith("erro na verificacao"):
-                                registro["outcome"] = OUTCOME_FAILED_VERIFICATION
-                            else:
-                                registro["outcome"] = OUTCOME_SAVED_NOT_VERIFIED
-                            registro["errors"]["verification_error"] = detalhe or "CPF nao encontrado na lista de rascunhos."
+                    try:
+                        if "rascunhos" not in sessao and chave in rascunhos_journal:
+                            sessao["rascunhos"] = rascunhos_journal.pop(chave)
+                            logger.info(f"Rascunhos do contrato {chave} restaurados do journal (sem nova varredura).")
+                        if "rascunhos" not in sessao:
+                            sessao["rascunhos"] = obter_todos_rascunhos(sessao["page"])
+                            journal.registrar_rascunhos(chave, sessao["rascunhos"])
+                        if _processar_grupo_contrato(
+                            sessao["page"],
+                            chave,
+                            funcs_grupo,
+                            sessao["rascunhos"],
+                            manifest=manifest,
+                            output_manager=output_manager,
+                            execution_id=execution_id,
+                            started_at=started_at,
+                            fotos_cache=fotos_cache,
+                            chaves_processadas_no_run=chaves_processadas_no_run,
+                            cpfs_processados_no_run=cpfs_processados_no_run,
+                            telemetria_sql=telemetria_sql,
+                            duas_fases=duas_fases,
+                            paginas_paralelas=args.paginas_paralelas,
+                            headless=args.headless,
+                            journal=journal,
+                            verificacao_lote=args.verificacao_em_lote,
+                            agendar=os.getenv("METAX_AGENDADOR", "1") == "1",
+                            prazo=prazo_orcamento,
+                            fila=fila,
+                            pendentes_resume=_pendentes_do_grupo(pendentes_resume, funcs_grupo),
+                        ):
                             inconsistente = True
-                    else:
-                        registro["status_final"] = "FAILED"
-                        registro["outcome"] = OUTCOME_FAILED_ACTION
-                        registro["errors"]["action_error"] = action.get("error") or "Falha ao salvar rascunho."
-
-                    manifest["people"].append(registro)
-                    registro["foto_path"] = _classificar_foto_pos_processamento(
-                        caminho_foto, registro["status_final"], execution_id, started_at
+                        adiados_janela += (run_context["pipeline"][chave].get("orcamento") or {}).get("adiados", 0)
+                    finally:
+                        if not manter_sessoes:
+                            sessoes.pop(chave, None)
+                            _fechar_sessao(sessao["p"], sessao["browser"])
+
+            if backfill_checkpoint is not None:
+                if not registrar_janela_se_completa(
+                    backfill_checkpoint,
+                    janela,
+                    execution_id,
+                    adiados_janela,
+                    resumo={"funcionarios": len(funcionarios_janela)},
+                    total_janelas=run_context["backfill"]["total_janelas"],
+                ):
+                    logger.warn(
+                        "Backfill: janela com adiados pelo orcamento; checkpoint nao avanca.",
+                        details={"inicio": janela[0].isoformat(), "fim": janela[1].isoformat(), "adiados": adiados_janela},
                     )
-                    registro["foto_publica_path"] = registro["foto_path"]
-            finally:
-                if browser:
-                    logger.info("Fechando navegador...")
-                    browser.close()
-                if p:
-                    p.stop()
+                    break
+                gravar_checkpoint(BACKFILL_CHECKPOINT_PATH, backfill_checkpoint)
+                run_context["backfill"]["janelas_processadas"] += 1
+                logger.info(
+                    "Backfill: checkpoint gravado",
+                    details={"janela_fim": janela[1].isoformat(), "path": BACKFILL_CHECKPOINT_PATH},
+                )
 
     finally:
+        if "pendentes_resume" in locals() and pendentes_resume:
+            # Salvos pendentes do --resume cujo grupo nao rodou mantem o registro provisorio.
+            manifest["people"].extend(pendentes_resume.values())
+        if journal is not None:
+            journal.fechar()
+        if fila is not None:
+            fila.fechar()
+        run_context["timeouts_portal"] = gravar_timeouts_adaptativos()
+        if sessao_antecipada:
+            _fechar_sessao(sessao_antecipada["p"], sessao_antecipada["browser"])
+        for sessao in list(sessoes.values()):
+            _fechar_sessao(sessao["p"], sessao["browser"])
         try:
             if "lock_ok" in locals() and lock_ok and os.path.exists(txt_path):
-                removidos = _atualizar_fila_txt(txt_path, nomes_processados_no_run)
-                logger.info(f"TXT fila atualizado. Nomes removidos: {removidos}")
+                removidos = atualizar_fila_txt(txt_path, chaves_processadas_no_run)
+                logger.info(f"TXT fila atualizado. Entradas removidas: {removidos}")
         finally:
             if "lock_ok" in locals() and lock_ok:
                 _liberar_lock(lock_path)
+            if "telemetria_sql" in locals():
+                # Inclui as consultas de detalhe feitas durante o processamento por contrato.
+                run_context["sql_telemetria"] = telemetria_sql.como_dict()
+            run_context["sql_pool"] = {"criadas": POOL_SQL.criadas, "reutilizadas": POOL_SQL.reutilizadas}
+            POOL_SQL.fechar()
 
         finished_at = datetime.now()
         run_context["finished_at"] = finished_at.isoformat()
         run_context["duration_sec"] = int((finished_at - started_at).total_seconds())
 
-        totals = compute_totals(manifest["people"], detected=len(funcionarios))
+        detectados = len(funcionarios)
+        people_watermark = manifest["people"]
+        if fila is not None:
+            contagem_fila = run_context["fila"]["contagem"]
+            for campo, valor in fila.contagem.items():
+                contagem_fila[campo] = contagem_fila.get(campo, 0) + valor
+            # Quem ficou com outra maquina (ou ja estava concluido na fila) nao entra neste manifest.
+            detectados -= contagem_fila.get("outra_maquina", 0) + contagem_fila.get("ja_concluidos", 0)
+            people_watermark = None
+            try:
+                consolidado = consolidar_fila(fila.diretorio)
+                consolidado.update({"fila": args.fila, "obra": NUMERO_OBRA})
+                run_context["fila"]["consolidado_path"] = gravar_consolidado(fila.diretorio, consolidado)
+                run_context["fila"]["concluidos"] = len(consolidado["people"])
+                run_context["fila"]["em_andamento"] = len(consolidado["em_andamento"])
+                cpfs_concluidos = {person.get("cpf") for person in consolidado["people"]}
+                # Ledger, centro de custo desconhecido e journal ficam so no manifest local.
+                locais = [person for person in manifest["people"] if person.get("cpf") not in cpfs_concluidos]
+                faltando = {
+                    "".join(filter(str.isdigit, str(func["CPF"]))) for func in funcionarios
+                } - cpfs_concluidos - {person.get("cpf") for person in locais}
+                # Watermark so avanca quando a janela inteira terminou na fila (ultima maquina).
+                if not faltando:
+                    people_watermark = consolidado["people"] + locais
+                logger.info(
+                    "Manifest consolidado da fila atualizado",
+                    details={**run_context["fila"], "faltando": len(faltando)},
+                )
+            except Exception as e:
+                logger.warn("Falha ao consolidar fila compartilhada", details={"dir": fila.diretorio, "error": str(e)})
+
+        totals = compute_totals(manifest["people"], detected=detectados)
         manifest["totals"] = totals
 
+        if ledger_habilitado and manifest["people"]:
+            try:
+                gravados = atualizar_ledger(LEDGER_PATH, manifest["people"], execution_id)
+                run_context.setdefault("ledger", {})["gravados"] = gravados
+                logger.info("Ledger de outcomes atualizado", details={"path": LEDGER_PATH, "gravados": gravados})
+            except Exception as e:
+                logger.warn("Falha ao atualizar ledger de outcomes", details={"path": LEDGER_PATH, "error": str(e)})
+
+        if (
+            not sql_error
+            and "watermark_atual" in locals()
+            and not entradas_txt
+            and not args.backfill
+            and people_watermark is not None
+        ):
+            # Adiados pelo orcamento nao estao no manifest, mas seguram o watermark na admissao deles.
+            novo_watermark = calcular_novo_watermark(
+                people_watermark, watermark_atual, pendentes=_adiados_orcamento(run_context)
+            )
+            if novo_watermark:
+                novo_watermark["execution_id"] = execution_id
+                try:
+                    gravar_watermark(WATERMARK_PATH, novo_watermark)
+                    run_context["watermark"]["novo"] = novo_watermark
+                    logger.info("Watermark incremental atualizado", details=novo_watermark)
+                except Exception as e:
+                    logger.warn("Falha ao gravar watermark", details={"path": WATERMARK_PATH, "error": str(e)})
+
         if sql_error:
             run_context["run_status"] = "INCONSISTENT"
         elif (
@@ -1208,6 +2774,7 @@ def main():
             logger.info("Auditoria Excel atualizada", details=audit_result)
         except Exception as e:
             logger.error("Falha ao atualizar auditoria Excel", details={"error": str(e)})
+        _gravar_resultado_particao(manifest)
         logger.flush()
         logger.resum(f"Status final: {run_context['run_status']}")
         logger.finish_summary(
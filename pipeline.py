@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterable
+
+from custom_logger import logger
+
+
+# Pipeline por estagios com filas limitadas entre eles. Cada estagio tem seus
+# workers (threads); o estagio marcado na_thread_atual tem o worker 0 rodando na
+# thread que chamou executar_pipeline (Playwright sync so funciona na thread que o
+# iniciou). A funcao do estagio devolve o item para o proximo estagio ou None para
+# encerrar o item ali. Internamente cada item anda com seu numero de sequencia (e um
+# marcador vazio no lugar dos encerrados), para que estagios com manter_ordem possam
+# entregar ao seguinte na ordem de entrada mesmo com varios workers.
+
+_FIM = object()
+
+
+class Estagio:
+    """
+    funcao(item) -> item | None. Com abrir_worker, cada worker chama abrir_worker(indice)
+    na propria thread e a funcao passa a receber funcao(item, recurso); fechar_worker(recurso)
+    roda ao fim. Um worker que nao abre encerra e os demais esvaziam a fila, entao ao menos
+    um worker do estagio precisa abrir. Com manter_ordem a saida segue a ordem de entrada:
+    item que termina antes espera (em memoria) os anteriores.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        funcao: Callable,
+        workers: int = 1,
+        na_thread_atual: bool = False,
+        abrir_worker: Callable | None = None,
+        fechar_worker: Callable | None = None,
+        manter_ordem: bool = False,
+    ):
+        self.nome = nome
+        self.funcao = funcao
+        self.workers = max(1, int(workers))
+        self.na_thread_atual = na_thread_atual
+        self.abrir_worker = abrir_worker
+        self.fechar_worker = fechar_worker
+        self.manter_ordem = manter_ordem
+
+
+class _Metricas:
+    def __init__(self, estagios: list[Estagio]):
+        self._lock = threading.Lock()
+        self.dados = {e.nome: {"workers": e.workers, "itens": 0, "erros": 0, "ocupado_ms": 0.0, "espera_ms": 0.0} for e in estagios}
+
+    def somar(self, nome: str, **valores):
+        with self._lock:
+            for chave, valor in valores.items():
+                self.dados[nome][chave] += valor
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            return {
+                nome: {chave: round(valor, 1) if isinstance(valor, float) else valor for chave, valor in dados.items()}
+                for nome, dados in self.dados.items()
+            }
+
+
+def executar_pipeline(itens: Iterable, estagios: list[Estagio], capacidade: int = 8) -> dict:
+    """
+    Passa os itens por todos os estagios e retorna metricas por estagio (itens, erros,
+    ms ocupado e ms esperando entrada; espera alta no estagio do browser indica gargalo
+    antes dele). Excecoes na funcao sao registradas e encerram apenas o item.
+    """
+    if not estagios:
+        return {}
+    filas = [queue.Queue(maxsize=max(1, capacidade)) for _ in estagios]
+    metricas = _Metricas(estagios)
+    restantes = [e.workers for e in estagios]
+    lock_restantes = threading.Lock()
+    # Por estagio com manter_ordem: proxima sequencia a entregar e as que terminaram antes dela.
+    ordens = [
+        {"lock": threading.Lock(), "proximo": 0, "prontos": {}} if e.manter_ordem and e.workers > 1 else None
+        for e in estagios
+    ]
+
+    def _encaminhar(indice: int, sequencia: int, item):
+        if indice + 1 >= len(estagios):
+            return
+        ordem = ordens[indice]
+        if ordem is None:
+            filas[indice + 1].put((sequencia, item))
+            return
+        with ordem["lock"]:
+            ordem["prontos"][sequencia] = item
+            while ordem["proximo"] in ordem["prontos"]:
+                filas[indice + 1].put((ordem["proximo"], ordem["prontos"].pop(ordem["proximo"])))
+                ordem["proximo"] += 1
+
+    def _worker_encerrado(indice: int):
+        with lock_restantes:
+            restantes[indice] -= 1
+            ultimo = restantes[indice] == 0
+        if ultimo and indice + 1 < len(estagios):
+            for _ in range(estagios[indice + 1].workers):
+                filas[indice + 1].put(_FIM)
+
+    def _executar_worker(indice: int, numero_worker: int):
+        estagio = estagios[indice]
+        recurso = None
+        try:
+            if estagio.abrir_worker is not None:
+                try:
+                    recurso = estagio.abrir_worker(numero_worker)
+                except Exception as e:
+                    logger.warn(
+                        "Worker do pipeline nao abriu; demais workers seguem com a fila.",
+                        details={"estagio": estagio.nome, "worker": numero_worker, "error": str(e)},
+                    )
+                    return
+            while True:
+                esperando = time.perf_counter()
+                entrada = filas[indice].get()
+                metricas.somar(estagio.nome, espera_ms=(time.perf_counter() - esperando) * 1000)
+                if entrada is _FIM:
+                    return
+                sequencia, item = entrada
+                if item is None:
+                    # Encerrado num estagio anterior; so mantem a sequencia andando.
+                    _encaminhar(indice, sequencia, None)
+                    continue
+                started = time.perf_counter()
+                try:
+                    if estagio.abrir_worker is not None:
+                        saida = estagio.funcao(item, recurso)
+                    else:
+                        saida = estagio.funcao(item)
+                except Exception as e:
+                    saida = None
+                    metricas.somar(estagio.nome, erros=1)
+                    logger.error(
+                        "Falha inesperada em estagio do pipeline",
+                        details={"estagio": estagio.nome, "worker": numero_worker, "error": str(e)},
+                    )
+                metricas.somar(estagio.nome, itens=1, ocupado_ms=(time.perf_counter() - started) * 1000)
+                _encaminhar(indice, sequencia, saida)
+        finally:
+            if recurso is not None and estagio.fechar_worker is not None:
+                try:
+                    estagio.fechar_worker(recurso)
+                except Exception as e:
+                    logger.warn("Falha ao fechar worker do pipeline", details={"estagio": estagio.nome, "error": str(e)})
+            _worker_encerrado(indice)
+
+    def _alimentar():
+        try:
+            for sequencia, item in enumerate(itens):
+                filas[0].put((sequencia, item))
+        finally:
+            for _ in range(estagios[0].workers):
+                filas[0].put(_FIM)
+
+    threads = [threading.Thread(target=_alimentar, name="pipeline-fonte", daemon=True)]
+    worker_atual = None
+    for indice, estagio in enumerate(estagios):
+        for numero_worker in range(estagio.workers):
+            if estagio.na_thread_atual and numero_worker == 0:
+                worker_atual = (indice, numero_worker)
+                continue
+            threads.append(
+                threading.Thread(
+                    target=_executar_worker,
+                    args=(indice, numero_worker),
+                    name=f"pipeline-{estagio.nome}-{numero_worker}",
+                    daemon=True,
+                )
+            )
+    for thread in threads:
+        thread.start()
+    if worker_atual is not None:
+        _executar_worker(*worker_atual)
+    for thread in threads:
+        thread.join()
+    return metricas.como_dict()
@@ -0,0 +1,88 @@
+from agendador import cargo_mapeado
+from mappings import MAPA_ESCOLARIDADE, MAPA_ESTADO_CIVIL, MAPA_ESTADO_NATAL, MAPA_SEXO
+from utils import formatar_cpf, formatar_data, formatar_pis, formatar_telefone_numerico
+
+
+# Pre-validacao offline: roda sobre o lote os mesmos formatadores (utils.py) e mapas
+# (mappings.py) que o preenchimento do formulario usa. Erros sao falhas certas no meio
+# do formulario (ValueError do formatador, cargo vazio) e viram FAILED_ACTION sem usar
+# o browser; alertas reproduzem os warnings/fallbacks do portal e so vao para o registro.
+
+COLUNAS_DATA = {
+    "DTNASCIMENTO": "Data de nascimento",
+    "DTEMISSAOIDENT": "Data de emissao do RG",
+    "DTCARTTRAB": "Data da CTPS",
+    "DATAADMISSAO": "Data de admissao",
+}
+
+COLUNAS_UF = {
+    "ESTADONATAL": "UF de nascimento",
+    "UFCARTIDENT": "UF do RG",
+    "UFCARTTRAB": "UF da CTPS",
+}
+
+
+def _texto(valor) -> str:
+    return str(valor).strip().upper() if valor is not None else ""
+
+
+def validar_funcionario(funcionario: dict) -> tuple[list[str], list[str]]:
+    """(erros, alertas) de um funcionario, com os valores de origem nas mensagens."""
+    erros = []
+    alertas = []
+
+    cpf = funcionario.get("CPF")
+    if not "".join(filter(str.isdigit, str(cpf or ""))):
+        erros.append("CPF vazio")
+    else:
+        try:
+            formatar_cpf(cpf)
+        except ValueError as e:
+            erros.append(str(e))
+
+    try:
+        formatar_pis(funcionario.get("PISPASEP"))
+    except ValueError as e:
+        erros.append(str(e))
+
+    for coluna, rotulo in COLUNAS_DATA.items():
+        try:
+            formatar_data(funcionario.get(coluna))
+        except ValueError:
+            erros.append(f"{rotulo} invalida ({coluna}={funcionario.get(coluna)!r})")
+
+    if not _texto(funcionario.get("DESCRICAO_CARGO")):
+        erros.append("DESCRICAO_CARGO vazia no RM")
+    elif not cargo_mapeado(funcionario):
+        alertas.append(
+            f"Cargo sem mapeamento (CODFUNCAO={_texto(funcionario.get('CODFUNCAO')) or '-'}); "
+            "busca pela descricao RM no portal"
+        )
+
+    grau = _texto(funcionario.get("GRAUINSTRUCAO"))
+    if grau not in MAPA_ESCOLARIDADE:
+        alertas.append(f"GRAUINSTRUCAO sem mapeamento ({grau or 'vazio'}); fallback Outros")
+    estado_civil = str(funcionario.get("ESTADOCIVIL") or "").strip()
+    if estado_civil not in MAPA_ESTADO_CIVIL:
+        alertas.append(f"ESTADOCIVIL sem mapeamento ({estado_civil or 'vazio'})")
+    sexo = _texto(funcionario.get("SEXO"))
+    if sexo not in MAPA_SEXO:
+        alertas.append(f"SEXO sem mapeamento ({sexo or 'vazio'})")
+    for coluna, rotulo in COLUNAS_UF.items():
+        uf = _texto(funcionario.get(coluna))
+        if uf not in MAPA_ESTADO_NATAL:
+            alertas.append(f"{rotulo} sem mapeamento ({coluna}={uf or 'vazio'})")
+    if not formatar_telefone_numerico(funcionario.get("TELEFONE1")):
+        alertas.append("TELEFONE1 invalido ou vazio")
+    return erros, alertas
+
+
+def validar_lote(funcionarios: list[dict]) -> dict[str, dict]:
+    """{cpf: {"erros": [...], "alertas": [...]}} so para quem tem algum apontamento."""
+    resultado = {}
+    for func in funcionarios:
+        erros, alertas = validar_funcionario(func)
+        if erros or alertas:
+            cpf = "".join(filter(str.isdigit, str(func.get("CPF") or "")))
+            resultado[cpf] = {"erros": erros, "alertas": alertas}
+    return resultado
@@ -0,0 +1,315 @@
+import os
+from datetime import date, datetime, timedelta
+
+
+# Obra atendida pelo robo (segundo segmento do CODSECAO).
+NUMERO_OBRA_PADRAO = 125
+
+# Nomes que nunca devem ser cadastrados pelo robo. Usado apenas quando nao existe
+# o arquivo externo (NOMES_EXCLUIDOS_PATH); a lista operacional vive na pasta publica.
+NOMES_EXCLUIDOS_PADRAO = [
+    "WELISSON SANTOS SANTANA",
+    "DANIELE APARECIDA RODRIGUES",
+    "MARIANA CRISTINA DOS SANTOS",
+    "CASSIO ROBERTO DA SILVA",
+    "RAFAEL PEREIRA DA SILVA",
+    "ISAIAS SOUSA LISBOA",
+    "JARDELINO PEREIRA DA COSTA",
+    "RAIMUNDO FRAZAO DOS SANTOS",
+    "FAUZE CELIS RODRIGUES COSTA",
+    "WAGNER JUNIO DE MOURA",
+    "VLADIMIR MOREIRA DA SILVA",
+    "NAILTON ISAIAS MARQUES",
+    "WALDEILSON PEREIRA DA SILVA",
+    "FRANCINALDO MARTINS SANTOS",
+    "ADAILTON DE JESUS DOS SANTOS",
+    "ANTONIO DOS SANTOS SILVA",
+    "ADRIANO SILVA SANTOS",
+    "FRANCILDO DOS SANTOS SOBRINHO",
+    "JOSE ANTONIO RODRIGUES MARTINS",
+    "VERILTON DOS SANTOS",
+    "MANOEL JOAO PIRES SOARES",
+    "ANTONIO ALVES DA SILVA FILHO",
+    "EZEQUIEL DE JESUS CERQUEIRA",
+    "MANOEL WALACE MACIEL SOARES",
+    "EDSON PAULO MADEIRA",
+    "JAIR BARROS BRANDAO",
+    "ELISVELTON DA SILVA LOBATO",
+    "JARDEL MENDES BRAGA",
+    "HAMILSON ALVES DE MELO",
+    "RAFAEL BATALHA SOUSA",
+    "MARINHO DE SOUSA MACEDO",
+    "ROBENILSON SANTOS CAMARA",
+    "FRANCISCO VALDEVAN PAIXAO",
+    "GEVANILSON CARDOSO DOS SANTOS",
+    "GENILSON SILVA CANTANHEDE",
+    "DENIS AUGUSTO DA ROCHA CONCEICAO",
+    "EDINALDO MONTEIRO LOBATO",
+    "GILSON CLEITON JOAQUIM DE MOURA",
+    "MARCIO CLEITON VIEIRA DE MESQUITA",
+    "MACIEL MIGUEL EVANGELISTA",
+    "GILSON BARRETO SANTOS",
+    "JOAO CARLOS NOVAIS SILVA",
+    "ESEQUIAS FERREIRA FERNANDES",
+    "JOCILEY PINHEIRO BAIA",
+    "ANTONIEL MARIA ALMEIDA RIBEIRO",
+    "VITOR AUGUSTO DA SILVA",
+    "ERIVAN LIMA VINAGRE",
+    "JOAO BATISTA SOUSA SILVA",
+    "JOCICLEY DA SILVA FARIAS",
+    "JOELITON ROCHA REIS",
+    "DANILO FERREIRA DA SILVA",
+    "PEDRO SANTOS DA SILVA",
+    "MARCOS MELO MONTEIRO",
+    "CARLOS EMERSON GOES OLIVA SANTOS",
+    "RAIMUNDO NONATO GOMES DA SILVA",
+    "ANDERSON CLAYTON PRAZERES BARRETO",
+]
+
+SQL_PREPARAR_NOMES_EXCLUIDOS = """
+    IF OBJECT_ID('tempdb..#NOMES_EXCLUIDOS') IS NOT NULL DROP TABLE #NOMES_EXCLUIDOS;
+    CREATE TABLE #NOMES_EXCLUIDOS (NOME VARCHAR(120) COLLATE DATABASE_DEFAULT NOT NULL PRIMARY KEY);
+"""
+
+SQL_INSERIR_NOME_EXCLUIDO = "INSERT INTO #NOMES_EXCLUIDOS (NOME) VALUES (?)"
+
+# Texto fixo: janela de datas e exclusoes chegam por parametro/tabela temporaria,
+# entao o SQL Server reaproveita o plano em cache entre execucoes.
+# CENTRO_CUSTO, DESCRICAO_CARGO e NUMERO_OBRA vem do cache de referencias
+# (rm_referencias.py); o filtro de obra usa #SECOES_OBRA sobre o indice de CODSECAO.
+# Pai (6) e mae (7) saem de uma unica leitura de PFDEPEND; MIN(NOME) equivale ao
+# antigo TOP 1 ... ORDER BY NOME, sem CAST nas colunas indexadas.
+_SQL_FUNCIONARIOS_TEMPLATE = """
+    SELECT
+        P.NOME,
+        P.CPF,
+        F.CHAPA,
+        P.SEXO,
+        P.NATURALIDADE,
+        P.GRAUINSTRUCAO,
+        P.ESTADOCIVIL,
+        P.ESTADONATAL,
+        P.DTNASCIMENTO,
+        P.EMAIL,
+        P.TELEFONE1,
+
+        COALESCE(PAIS.NOME_PAI, 'NAO INFORMADO') AS NOME_PAI,
+        COALESCE(PAIS.NOME_MAE, 'NAO INFORMADO') AS NOME_MAE,
+
+        P.ORGEMISSORIDENT,
+        P.UFCARTIDENT,
+        P.CARTIDENTIDADE,
+        P.DTEMISSAOIDENT,
+        P.CARTEIRATRAB,
+        P.SERIECARTTRAB,
+        P.UFCARTTRAB,
+        P.DTCARTTRAB,
+        P.TITULOELEITOR,
+        P.ZONATITELEITOR,
+        P.SECAOTITELEITOR,
+        P.ESTELEIT,
+
+        P.CEP,
+        P.ESTADO,
+        P.BAIRRO,
+        P.RUA,
+        P.NUMERO,
+
+        F.PISPASEP,
+        F.DATAADMISSAO,
+        F.SALARIO,
+        F.CODFUNCAO,
+        F.CODCOLIGADA,
+        F.CODSECAO
+
+    FROM PFUNC F
+    INNER JOIN PPESSOA P
+        ON P.CODIGO = F.CODPESSOA
+
+    LEFT JOIN (
+        SELECT
+            D.CODCOLIGADA,
+            D.CHAPA,
+            MIN(CASE WHEN D.GRAUPARENTESCO = '6' THEN D.NOME END) AS NOME_PAI,
+            MIN(CASE WHEN D.GRAUPARENTESCO = '7' THEN D.NOME END) AS NOME_MAE
+        FROM PFDEPEND D
+        WHERE D.GRAUPARENTESCO IN ('6', '7')
+        GROUP BY D.CODCOLIGADA, D.CHAPA
+    ) PAIS
+        ON PAIS.CODCOLIGADA = F.CODCOLIGADA
+    AND PAIS.CHAPA = F.CHAPA
+
+    WHERE
+        {where_clause}
+        AND EXISTS (
+            SELECT 1 FROM #SECOES_OBRA SO
+            WHERE SO.CODCOLIGADA = F.CODCOLIGADA AND SO.CODSECAO = F.CODSECAO
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM #NOMES_EXCLUIDOS X WHERE X.NOME = P.NOME
+        )
+
+    ORDER BY F.DATAADMISSAO ASC;
+"""
+
+SQL_FUNCIONARIOS_POR_DATA = _SQL_FUNCIONARIOS_TEMPLATE.format(
+    where_clause="CAST(F.DATAADMISSAO AS DATE) BETWEEN ? AND ?"
+)
+
+
+# Primeira fase (chaves): so o necessario para dedup, contrato e filtro de rascunhos.
+# As colunas completas (documentos, endereco, PFDEPEND) vem depois, via
+# SQL_FUNCIONARIOS_DETALHE, apenas para quem sera de fato cadastrado.
+_SQL_CHAVES_TEMPLATE = """
+    SELECT
+        P.NOME,
+        P.CPF,
+        F.CHAPA,
+        F.DATAADMISSAO,
+        F.CODCOLIGADA,
+        F.CODSECAO
+
+    FROM PFUNC F
+    INNER JOIN PPESSOA P
+        ON P.CODIGO = F.CODPESSOA
+
+    WHERE
+        {where_clause}
+        AND EXISTS (
+            SELECT 1 FROM #SECOES_OBRA SO
+            WHERE SO.CODCOLIGADA = F.CODCOLIGADA AND SO.CODSECAO = F.CODSECAO
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM #NOMES_EXCLUIDOS X WHERE X.NOME = P.NOME
+        )
+
+    ORDER BY F.DATAADMISSAO ASC;
+"""
+
+SQL_CHAVES_POR_DATA = _SQL_CHAVES_TEMPLATE.format(
+    where_clause="CAST(F.DATAADMISSAO AS DATE) BETWEEN ? AND ?"
+)
+
+SQL_PREPARAR_CHAVES_DETALHE = """
+    IF OBJECT_ID('tempdb..#CHAVES_DETALHE') IS NOT NULL DROP TABLE #CHAVES_DETALHE;
+    CREATE TABLE #CHAVES_DETALHE (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CHAPA VARCHAR(16) COLLATE DATABASE_DEFAULT NOT NULL,
+        PRIMARY KEY (CODCOLIGADA, CHAPA)
+    );
+"""
+
+SQL_INSERIR_CHAVE_DETALHE = "INSERT INTO #CHAVES_DETALHE (CODCOLIGADA, CHAPA) VALUES (?, ?)"
+
+# Segunda fase: colunas completas para as chaves (CODCOLIGADA, CHAPA = PK de PFUNC)
+# que sobraram depois do filtro de rascunhos/dedup.
+SQL_FUNCIONARIOS_DETALHE = _SQL_FUNCIONARIOS_TEMPLATE.format(
+    where_clause="""EXISTS (
+            SELECT 1 FROM #CHAVES_DETALHE K
+            WHERE K.CODCOLIGADA = F.CODCOLIGADA AND K.CHAPA = F.CHAPA
+        )"""
+)
+
+
+def montar_sql_funcionarios_por_nomes(
+    quantidade: int,
+    collation: str | None = None,
+    somente_chaves: bool = False,
+) -> str:
+    """
+    IN com quantidade fixa de placeholders (ver dividir_em_chunks). Sem UPPER() na
+    coluna: a comparacao usa a collation da coluna ou, se informada, uma collation
+    CI_AI (case/acento-insensivel). Collation vazia permite seek no indice de NOME.
+    """
+    placeholders = ", ".join(["?"] * max(1, quantidade))
+    coluna = f"P.NOME COLLATE {collation}" if collation else "P.NOME"
+    template = _SQL_CHAVES_TEMPLATE if somente_chaves else _SQL_FUNCIONARIOS_TEMPLATE
+    return template.format(where_clause=f"{coluna} IN ({placeholders})")
+
+
+# Colunas para as chaves da fila TXT; igualdade direta (sem funcao na coluna)
+# para o SQL Server usar os indices de PPESSOA.CPF e PFUNC.CHAPA.
+COLUNAS_CHAVE_TXT = {
+    "CPF": "P.CPF",
+    "CHAPA": "F.CHAPA",
+}
+
+
+def montar_sql_funcionarios_por_chave(campo: str, quantidade: int, somente_chaves: bool = False) -> str:
+    """IN com quantidade fixa de placeholders sobre CPF ou CHAPA (ver dividir_em_chunks)."""
+    coluna = COLUNAS_CHAVE_TXT[campo]
+    placeholders = ", ".join(["?"] * max(1, quantidade))
+    template = _SQL_CHAVES_TEMPLATE if somente_chaves else _SQL_FUNCIONARIOS_TEMPLATE
+    return template.format(where_clause=f"{coluna} IN ({placeholders})")
+
+
+def chave_funcionario(funcionario: dict) -> tuple[int, str]:
+    """(CODCOLIGADA, CHAPA) normalizado, usado para casar chaves e detalhes."""
+    return int(funcionario.get("CODCOLIGADA") or 0), str(funcionario.get("CHAPA") or "").strip()
+
+
+def mesclar_detalhes(funcionarios: list[dict], detalhes: list[dict]) -> list[dict]:
+    """
+    Completa (in place) cada registro da fase de chaves com as colunas da fase de
+    detalhe. Retorna os registros sem detalhe (saiu da obra/filtro entre as fases).
+    """
+    por_chave = {chave_funcionario(d): d for d in detalhes}
+    sem_detalhe = []
+    for func in funcionarios:
+        detalhe = por_chave.get(chave_funcionario(func))
+        if detalhe is None:
+            sem_detalhe.append(func)
+            continue
+        func.update(detalhe)
+    return sem_detalhe
+
+
+def dividir_em_chunks(valores: list, tamanho: int) -> list[list]:
+    """
+    Divide em chunks de exatamente `tamanho` itens (limite de 2100 parametros do
+    SQL Server). O ultimo chunk e completado repetindo seu ultimo valor, para que
+    todos usem o mesmo texto SQL e o mesmo plano.
+    """
+    tamanho = max(1, int(tamanho))
+    chunks = []
+    for i in range(0, len(valores), tamanho):
+        chunk = list(valores[i:i + tamanho])
+        chunk.extend([chunk[-1]] * (tamanho - len(chunk)))
+        chunks.append(chunk)
+    return chunks
+
+
+def calcular_janela_admissao(data_admissao: str | date | None, dias_retroativos: int) -> tuple[date, date]:
+    """Retorna (data_inicio, data_fim) da janela de admissao."""
+    if not data_admissao:
+        data_fim = datetime.now().date()
+    elif isinstance(data_admissao, datetime):
+        data_fim = data_admissao.date()
+    elif isinstance(data_admissao, date):
+        data_fim = data_admissao
+    else:
+        data_fim = datetime.strptime(str(data_admissao), "%Y-%m-%d").date()
+    data_inicio = data_fim - timedelta(days=max(0, int(dias_retroativos or 0)))
+    return data_inicio, data_fim
+
+
+def carregar_nomes_excluidos(path: str | None) -> list[str]:
+    """
+    Carrega a lista de exclusao (um nome por linha, # para comentario).
+    Sem arquivo, usa NOMES_EXCLUIDOS_PADRAO.
+    """
+    if not path or not os.path.exists(path):
+        origem = NOMES_EXCLUIDOS_PADRAO
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            origem = f.readlines()
+
+    nomes = []
+    vistos = set()
+    for linha in origem:
+        nome = " ".join(str(linha).split()).upper()
+        if not nome or nome.startswith("#") or nome in vistos:
+            continue
+        vistos.add(nome)
+        nomes.append(nome)
+    return nomes
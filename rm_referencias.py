@@ -0,0 +1,133 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from utils import gravar_json_atomico
+
+
+# Tabelas de referencia do RM (pequenas e quase estaticas). Lidas uma vez e
+# mantidas em cache local para que a query principal nao precise fazer CAST
+# de CODSECAO para XML em cada linha de PFUNC.
+SQL_SECOES = """
+    SELECT SEC.CODCOLIGADA, SEC.CODIGO, SEC.NROCENCUSTOCONT
+    FROM PSECAO SEC
+"""
+
+SQL_FUNCOES = """
+    SELECT FU.CODCOLIGADA, CAST(FU.CODIGO AS VARCHAR(20)) AS CODIGO, FU.NOME
+    FROM PFUNCAO FU
+"""
+
+SQL_PREPARAR_SECOES_OBRA = """
+    IF OBJECT_ID('tempdb..#SECOES_OBRA') IS NOT NULL DROP TABLE #SECOES_OBRA;
+    CREATE TABLE #SECOES_OBRA (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CODSECAO VARCHAR(35) COLLATE DATABASE_DEFAULT NOT NULL,
+        PRIMARY KEY (CODCOLIGADA, CODSECAO)
+    );
+"""
+
+SQL_INSERIR_SECAO_OBRA = "INSERT INTO #SECOES_OBRA (CODCOLIGADA, CODSECAO) VALUES (?, ?)"
+
+CARGO_NAO_INFORMADO = "NAO INFORMADO"
+
+
+def _chave(codcoligada, codigo) -> str:
+    return f"{str(codcoligada).strip()}|{str(codigo or '').strip()}"
+
+
+def extrair_numero_obra(codsecao: str | None) -> int | None:
+    """Equivalente ao /i[2] do XML: segundo segmento do CODSECAO (ex: 36.125.001 -> 125)."""
+    if not codsecao:
+        return None
+    partes = str(codsecao).strip().split(".")
+    if len(partes) < 2:
+        return None
+    try:
+        return int(partes[1])
+    except ValueError:
+        return None
+
+
+def montar_referencias(secoes_rows, funcoes_rows) -> dict:
+    secoes = {}
+    for codcoligada, codigo, centro_custo in secoes_rows:
+        secoes[_chave(codcoligada, codigo)] = {
+            "codcoligada": int(codcoligada),
+            "codsecao": str(codigo).strip(),
+            "centro_custo": centro_custo,
+            "numero_obra": extrair_numero_obra(codigo),
+        }
+    funcoes = {}
+    for codcoligada, codigo, nome in funcoes_rows:
+        funcoes[_chave(codcoligada, codigo)] = " ".join(str(nome or "").split()).upper()
+    return {
+        "gerado_em": datetime.now().isoformat(),
+        "secoes": secoes,
+        "funcoes": funcoes,
+    }
+
+
+def referencias_validas(referencias: dict | None, ttl_horas: float, agora: datetime | None = None) -> bool:
+    if not referencias or not referencias.get("gerado_em"):
+        return False
+    agora = agora or datetime.now()
+    try:
+        gerado_em = datetime.fromisoformat(referencias["gerado_em"])
+    except ValueError:
+        return False
+    if gerado_em.date() != agora.date():
+        # Refresh diario: secoes novas entram no primeiro run do dia.
+        return False
+    return agora - gerado_em <= timedelta(hours=ttl_horas)
+
+
+def ler_cache_referencias(path: str) -> dict | None:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_cache_referencias(path: str, referencias: dict):
+    gravar_json_atomico(path, referencias)
+
+
+def obter_referencias(cursor, cache_path: str, ttl_horas: float = 24) -> tuple[dict, bool]:
+    """
+    Retorna (referencias, veio_do_cache). Consulta PSECAO/PFUNCAO apenas quando
+    o cache local esta ausente, expirado ou de outro dia.
+    """
+    referencias = ler_cache_referencias(cache_path)
+    if referencias_validas(referencias, ttl_horas):
+        return referencias, True
+
+    cursor.execute(SQL_SECOES)
+    secoes_rows = cursor.fetchall()
+    cursor.execute(SQL_FUNCOES)
+    funcoes_rows = cursor.fetchall()
+    referencias = montar_referencias(secoes_rows, funcoes_rows)
+    gravar_cache_referencias(cache_path, referencias)
+    return referencias, False
+
+
+def secoes_da_obra(referencias: dict, numero_obra: int) -> list[tuple[int, str]]:
+    return [
+        (sec["codcoligada"], sec["codsecao"])
+        for sec in (referencias.get("secoes") or {}).values()
+        if sec.get("numero_obra") == numero_obra
+    ]
+
+
+def enriquecer_funcionario(funcionario: dict, referencias: dict) -> dict:
+    """Preenche CENTRO_CUSTO, DESCRICAO_CARGO e NUMERO_OBRA a partir do cache."""
+    codcoligada = funcionario.get("CODCOLIGADA")
+    secao = (referencias.get("secoes") or {}).get(_chave(codcoligada, funcionario.get("CODSECAO"))) or {}
+    cargo = (referencias.get("funcoes") or {}).get(_chave(codcoligada, funcionario.get("CODFUNCAO")))
+    funcionario["CENTRO_CUSTO"] = secao.get("centro_custo")
+    funcionario["DESCRICAO_CARGO"] = cargo or CARGO_NAO_INFORMADO
+    funcionario["NUMERO_OBRA"] = secao.get("numero_obra", extrair_numero_obra(funcionario.get("CODSECAO")))
+    return funcionario
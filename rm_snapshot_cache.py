@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+
+# Snapshot local dos resultados da query RM. Evita repetir a query pesada em
+# reexecucoes proximas (falha no portal, --txt com os mesmos nomes).
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS rm_snapshots (
+        chave TEXT PRIMARY KEY,
+        descricao TEXT NOT NULL,
+        criado_em REAL NOT NULL,
+        linhas TEXT NOT NULL
+    )
+"""
+
+
+def _codificar_valor(valor):
+    if isinstance(valor, datetime):
+        return {"__datetime__": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"__date__": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {"__decimal__": str(valor)}
+    return valor
+
+
+def _decodificar_valor(valor):
+    if isinstance(valor, dict):
+        if "__datetime__" in valor:
+            return datetime.fromisoformat(valor["__datetime__"])
+        if "__date__" in valor:
+            return date.fromisoformat(valor["__date__"])
+        if "__decimal__" in valor:
+            return Decimal(valor["__decimal__"])
+    return valor
+
+
+def serializar_linhas(linhas: list[dict]) -> str:
+    return json.dumps(
+        [{k: _codificar_valor(v) for k, v in linha.items()} for linha in linhas],
+        ensure_ascii=False,
+    )
+
+
+def desserializar_linhas(conteudo: str) -> list[dict]:
+    return [{k: _decodificar_valor(v) for k, v in linha.items()} for linha in json.loads(conteudo)]
+
+
+def montar_chave_snapshot(modo: str, data_inicio=None, data_fim=None, nomes: list[str] | None = None, extras: dict | None = None) -> tuple[str, dict]:
+    """Retorna (chave_hash, descricao) para modo, janela de datas e hash da lista TXT."""
+    nomes_hash = None
+    if nomes:
+        nomes_hash = hashlib.sha256("\n".join(sorted(nomes)).encode("utf-8")).hexdigest()
+    descricao = {
+        "modo": modo,
+        "data_inicio": data_inicio.isoformat() if data_inicio else None,
+        "data_fim": data_fim.isoformat() if data_fim else None,
+        "nomes_hash": nomes_hash,
+        "nomes_total": len(nomes or []),
+    }
+    descricao.update(extras or {})
+    chave = hashlib.sha256(json.dumps(descricao, sort_keys=True).encode("utf-8")).hexdigest()
+    return chave, descricao
+
+
+def _conectar(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute(SQL_CRIAR_TABELA)
+    return conn
+
+
+def ler_snapshot(path: str, chave: str, ttl_seg: float, agora: float | None = None) -> list[dict] | None:
+    """Linhas do snapshot se existir e estiver dentro do TTL; senao None."""
+    if ttl_seg <= 0 or not os.path.exists(path):
+        return None
+    agora = agora if agora is not None else time.time()
+    conn = _conectar(path)
+    try:
+        row = conn.execute("SELECT criado_em, linhas FROM rm_snapshots WHERE chave = ?", (chave,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    criado_em, linhas = row
+    if agora - criado_em > ttl_seg:
+        return None
+    return desserializar_linhas(linhas)
+
+
+def gravar_snapshot(path: str, chave: str, descricao: dict, linhas: list[dict], ttl_seg: float, agora: float | None = None):
+    agora = agora if agora is not None else time.time()
+    conn = _conectar(path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rm_snapshots (chave, descricao, criado_em, linhas) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(descricao, sort_keys=True), agora, serializar_linhas(linhas)),
+            )
+            conn.execute("DELETE FROM rm_snapshots WHERE criado_em < ?", (agora - max(ttl_seg, 0),))
+    finally:
+        conn.close()
+
+
+def invalidar_snapshots(path: str, chave: str | None = None) -> int:
+    """Remove um snapshot (ou todos, sem chave). Retorna quantos foram removidos."""
+    if not os.path.exists(path):
+        return 0
+    conn = _conectar(path)
+    try:
+        with conn:
+            if chave:
+                cursor = conn.execute("DELETE FROM rm_snapshots WHERE chave = ?", (chave,))
+            else:
+                cursor = conn.execute("DELETE FROM rm_snapshots")
+            return cursor.rowcount
+    finally:
+        conn.close()
@@ -22,15 +22,28 @@ from config import (
     METAX_CONTRATO_MECANICA_VALUE, METAX_CONTRATO_MECANICA_LABEL,
     METAX_CONTRATO_ELETROMECANICA_VALUE, METAX_CONTRATO_ELETROMECANICA_LABEL,
     METAX_CONTRATO_DEFAULT_VALUE, METAX_CONTRATO_DEFAULT_LABEL,
-    FOTOS_BUSCA_DIRS
+    FOTOS_BUSCA_DIRS, TIMEOUTS_PORTAL_PATH
 )
 from output_manager import OutputManager, KIND_SCREENSHOTS, KIND_JSON
+from timeouts_adaptativos import TimeoutsAdaptativos
+from sessao_persistida import (
+    caminho_estado_sessao, descartar_estado_sessao, existe_estado_sessao,
+    gravar_estado_sessao, ler_estado_sessao,
+)
 
 TIMEOUT = 60000 
 TEMPO_CAPTCHA_MS = 180000 
 TIMEOUT_CURTO = 8000
 TIMEOUT_MEDIO = 15000
 
+# CEP (8 digitos) -> encontrado no portal sem fallback; lido pelo agendador (cache/ceps_portal.sqlite3).
+CEPS_CONSULTADOS: dict[str, bool] = {}
+
+# Esperas do formulario com timeout aprendido da latencia do portal (cache/timeouts_portal.json).
+TIMEOUTS_ADAPTATIVOS = TimeoutsAdaptativos(
+    TIMEOUTS_PORTAL_PATH, log=lambda mensagem, detalhes: logger.info(mensagem, details=detalhes)
+)
+
 
 def _somente_digitos(valor) -> str:
     return "".join(filter(str.isdigit, str(valor or "")))
@@ -44,11 +57,30 @@ def _capturar_screenshot_seguro(page, timeout_ms: int = 8000):
     return page.screenshot(timeout=timeout_ms, full_page=False, animations="disabled")
 
 
-def _esperar_visivel(page, seletor: str, timeout: int = TIMEOUT_CURTO):
-    page.wait_for_selector(seletor, state="visible", timeout=timeout)
+def _medir(etapa: str, timeout: int | None = None):
+    return TIMEOUTS_ADAPTATIVOS.medir(etapa, timeout, (PlaywrightTimeoutError,))
+
+
+def gravar_timeouts_adaptativos() -> dict:
+    """Persiste as latencias observadas na execucao e devolve o resumo por etapa."""
+    try:
+        TIMEOUTS_ADAPTATIVOS.gravar()
+    except Exception as e:
+        logger.warn("Falha ao gravar latencias do portal", details={"path": TIMEOUTS_PORTAL_PATH, "error": str(e)})
+    return TIMEOUTS_ADAPTATIVOS.resumo()
+
 
+def _esperar_visivel(page, seletor: str, timeout: int | None = None, etapa: str = "campo_visivel"):
+    with _medir(etapa, timeout) as timeout_ms:
+        page.wait_for_selector(seletor, state="visible", timeout=timeout_ms)
 
-def _preencher_campo_rapido(page, seletor: str, valor: str, timeout: int = TIMEOUT_CURTO):
+
+def _aguardar_campo(page, seletor: str, state: str = "visible"):
+    with _medir("campo_formulario") as timeout_ms:
+        page.wait_for_selector(seletor, state=state, timeout=timeout_ms)
+
+
+def _preencher_campo_rapido(page, seletor: str, valor: str, timeout: int | None = None):
     _esperar_visivel(page, seletor, timeout=timeout)
     page.fill(seletor, valor)
     try:
@@ -103,23 +135,24 @@ def _preencher_cpf_rapido(page, cpf_formatado: str):
         pass
 
 
-def _aguardar_combo_carregado(page, seletor: str, timeout: int = TIMEOUT_MEDIO) -> bool:
+def _aguardar_combo_carregado(page, seletor: str, timeout: int | None = None) -> bool:
     try:
-        page.wait_for_function(
-            """(sel) => {
-                const el = document.querySelector(sel);
-                if (!el) return false;
-                const options = el.options || [];
-                const validas = Array.from(options).filter(o => {
-                    const texto = (o.textContent || '').trim().toUpperCase();
-                    const valor = (o.value || '').trim();
-                    return valor && valor != '0' && texto && texto !== 'SELECIONE' && texto !== 'SELECIONE...';
-                });
-                return validas.length > 0;
-            }""",
-            seletor,
-            timeout=timeout,
-        )
+        with _medir("combo_carregado", timeout) as timeout_ms:
+            page.wait_for_function(
+                """(sel) => {
+                    const el = document.querySelector(sel);
+                    if (!el) return false;
+                    const options = el.options || [];
+                    const validas = Array.from(options).filter(o => {
+                        const texto = (o.textContent || '').trim().toUpperCase();
+                        const valor = (o.value || '').trim();
+                        return valor && valor != '0' && texto && texto !== 'SELECIONE' && texto !== 'SELECIONE...';
+                    });
+                    return validas.length > 0;
+                }""",
+                seletor,
+                timeout=timeout_ms,
+            )
         return True
     except Exception:
         return False
@@ -256,7 +289,7 @@ def _aguardar_datatable_carregar(page, timeout: int = 8000) -> None:
         pass
 
 
-def anexar_foto(page, caminho_foto: str) -> None:
+def anexar_foto(page, caminho_foto: str, foto_reduzida: str | None = None) -> None:
     """
     Anexa a foto do funcionÃ¡rio no formulÃ¡rio do MetaX.
     Realiza o redimensionamento antes do upload.
@@ -264,9 +297,11 @@ def anexar_foto(page, caminho_foto: str) -> None:
     Args:
         page (Page): Objeto de pÃ¡gina do Playwright.
         caminho_foto (str): Caminho local para a foto original.
+        foto_reduzida (str | None): Foto ja reduzida fora da thread do browser (pipeline).
     """
     try:
-        foto_reduzida = reduzir_foto_para_metax(caminho_foto)
+        if not foto_reduzida:
+            foto_reduzida = reduzir_foto_para_metax(caminho_foto)
 
         if not foto_reduzida:
             logger.info("Foto ignorada (nÃ£o compatÃ­vel)", details={"path": caminho_foto})
@@ -388,7 +423,7 @@ def selecionar_cargo_por_descricao(page, descricao_cargo: str) -> bool:
     """
     descricao_cargo = descricao_cargo.strip().upper()
 
-    _esperar_visivel(page, "#cargo", timeout=TIMEOUT_MEDIO)
+    _esperar_visivel(page, "#cargo", etapa="combo_cargo")
     _aguardar_combo_carregado(page, "#cargo", timeout=5000)
 
     select = page.locator("#cargo")
@@ -526,10 +561,49 @@ def _selecionar_contrato(page, contrato_value: str | None, contrato_label: str |
     )
 
 
-def iniciar_sessao(headless: bool = False, contrato_value: str | None = None, contrato_label: str | None = None):
+def _sessao_autenticada(page) -> bool:
+    """Sonda barata: CredenciamentoLista abre sem redirecionar para o login."""
+    try:
+        page.goto("https://portal.metax.ind.br/CredenciamentoLista/Index", timeout=TIMEOUT_MEDIO, wait_until="domcontentloaded")
+    except Exception:
+        return False
+    return "SegLogin" not in page.url and page.locator("#txtLogin").count() == 0
+
+
+def _reaproveitar_sessao_salva(browser, estado_path: str):
+    """Page ja logada a partir do storage_state salvo, ou None se ausente/expirado."""
+    storage_state = ler_estado_sessao(estado_path)
+    if not storage_state:
+        return None
+    context = browser.new_context(ignore_https_errors=True, storage_state=storage_state)
+    page = context.new_page()
+    if _sessao_autenticada(page):
+        logger.info("Sessao salva reaproveitada (sem login/CAPTCHA).", details={"path": estado_path})
+        return page
+    logger.info("Sessao salva expirada no portal; seguindo com login completo.", details={"path": estado_path})
+    context.close()
+    descartar_estado_sessao(estado_path)
+    return None
+
+
+def iniciar_sessao(
+    headless: bool = False,
+    contrato_value: str | None = None,
+    contrato_label: str | None = None,
+    resolver_contrato=None,
+    estado_sessao_dir: str | None = None,
+):
     """
     Inicia o browser, realiza login e navega ate a tela inicial do sistema.
 
+    resolver_contrato: callable opcional chamado depois do CAPTCHA, quando o combo
+    de contrato ja esta disponivel. Retorna (value, label) ou None para cancelar a
+    sessao (browser fechado e retorno (None, None, None)).
+
+    estado_sessao_dir: com valor, tenta antes o storage_state salvo do contrato
+    (sonda em CredenciamentoLista) e, apos um login completo, salva o novo estado.
+    Havendo sessao salva, resolver_contrato e chamado antes do login para escolher o arquivo.
+
     Returns:
         tuple: (playwright_instance, browser_instance, page_instance)
     """
@@ -540,6 +614,27 @@ def iniciar_sessao(headless: bool = False, contrato_value: str | None = None, co
         msg = "Falha ao iniciar navegador. Verifique se os browsers do Playwright estao instalados (python -m playwright install chromium)."
         logger.error(msg, details={"erro": str(e)})
         raise RuntimeError(msg) from e
+
+    if estado_sessao_dir and resolver_contrato is not None and existe_estado_sessao(estado_sessao_dir):
+        contrato = resolver_contrato()
+        if contrato is None:
+            logger.info("Sessao cancelada antes da selecao de contrato.")
+            browser.close()
+            p.stop()
+            return None, None, None
+        contrato_value, contrato_label = contrato
+        resolver_contrato = None
+    if estado_sessao_dir and resolver_contrato is None:
+        try:
+            page = _reaproveitar_sessao_salva(
+                browser, caminho_estado_sessao(estado_sessao_dir, contrato_value, contrato_label)
+            )
+        except Exception as e:
+            logger.warn("Falha ao reaproveitar sessao salva; seguindo com login completo.", details={"error": str(e)})
+            page = None
+        if page is not None:
+            return p, browser, page
+
     context = browser.new_context(ignore_https_errors=True)
     page = context.new_page()
 
@@ -571,6 +666,15 @@ def iniciar_sessao(headless: bool = False, contrato_value: str | None = None, co
             timeout=TEMPO_CAPTCHA_MS
         )
 
+        if resolver_contrato is not None:
+            contrato = resolver_contrato()
+            if contrato is None:
+                logger.info("Sessao cancelada antes da selecao de contrato.")
+                browser.close()
+                p.stop()
+                return None, None, None
+            contrato_value, contrato_label = contrato
+
         _selecionar_contrato(page, contrato_value, contrato_label)
         page.evaluate("""
             const select = document.querySelector('#comboContrato');
@@ -584,6 +688,16 @@ def iniciar_sessao(headless: bool = False, contrato_value: str | None = None, co
         page.wait_for_selector('text=Termo de confirma', state="hidden", timeout=TIMEOUT)
         logger.info("Login concluido com sucesso!")
 
+        if estado_sessao_dir:
+            estado_path = caminho_estado_sessao(estado_sessao_dir, contrato_value, contrato_label)
+            try:
+                if gravar_estado_sessao(estado_path, context.storage_state()):
+                    logger.info("Sessao salva para as proximas execucoes.", details={"path": estado_path})
+                else:
+                    logger.warn("Sessao nao salva: DPAPI (pywin32) indisponivel.")
+            except Exception as e:
+                logger.warn("Falha ao salvar sessao.", details={"path": estado_path, "error": str(e)})
+
         return p, browser, page
 
     except Exception as e:
@@ -592,6 +706,40 @@ def iniciar_sessao(headless: bool = False, contrato_value: str | None = None, co
         p.stop()
         raise e
 
+
+def exportar_estado_sessao(page) -> dict:
+    """storage_state (cookies e localStorage) da sessao logada, com o contrato ja selecionado."""
+    return page.context.storage_state()
+
+
+def abrir_sessao_com_estado(storage_state: dict, headless: bool = False):
+    """
+    Abre outro browser ja autenticado a partir do storage_state de uma sessao logada,
+    sem login/CAPTCHA. Cada chamada inicia seu proprio Playwright, entao pode ser usada
+    em threads diferentes da sessao original.
+
+    Returns:
+        tuple: (playwright_instance, browser_instance, page_instance)
+    """
+    p = sync_playwright().start()
+    try:
+        browser = p.chromium.launch(channel="chrome", headless=headless)
+    except Exception as e:
+        p.stop()
+        msg = "Falha ao iniciar navegador. Verifique se os browsers do Playwright estao instalados (python -m playwright install chromium)."
+        logger.error(msg, details={"erro": str(e)})
+        raise RuntimeError(msg) from e
+    try:
+        context = browser.new_context(ignore_https_errors=True, storage_state=storage_state)
+        page = context.new_page()
+        if not _sessao_autenticada(page):
+            raise RuntimeError("Sessao compartilhada expirada: portal redirecionou para o login.")
+        return p, browser, page
+    except Exception:
+        browser.close()
+        p.stop()
+        raise
+
 # ==============================================================================
 # FUNÃ‡ÃƒO DE CADASTRO (Recebe page logada)
 # ==============================================================================
@@ -933,13 +1081,13 @@ def preencher_dados_pessoais(page, funcionario: dict) -> None:
     data_nasc_formatada = formatar_data(data_nasc_rm)
 
     if data_nasc_formatada:
-        page.wait_for_selector('#dtNasc', timeout=TIMEOUT)
+        _aguardar_campo(page, '#dtNasc')
         page.fill('#dtNasc', data_nasc_formatada)
     else:
         logger.warn("Data de nascimento vazia")
 
     # NACIONALIDADE 
-    page.wait_for_selector('#nacionalidade', timeout=TIMEOUT)
+    _aguardar_campo(page, '#nacionalidade')
     page.select_option('#nacionalidade', value='1')
 
     # SEXO
@@ -950,7 +1098,7 @@ def preencher_dados_pessoais(page, funcionario: dict) -> None:
         valor_sexo = MAPA_SEXO.get(sexo_rm)
 
     if valor_sexo:
-        page.wait_for_selector('#sexo', timeout=TIMEOUT)
+        _aguardar_campo(page, '#sexo')
         if not selecionar_opcao_select(page, '#sexo', value=valor_sexo, label=valor_sexo):
             logger.warn(
                 "Sexo nao encontrado no combo do MetaX.",
@@ -962,7 +1110,7 @@ def preencher_dados_pessoais(page, funcionario: dict) -> None:
     # EMAIL    
     email = funcionario.get("EMAIL", "")
     if email:
-        page.wait_for_selector('#selecaoPadraoEmail', timeout=TIMEOUT)
+        _aguardar_campo(page, '#selecaoPadraoEmail')
         page.fill('#selecaoPadraoEmail', email)
 
     # TELEFONE EMERGENCIAL
@@ -988,7 +1136,7 @@ def preencher_documentos(page, funcionario: dict) -> None:
     datacpts = funcionario.get("DTCARTTRAB", "")
 
     # ORGAO EMISSOR
-    page.wait_for_selector('#orgEmissorRG', timeout=TIMEOUT)
+    _aguardar_campo(page, '#orgEmissorRG')
     page.fill('#orgEmissorRG', orgamoemissor)
 
     # UF DO RG
@@ -999,13 +1147,13 @@ def preencher_documentos(page, funcionario: dict) -> None:
         valor_uf_rg = MAPA_ESTADO_NATAL.get(uf_rg_rm)
 
     if valor_uf_rg:
-        page.wait_for_selector('#ufRG', timeout=TIMEOUT)
+        _aguardar_campo(page, '#ufRG')
         page.select_option('#ufRG', value=valor_uf_rg)
     else:
         logger.warn(f"UF do RG nÃ£o mapeada ou vazia: {uf_rg_rm}", details={"uf": uf_rg_rm})
     
     # NUMERO RG
-    page.wait_for_selector('#numRG', timeout=TIMEOUT)
+    _aguardar_campo(page, '#numRG')
     page.fill('#numRG', numerorg)
 
     # EMISSAO RG
@@ -1030,21 +1178,21 @@ def preencher_documentos(page, funcionario: dict) -> None:
 
     dataemissao = formatar_data(dataemissao)
     if dataemissao:
-        page.wait_for_selector('#dtEmissaoRG', timeout=TIMEOUT)
+        _aguardar_campo(page, '#dtEmissaoRG')
         page.fill('#dtEmissaoRG', dataemissao)
     else:
         logger.warn("Data de emissÃ£o do RG vazia")
 
     # CTPS DIGITAL
-    page.wait_for_selector('#cmbCTPSDigital', timeout=TIMEOUT)
+    _aguardar_campo(page, '#cmbCTPSDigital')
     page.check('#cmbCTPSDigital')
 
     # NUMERO CTPS
-    page.wait_for_selector('#numCTPS', timeout=TIMEOUT)
+    _aguardar_campo(page, '#numCTPS')
     page.fill('#numCTPS', numerocpts)
 
     # SERIE CTPS
-    page.wait_for_selector('#serieCTPS', timeout=TIMEOUT)
+    _aguardar_campo(page, '#serieCTPS')
     page.fill('#serieCTPS', seriecpts)
 
     # ESTADO CTPS
@@ -1055,7 +1203,7 @@ def preencher_documentos(page, funcionario: dict) -> None:
         valor_estado = MAPA_ESTADO_NATAL.get(estadocpts)
 
     if valor_estado:
-        page.wait_for_selector('#ufCTPS', timeout=TIMEOUT)
+        _aguardar_campo(page, '#ufCTPS')
         page.select_option('#ufCTPS', value=valor_estado)
     else:
         logger.warn(f"Estado natal nÃ£o mapeado: {estadocpts}", details={"uf": estadocpts})
@@ -1063,7 +1211,7 @@ def preencher_documentos(page, funcionario: dict) -> None:
     # DATA CTPS
     data_formatada_cpts = formatar_data(datacpts)
     if data_formatada_cpts:
-        page.wait_for_selector('#dtCTPS', timeout=TIMEOUT)
+        _aguardar_campo(page, '#dtCTPS')
         page.fill('#dtCTPS', data_formatada_cpts)
     else:
         logger.warn("Data de nascimento vazia")
@@ -1311,27 +1459,30 @@ def preencher_endereco(page, funcionario: dict) -> None:
         except Exception:
             pass
 
+        # Segunda tentativa com 1,5x o limite (antes 6000/9000 ms fixos).
+        limite_cep = TIMEOUTS_ADAPTATIVOS.timeout("cep_resposta")
         for tentativa in range(2):
             try:
-                page.wait_for_function("""() => {
-                    const val = (el) => (el && (el.value || '')).trim();
-                    const norm = (s) => (s || '').toUpperCase().trim();
-                    const valid = (s) => s && s !== '0' && s !== 'SELECIONE' && s !== 'SELECIONE...';
+                with _medir("cep_resposta", limite_cep if tentativa == 0 else int(limite_cep * 1.5)) as timeout_ms:
+                    page.wait_for_function("""() => {
+                        const val = (el) => (el && (el.value || '')).trim();
+                        const norm = (s) => (s || '').toUpperCase().trim();
+                        const valid = (s) => s && s !== '0' && s !== 'SELECIONE' && s !== 'SELECIONE...';
 
-                    const bairro = document.querySelector('#nomeBairro');
-                    const logradouro = document.querySelector('#comboLogradouro');
+                        const bairro = document.querySelector('#nomeBairro');
+                        const logradouro = document.querySelector('#comboLogradouro');
 
-                    const cidadeSel = document.querySelector('#comboCidade') ||
-                        document.querySelector('select[id*="Cidade"], select[name*="Cidade"]');
+                        const cidadeSel = document.querySelector('#comboCidade') ||
+                            document.querySelector('select[id*="Cidade"], select[name*="Cidade"]');
 
-                    const selectOk = (el) => el && (el.tagName || '').toUpperCase() === 'SELECT' && (el.options || []).length > 1;
+                        const selectOk = (el) => el && (el.tagName || '').toUpperCase() === 'SELECT' && (el.options || []).length > 1;
 
-                    const bairroOk = selectOk(bairro) || (bairro && !bairro.disabled && !bairro.readOnly && valid(norm(val(bairro))));
-                    const logOk = selectOk(logradouro) || (logradouro && !logradouro.disabled && !logradouro.readOnly && valid(norm(val(logradouro))));
-                    const cidadeOk = cidadeSel && (cidadeSel.options || []).length > 1;
+                        const bairroOk = selectOk(bairro) || (bairro && !bairro.disabled && !bairro.readOnly && valid(norm(val(bairro))));
+                        const logOk = selectOk(logradouro) || (logradouro && !logradouro.disabled && !logradouro.readOnly && valid(norm(val(logradouro))));
+                        const cidadeOk = cidadeSel && (cidadeSel.options || []).length > 1;
 
-                    return bairroOk || logOk || cidadeOk;
-                }""", timeout=6000 if tentativa == 0 else 9000)
+                        return bairroOk || logOk || cidadeOk;
+                    }""", timeout=timeout_ms)
                 break
             except Exception as e:
                 if tentativa == 0:
@@ -1377,7 +1528,10 @@ def preencher_endereco(page, funcionario: dict) -> None:
             logger.info("Bairro ajustado via RM (pre-fallback)", details={"bairro": result.get("selected", bairro_rm)})
         snap_cep = _snapshot_endereco("apos_bairro_rm")
 
-    if not _cep_parece_valido(snap_cep):
+    cep_encontrado = _cep_parece_valido(snap_cep)
+    if len(_somente_digitos(cep)) == 8:
+        CEPS_CONSULTADOS[_somente_digitos(cep)] = cep_encontrado
+    if not cep_encontrado:
         logger.warn(f"CEP {cep} nÃ£o encontrou endereÃ§o. Tentando fallback...", details={"cep": cep})
 
         # Fallback fixo (orientacao MetaX)
@@ -1459,7 +1613,7 @@ def preencher_endereco(page, funcionario: dict) -> None:
 
     # BAIRRO
     fechar_modais_bloqueantes(page)
-    page.wait_for_selector("#nomeBairro", state="visible", timeout=TIMEOUT)
+    _aguardar_campo(page, "#nomeBairro")
     bairro_metax = ""
     try:
         bairro_metax = page.input_value("#nomeBairro").strip()
@@ -1491,7 +1645,7 @@ def preencher_endereco(page, funcionario: dict) -> None:
 
     # LOGRADOURO
     fechar_modais_bloqueantes(page)
-    page.wait_for_selector("#comboLogradouro", state="visible", timeout=TIMEOUT)
+    _aguardar_campo(page, "#comboLogradouro")
     logradouro_metax = ""
     try:
         logradouro_metax = page.input_value("#comboLogradouro").strip()
@@ -1657,11 +1811,14 @@ def salvar_cadastro(page, cpf: str, output_manager: OutputManager) -> dict:
         page.wait_for_timeout(300)
         btn_rascunho.click()
 
-        max_retries = 90
+        limite_ms = TIMEOUTS_ADAPTATIVOS.timeout("salvar_rascunho")
         start_time = datetime.now()
         last_click_time = datetime.now()
 
-        while (datetime.now() - start_time).seconds < max_retries:
+        def _duracao_ms() -> float:
+            return (datetime.now() - start_time).total_seconds() * 1000
+
+        while _duracao_ms() < limite_ms:
             page.wait_for_timeout(1000)
 
             if (datetime.now() - last_click_time).seconds > 20:
@@ -1683,6 +1840,7 @@ def salvar_cadastro(page, cpf: str, output_manager: OutputManager) -> dict:
                 last_click_time = datetime.now()
 
             if "CredenciamentoLista" in page.url:
+                TIMEOUTS_ADAPTATIVOS.registrar("salvar_rascunho", _duracao_ms())
                 logger.info("Rascunho salvo (confirmacao por redirecionamento).")
                 return {"attempted": True, "saved": True, "error": "", "detail": "confirmado_por_redirecionamento"}
 
@@ -1691,6 +1849,7 @@ def salvar_cadastro(page, cpf: str, output_manager: OutputManager) -> dict:
                 texto_completo = " | ".join(textos_modais).lower()
 
                 if "sucesso" in texto_completo:
+                    TIMEOUTS_ADAPTATIVOS.registrar("salvar_rascunho", _duracao_ms())
                     logger.info("Modal de confirmacao detectado.", details={"modais": textos_modais})
 
                     try:
@@ -1729,7 +1888,11 @@ def salvar_cadastro(page, cpf: str, output_manager: OutputManager) -> dict:
 
                     return {"attempted": True, "saved": False, "error": "Erro ao salvar (modal).", "detail": ""}
 
-        logger.error(f"Rascunho NAO foi salvo (Timeout). URL atual: {page.url}", details={"url": page.url})
+        TIMEOUTS_ADAPTATIVOS.registrar("salvar_rascunho", limite_ms)
+        logger.error(
+            f"Rascunho NAO foi salvo (Timeout). URL atual: {page.url}",
+            details={"url": page.url, "timeout_ms": limite_ms},
+        )
 
         try:
             alertas = page.locator(".alert, .validation-summary-errors").all_inner_texts()
@@ -1825,6 +1988,7 @@ def cadastrar_funcionario(
     output_manager: OutputManager,
     caminho_foto: str = None,
     contrato_chave: str | None = None,
+    foto_reduzida: str | None = None,
 ) -> dict:
     """
     Funcao principal que orquestra todo o cadastro de um funcionario.
@@ -1847,7 +2011,7 @@ def cadastrar_funcionario(
 
     no_photo = False
     if caminho_final:
-        anexar_foto(page, caminho_final)
+        anexar_foto(page, caminho_final, foto_reduzida=foto_reduzida if caminho_final == caminho_foto else None)
     else:
         no_photo = True
         logger.info(f"Nenhuma foto encontrada para CPF {cpf} - seguindo sem foto", details={"cpf": cpf})
@@ -0,0 +1,114 @@
+"""
+Benchmark de compilacao da query RM.
+
+Compara o texto SQL com datas/exclusoes inline (um texto por execucao, recompila
+sempre) contra o texto fixo parametrizado (plano reaproveitado do cache).
+Le "SQL Server parse and compile time" via SET STATISTICS TIME.
+
+Uso:
+    python scripts/benchmark_rm_query.py --iteracoes 5
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import obter_conexao  # noqa: E402
+from config import CACHE_DIR, DIAS_RETROATIVOS, NOMES_EXCLUIDOS_PATH  # noqa: E402
+from rm_referencias import (  # noqa: E402
+    SQL_INSERIR_SECAO_OBRA,
+    SQL_PREPARAR_SECOES_OBRA,
+    obter_referencias,
+    secoes_da_obra,
+)
+from rm_query import (  # noqa: E402
+    NUMERO_OBRA_PADRAO,
+    SQL_FUNCIONARIOS_POR_DATA,
+    SQL_INSERIR_NOME_EXCLUIDO,
+    SQL_PREPARAR_NOMES_EXCLUIDOS,
+    _SQL_FUNCIONARIOS_TEMPLATE,
+    calcular_janela_admissao,
+    carregar_nomes_excluidos,
+)
+
+COMPILE_RE = re.compile(r"parse and compile time:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms", re.I)
+
+
+def _sql_inline(data_inicio, data_fim, nomes_excluidos: list[str]) -> str:
+    nomes_sql = ", ".join("'" + n.replace("'", "''") + "'" for n in nomes_excluidos) or "''"
+    sql = _SQL_FUNCIONARIOS_TEMPLATE.format(
+        where_clause=f"CAST(F.DATAADMISSAO AS DATE) BETWEEN '{data_inicio:%Y-%m-%d}' AND '{data_fim:%Y-%m-%d}'"
+    )
+    return re.sub(
+        r"AND NOT EXISTS \(\s*SELECT 1 FROM #NOMES_EXCLUIDOS X WHERE X.NOME = P.NOME\s*\)",
+        f"AND P.NOME NOT IN ({nomes_sql})",
+        sql,
+    )
+
+
+def _executar_e_medir(cursor, sql: str, params=None) -> tuple[int, int, int]:
+    """Executa, drena resultados e soma os tempos de compilacao reportados."""
+    cpu_ms = 0
+    elapsed_ms = 0
+    rows = 0
+    if params:
+        cursor.execute(sql, params)
+    else:
+        cursor.execute(sql)
+    while True:
+        for _, msg in getattr(cursor, "messages", None) or []:
+            match = COMPILE_RE.search(str(msg))
+            if match:
+                cpu_ms += int(match.group(1))
+                elapsed_ms += int(match.group(2))
+        if cursor.description:
+            rows += len(cursor.fetchall())
+        if not cursor.nextset():
+            break
+    return cpu_ms, elapsed_ms, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de compilacao da query RM")
+    parser.add_argument("--iteracoes", type=int, default=5)
+    parser.add_argument("--data", dest="data_admissao", default=None, help="YYYY-MM-DD (padrao: hoje)")
+    args = parser.parse_args()
+
+    nomes_excluidos = carregar_nomes_excluidos(NOMES_EXCLUIDOS_PATH)
+    data_inicio, data_fim = calcular_janela_admissao(args.data_admissao, DIAS_RETROATIVOS)
+
+    resultados = {"inline": [], "parametrizado": []}
+    with obter_conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_PREPARAR_NOMES_EXCLUIDOS)
+        if nomes_excluidos:
+            cursor.executemany(SQL_INSERIR_NOME_EXCLUIDO, [(n,) for n in nomes_excluidos])
+        referencias, _ = obter_referencias(cursor, os.path.join(CACHE_DIR, "rm_referencias.json"))
+        cursor.execute(SQL_PREPARAR_SECOES_OBRA)
+        secoes_obra = secoes_da_obra(referencias, NUMERO_OBRA_PADRAO)
+        if secoes_obra:
+            cursor.executemany(SQL_INSERIR_SECAO_OBRA, secoes_obra)
+        cursor.execute("SET STATISTICS TIME ON")
+        for i in range(args.iteracoes):
+            # Desloca a janela a cada iteracao, simulando execucoes diarias.
+            inicio = data_inicio - timedelta(days=i)
+            fim = data_fim - timedelta(days=i)
+            resultados["inline"].append(_executar_e_medir(cursor, _sql_inline(inicio, fim, nomes_excluidos)))
+            resultados["parametrizado"].append(_executar_e_medir(cursor, SQL_FUNCIONARIOS_POR_DATA, [inicio, fim]))
+        cursor.execute("SET STATISTICS TIME OFF")
+
+    for modo, medicoes in resultados.items():
+        cpu_total = sum(m[0] for m in medicoes)
+        elapsed_total = sum(m[1] for m in medicoes)
+        print(
+            f"{modo:14s} iteracoes={len(medicoes)} "
+            f"compile_cpu_ms={cpu_total} compile_elapsed_ms={elapsed_total} "
+            f"por_iteracao={[m[1] for m in medicoes]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Harness de benchmark da query RM sobre um schema sintetico.
+
+Cria PFUNC, PPESSOA, PFDEPEND, PSECAO e PFUNCAO em um banco SQL Server local
+(LocalDB/Express de desenvolvimento), popula com dados deterministicos e compara
+o formato antigo da query (OUTER APPLY por funcionario, CAST para XML, UPPER)
+com o formato atual (rm_query.SQL_FUNCIONARIOS_POR_DATA). Tambem confere se os
+dois formatos devolvem os mesmos funcionarios e os mesmos pais.
+
+Uso:
+    python scripts/benchmark_rm_sintetico.py ^
+        --conn "DRIVER={ODBC Driver 17 for SQL Server};SERVER=(localdb)\\MSSQLLocalDB;Trusted_Connection=yes" ^
+        --funcionarios 50000 --repeticoes 3
+
+Nunca aponte --conn para o RM de producao: o script recria as tabelas.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import pyodbc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rm_query import (  # noqa: E402
+    NUMERO_OBRA_PADRAO,
+    SQL_FUNCIONARIOS_POR_DATA,
+    SQL_INSERIR_NOME_EXCLUIDO,
+    SQL_PREPARAR_NOMES_EXCLUIDOS,
+    NOMES_EXCLUIDOS_PADRAO,
+)
+from rm_referencias import (  # noqa: E402
+    SQL_FUNCOES,
+    SQL_INSERIR_SECAO_OBRA,
+    SQL_PREPARAR_SECOES_OBRA,
+    SQL_SECOES,
+    montar_referencias,
+    secoes_da_obra,
+)
+
+TABELAS_DDL = [
+    """
+    CREATE TABLE PSECAO (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CODIGO VARCHAR(35) NOT NULL,
+        NROCENCUSTOCONT VARCHAR(25) NULL,
+        PRIMARY KEY (CODCOLIGADA, CODIGO)
+    )
+    """,
+    """
+    CREATE TABLE PFUNCAO (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CODIGO VARCHAR(10) NOT NULL,
+        NOME VARCHAR(60) NULL,
+        PRIMARY KEY (CODCOLIGADA, CODIGO)
+    )
+    """,
+    """
+    CREATE TABLE PPESSOA (
+        CODIGO INT NOT NULL PRIMARY KEY,
+        NOME VARCHAR(120) NOT NULL,
+        CPF VARCHAR(11) NULL,
+        SEXO VARCHAR(1) NULL,
+        NATURALIDADE VARCHAR(32) NULL,
+        GRAUINSTRUCAO VARCHAR(1) NULL,
+        ESTADOCIVIL VARCHAR(1) NULL,
+        ESTADONATAL VARCHAR(2) NULL,
+        DTNASCIMENTO DATETIME NULL,
+        EMAIL VARCHAR(60) NULL,
+        TELEFONE1 VARCHAR(15) NULL,
+        ORGEMISSORIDENT VARCHAR(15) NULL,
+        UFCARTIDENT VARCHAR(2) NULL,
+        CARTIDENTIDADE VARCHAR(15) NULL,
+        DTEMISSAOIDENT DATETIME NULL,
+        CARTEIRATRAB VARCHAR(10) NULL,
+        SERIECARTTRAB VARCHAR(5) NULL,
+        UFCARTTRAB VARCHAR(2) NULL,
+        DTCARTTRAB DATETIME NULL,
+        TITULOELEITOR VARCHAR(14) NULL,
+        ZONATITELEITOR VARCHAR(6) NULL,
+        SECAOTITELEITOR VARCHAR(6) NULL,
+        ESTELEIT VARCHAR(2) NULL,
+        CEP VARCHAR(9) NULL,
+        ESTADO VARCHAR(2) NULL,
+        BAIRRO VARCHAR(80) NULL,
+        RUA VARCHAR(100) NULL,
+        NUMERO VARCHAR(8) NULL
+    )
+    """,
+    "CREATE INDEX IX_PPESSOA_NOME ON PPESSOA (NOME)",
+    """
+    CREATE TABLE PFUNC (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CHAPA VARCHAR(16) NOT NULL,
+        CODPESSOA INT NOT NULL,
+        CODSECAO VARCHAR(35) NOT NULL,
+        CODFUNCAO VARCHAR(10) NULL,
+        DATAADMISSAO DATETIME NOT NULL,
+        PISPASEP VARCHAR(14) NULL,
+        SALARIO DECIMAL(15, 4) NULL,
+        PRIMARY KEY (CODCOLIGADA, CHAPA)
+    )
+    """,
+    "CREATE INDEX IX_PFUNC_DATAADMISSAO ON PFUNC (DATAADMISSAO)",
+    "CREATE INDEX IX_PFUNC_CODSECAO ON PFUNC (CODCOLIGADA, CODSECAO)",
+    """
+    CREATE TABLE PFDEPEND (
+        CODCOLIGADA SMALLINT NOT NULL,
+        CHAPA VARCHAR(16) NOT NULL,
+        NRODEPEND SMALLINT NOT NULL,
+        NOME VARCHAR(120) NOT NULL,
+        GRAUPARENTESCO VARCHAR(1) NOT NULL,
+        PRIMARY KEY (CODCOLIGADA, CHAPA, NRODEPEND)
+    )
+    """,
+]
+
+# Formato anterior a reescrita (OUTER APPLY + CAST XML + joins de referencia).
+SQL_LEGADO = """
+    SELECT
+        P.NOME, P.CPF, F.CHAPA,
+        COALESCE(PAI.NOME, 'NAO INFORMADO') AS NOME_PAI,
+        COALESCE(MAE.NOME, 'NAO INFORMADO') AS NOME_MAE,
+        F.DATAADMISSAO, F.CODFUNCAO,
+        SEC.NROCENCUSTOCONT AS CENTRO_CUSTO,
+        COALESCE(UPPER(LTRIM(RTRIM(FU.NOME))), 'NAO INFORMADO') AS DESCRICAO_CARGO
+    FROM PFUNC F
+    INNER JOIN PPESSOA P ON P.CODIGO = F.CODPESSOA
+    LEFT JOIN PFUNCAO FU
+        ON FU.CODCOLIGADA = F.CODCOLIGADA
+    AND CAST(FU.CODIGO AS VARCHAR(20)) = F.CODFUNCAO
+    LEFT JOIN PSECAO SEC
+        ON SEC.CODCOLIGADA = F.CODCOLIGADA
+    AND SEC.CODIGO = F.CODSECAO
+    OUTER APPLY (
+        SELECT TOP 1 D.NOME FROM PFDEPEND D
+        WHERE D.CODCOLIGADA = F.CODCOLIGADA
+        AND CAST(D.CHAPA AS VARCHAR(20)) = F.CHAPA
+        AND CAST(D.GRAUPARENTESCO AS VARCHAR(5)) = '6'
+        ORDER BY D.NOME
+    ) PAI
+    OUTER APPLY (
+        SELECT TOP 1 D.NOME FROM PFDEPEND D
+        WHERE D.CODCOLIGADA = F.CODCOLIGADA
+        AND CAST(D.CHAPA AS VARCHAR(20)) = F.CHAPA
+        AND CAST(D.GRAUPARENTESCO AS VARCHAR(5)) = '7'
+        ORDER BY D.NOME
+    ) MAE
+    WHERE
+        CAST(F.DATAADMISSAO AS DATE) BETWEEN ? AND ?
+        AND TRY_CAST(
+            CAST('<i>' + REPLACE(F.CODSECAO, '.', '</i><i>') + '</i>' AS XML).value('/i[2]', 'varchar(10)')
+            AS INT
+        ) = {obra}
+        AND P.NOME NOT IN ({nomes_excluidos})
+    ORDER BY F.DATAADMISSAO ASC;
+"""
+
+LOGICAL_READS_RE = re.compile(r"Table '(\w+)'.*?logical reads (\d+)", re.I)
+
+
+def _conectar(conn_str: str, database: str | None = None):
+    if database:
+        conn_str = f"{conn_str.rstrip(';')};DATABASE={database}"
+    return pyodbc.connect(conn_str, autocommit=True)
+
+
+def criar_banco(conn_str: str, database: str):
+    with _conectar(conn_str) as conn:
+        conn.cursor().execute(f"IF DB_ID('{database}') IS NULL CREATE DATABASE [{database}]")
+
+
+def popular_schema(conn, funcionarios: int, seed: int, data_fim: date, dias: int):
+    rnd = random.Random(seed)
+    cursor = conn.cursor()
+    for tabela in ("PFDEPEND", "PFUNC", "PPESSOA", "PFUNCAO", "PSECAO"):
+        cursor.execute(f"IF OBJECT_ID('{tabela}') IS NOT NULL DROP TABLE {tabela}")
+    for ddl in TABELAS_DDL:
+        cursor.execute(ddl)
+
+    obras = [NUMERO_OBRA_PADRAO, 130, 140, 150]
+    secoes = []
+    for obra in obras:
+        for bloco in ("01", "02", "03"):
+            for n in range(1, 6):
+                secoes.append((1, f"36.{obra}.{n:03d}.{bloco}.01", f"{obra}.{bloco}.{n:03d}"))
+    funcoes = [(1, f"F{n:03d}", f"FUNCAO SINTETICA {n}") for n in range(1, 120)]
+
+    pessoas = []
+    funcs = []
+    dependentes = []
+    primeiro_dia = data_fim - timedelta(days=dias * 4)
+    for i in range(1, funcionarios + 1):
+        nome = f"FUNCIONARIO SINTETICO {i:07d}"
+        pessoas.append(
+            (i, nome, f"{i:011d}", rnd.choice("MF"), "BELEM", "5", "1", "PA",
+             datetime(1990, 1, 1) + timedelta(days=rnd.randint(0, 9000)), None, "91999999999",
+             "SSP", "PA", str(1000000 + i), datetime(2010, 1, 1), str(i), "001", "PA", datetime(2010, 1, 1),
+             None, None, None, None, "66000000", "PA", "CENTRO", "RUA SINTETICA", str(i % 999))
+        )
+        secao = rnd.choice(secoes)
+        chapa = f"{i:06d}"
+        funcs.append(
+            (1, chapa, i, secao[1], rnd.choice(funcoes)[1],
+             datetime.combine(primeiro_dia + timedelta(days=rnd.randint(0, dias * 4)), datetime.min.time()),
+             f"{i:011d}", 2500)
+        )
+        nro = 1
+        for grau in ("6", "7", "1", "3"):
+            # Nem todo funcionario tem pai/mae cadastrados; alguns tem mais de um.
+            for _ in range(rnd.choice((0, 1, 1, 1, 2))):
+                dependentes.append((1, chapa, nro, f"DEPENDENTE {grau} {rnd.randint(1, 99999):05d}", grau))
+                nro += 1
+
+    cursor.fast_executemany = True
+    cursor.executemany("INSERT INTO PSECAO VALUES (?, ?, ?)", secoes)
+    cursor.executemany("INSERT INTO PFUNCAO VALUES (?, ?, ?)", funcoes)
+    cursor.executemany(f"INSERT INTO PPESSOA VALUES ({', '.join(['?'] * 28)})", pessoas)
+    cursor.executemany("INSERT INTO PFUNC VALUES (?, ?, ?, ?, ?, ?, ?, ?)", funcs)
+    cursor.executemany("INSERT INTO PFDEPEND VALUES (?, ?, ?, ?, ?)", dependentes)
+    cursor.fast_executemany = False
+    cursor.execute("UPDATE STATISTICS PFUNC; UPDATE STATISTICS PFDEPEND; UPDATE STATISTICS PPESSOA;")
+    return {"funcionarios": len(funcs), "dependentes": len(dependentes), "secoes": len(secoes)}
+
+
+def preparar_sessao_atual(cursor):
+    cursor.execute(SQL_SECOES)
+    secoes_rows = cursor.fetchall()
+    cursor.execute(SQL_FUNCOES)
+    funcoes_rows = cursor.fetchall()
+    referencias = montar_referencias(secoes_rows, funcoes_rows)
+    cursor.execute(SQL_PREPARAR_NOMES_EXCLUIDOS)
+    cursor.executemany(SQL_INSERIR_NOME_EXCLUIDO, [(n,) for n in dict.fromkeys(NOMES_EXCLUIDOS_PADRAO)])
+    cursor.execute(SQL_PREPARAR_SECOES_OBRA)
+    cursor.executemany(SQL_INSERIR_SECAO_OBRA, secoes_da_obra(referencias, NUMERO_OBRA_PADRAO))
+
+
+def medir(cursor, sql: str, params: list) -> dict:
+    started = time.perf_counter()
+    cursor.execute(sql, params)
+    rows = []
+    leituras = {}
+    while True:
+        for _, msg in getattr(cursor, "messages", None) or []:
+            for tabela, reads in LOGICAL_READS_RE.findall(str(msg)):
+                leituras[tabela] = leituras.get(tabela, 0) + int(reads)
+        if cursor.description:
+            rows.extend(cursor.fetchall())
+        if not cursor.nextset():
+            break
+    return {"elapsed_ms": (time.perf_counter() - started) * 1000, "rows": rows, "logical_reads": leituras}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da query RM em schema sintetico")
+    parser.add_argument("--conn", required=True, help="Connection string ODBC do SQL Server local (sem DATABASE)")
+    parser.add_argument("--database", default="MetaXgBench")
+    parser.add_argument("--funcionarios", type=int, default=20000)
+    parser.add_argument("--dias", type=int, default=30, help="Tamanho da janela de admissao consultada")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=125)
+    parser.add_argument("--sem-popular", action="store_true", help="Reaproveita o schema ja populado")
+    args = parser.parse_args()
+
+    data_fim = date.today()
+    data_inicio = data_fim - timedelta(days=args.dias)
+    criar_banco(args.conn, args.database)
+
+    with _conectar(args.conn, args.database) as conn:
+        if not args.sem_popular:
+            resumo = popular_schema(conn, args.funcionarios, args.seed, data_fim, args.dias)
+            print(f"schema populado: {resumo}")
+
+        cursor = conn.cursor()
+        preparar_sessao_atual(cursor)
+        nomes_sql = ", ".join("'" + n.replace("'", "''") + "'" for n in dict.fromkeys(NOMES_EXCLUIDOS_PADRAO))
+        sql_legado = SQL_LEGADO.format(obra=NUMERO_OBRA_PADRAO, nomes_excluidos=nomes_sql)
+
+        cursor.execute("SET STATISTICS IO ON")
+        formatos = {"legado": sql_legado, "atual": SQL_FUNCIONARIOS_POR_DATA}
+        resultados = {nome: [] for nome in formatos}
+        for _ in range(args.repeticoes):
+            for nome, sql in formatos.items():
+                resultados[nome].append(medir(cursor, sql, [data_inicio, data_fim]))
+        cursor.execute("SET STATISTICS IO OFF")
+
+    for nome, medicoes in resultados.items():
+        tempos = sorted(m["elapsed_ms"] for m in medicoes)
+        print(
+            f"{nome:7s} rows={len(medicoes[-1]['rows'])} "
+            f"mediana_ms={tempos[len(tempos) // 2]:.1f} min_ms={tempos[0]:.1f} "
+            f"logical_reads={medicoes[-1]['logical_reads']}"
+        )
+
+    def _chaves(rows):
+        return sorted((r.CPF, r.NOME_PAI, r.NOME_MAE) for r in rows)
+
+    iguais = _chaves(resultados["legado"][-1]["rows"]) == _chaves(resultados["atual"][-1]["rows"])
+    print(f"resultados equivalentes (CPF, pai, mae): {iguais}")
+    if not iguais:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from utils import gravar_bytes_atomico
+
+
+# storage_state do Playwright salvo apos login + selecao de contrato, um arquivo por
+# contrato (a selecao fica na sessao do portal). O conteudo e cifrado com DPAPI do
+# Windows (pywin32): so o mesmo usuario na mesma maquina consegue ler. Sem DPAPI a
+# sessao nao e persistida (nunca grava cookies em texto puro).
+
+_DESCRICAO_DPAPI = "MetaXg storage_state"
+
+
+def _cifrar_dpapi(dados: bytes) -> bytes:
+    import win32crypt
+
+    return win32crypt.CryptProtectData(dados, _DESCRICAO_DPAPI, None, None, None, 0)
+
+
+def _decifrar_dpapi(dados: bytes) -> bytes:
+    import win32crypt
+
+    return win32crypt.CryptUnprotectData(dados, None, None, None, 0)[1]
+
+
+def caminho_estado_sessao(diretorio: str, contrato_value: str | None, contrato_label: str | None) -> str:
+    chave = contrato_value or contrato_label or "padrao"
+    slug = re.sub(r"[^\w\-]+", "_", str(chave).strip().lower()).strip("_") or "padrao"
+    return os.path.join(diretorio, f"sessao_{slug}.bin")
+
+
+def existe_estado_sessao(diretorio: str | None) -> bool:
+    if not diretorio or not os.path.isdir(diretorio):
+        return False
+    return any(nome.startswith("sessao_") and nome.endswith(".bin") for nome in os.listdir(diretorio))
+
+
+def gravar_estado_sessao(path: str, storage_state: dict, agora: datetime | None = None, cifrar=None) -> bool:
+    """Grava o storage_state cifrado (escrita atomica). Retorna False se nao houver como cifrar."""
+    cifrar = cifrar or _cifrar_dpapi
+    conteudo = json.dumps(
+        {"salvo_em": (agora or datetime.now()).isoformat(), "storage_state": storage_state},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    try:
+        dados = cifrar(conteudo)
+    except ImportError:
+        return False
+    gravar_bytes_atomico(path, dados)
+    return True
+
+
+def ler_estado_sessao(path: str, ttl_min: int | None = None, agora: datetime | None = None, decifrar=None) -> dict | None:
+    """storage_state salvo, ou None se ausente, ilegivel ou mais antigo que METAX_SESSAO_TTL_MIN."""
+    if not path or not os.path.exists(path):
+        return None
+    decifrar = decifrar or _decifrar_dpapi
+    if ttl_min is None:
+        ttl_min = int(os.getenv("METAX_SESSAO_TTL_MIN", "720"))
+    try:
+        with open(path, "rb") as f:
+            dados = json.loads(decifrar(f.read()).decode("utf-8"))
+        salvo_em = datetime.fromisoformat(dados["salvo_em"])
+    except Exception:
+        return None
+    if (agora or datetime.now()) - salvo_em > timedelta(minutes=ttl_min):
+        return None
+    storage_state = dados.get("storage_state")
+    return storage_state if isinstance(storage_state, dict) else None
+
+
+def descartar_estado_sessao(path: str):
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -3,19 +3,14 @@ import unicodedata
 from custom_logger import logger
 
 
-from config import SHAREPOINT_SITE_URL, SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET
+from config import SHAREPOINT_SITE_URL, SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET, SHAREPOINT_BASE_FOLDER
 
 SITE_URL = SHAREPOINT_SITE_URL
 CLIENT_ID = SHAREPOINT_CLIENT_ID
 CLIENT_SECRET = SHAREPOINT_CLIENT_SECRET
 
-BASE_FOLDER = (
-    "/sites/Corporativo/"
-    "Documentos Compartilhados/Enesa/"
-    "125 - ARAUCO/DP/"
-    "01.ADMISSÃO/"
-    "04.DOCUMENTAÇÃO MOBILIZAÇÃO"
-)
+# Pasta de documentacao de mobilizacao da obra (SHAREPOINT_BASE_FOLDER, por obra).
+BASE_FOLDER = SHAREPOINT_BASE_FOLDER.rstrip("/")
 
 # CONEXÃO
 def conectar_sharepoint():
@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+FASES_SQL = ("connect", "referencias", "setup", "execute", "fetch", "to_dict")
+
+_COMPILE_RE = re.compile(r"parse and compile time:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms", re.I)
+_EXEC_RE = re.compile(r"Execution Times:\s*CPU time = (\d+) ms,\s*elapsed time = (\d+) ms", re.I)
+_IO_RE = re.compile(r"Table '([^']+)'\. Scan count (\d+), logical reads (\d+), physical reads (\d+)", re.I)
+
+
+def interpretar_mensagens_estatisticas(mensagens: list[str]) -> dict:
+    """Resume mensagens de SET STATISTICS IO, TIME (tempos em ms e leituras por tabela)."""
+    resumo = {
+        "compile_cpu_ms": 0,
+        "compile_elapsed_ms": 0,
+        "exec_cpu_ms": 0,
+        "exec_elapsed_ms": 0,
+        "io": {},
+    }
+    for msg in mensagens:
+        texto = str(msg)
+        for cpu, elapsed in _COMPILE_RE.findall(texto):
+            resumo["compile_cpu_ms"] += int(cpu)
+            resumo["compile_elapsed_ms"] += int(elapsed)
+        for cpu, elapsed in _EXEC_RE.findall(texto):
+            resumo["exec_cpu_ms"] += int(cpu)
+            resumo["exec_elapsed_ms"] += int(elapsed)
+        for tabela, scans, logical, physical in _IO_RE.findall(texto):
+            atual = resumo["io"].setdefault(tabela, {"scan_count": 0, "logical_reads": 0, "physical_reads": 0})
+            atual["scan_count"] += int(scans)
+            atual["logical_reads"] += int(logical)
+            atual["physical_reads"] += int(physical)
+    return resumo
+
+
+class TelemetriaSQL:
+    """
+    Tempos em milissegundos por fase da coleta SQL. Seguro para uso pelas
+    threads do modo TXT em chunks (as fases somam entre conexoes).
+    """
+
+    def __init__(self, capturar_estatisticas: bool = False):
+        self.capturar_estatisticas = capturar_estatisticas
+        self._lock = threading.Lock()
+        self._fases = {
+            nome: {"ms": 0.0, "chamadas": 0, "rows": 0, "estatisticas": []}
+            for nome in FASES_SQL
+        }
+        self.extras = {}
+
+    def registrar(self, fase: str, elapsed_ms: float, rows: int = 0):
+        with self._lock:
+            dados = self._fases.setdefault(fase, {"ms": 0.0, "chamadas": 0, "rows": 0, "estatisticas": []})
+            dados["ms"] += elapsed_ms
+            dados["chamadas"] += 1
+            dados["rows"] += rows
+
+    @contextmanager
+    def fase(self, nome: str):
+        started = time.perf_counter()
+        contador = {"rows": 0}
+        try:
+            yield contador
+        finally:
+            self.registrar(nome, (time.perf_counter() - started) * 1000, rows=contador["rows"])
+
+    def coletar_mensagens(self, fase: str, cursor):
+        """Guarda as mensagens de STATISTICS pendentes no cursor (pyodbc cursor.messages)."""
+        if not self.capturar_estatisticas:
+            return
+        mensagens = [str(m[1]) if isinstance(m, (tuple, list)) else str(m) for m in (getattr(cursor, "messages", None) or [])]
+        if not mensagens:
+            return
+        with self._lock:
+            self._fases.setdefault(fase, {"ms": 0.0, "chamadas": 0, "rows": 0, "estatisticas": []})
+            self._fases[fase]["estatisticas"].extend(mensagens)
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            fases = {}
+            for nome, dados in self._fases.items():
+                item = {"ms": round(dados["ms"], 1), "chamadas": dados["chamadas"], "rows": dados["rows"]}
+                if self.capturar_estatisticas and dados["estatisticas"]:
+                    item["statistics"] = interpretar_mensagens_estatisticas(dados["estatisticas"])
+                fases[nome] = item
+            total_ms = round(sum(d["ms"] for d in self._fases.values()), 1)
+        return {
+            "capturar_estatisticas": self.capturar_estatisticas,
+            "total_ms": total_ms,
+            "fases": fases,
+            **self.extras,
+        }
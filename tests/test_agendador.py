@@ -0,0 +1,64 @@
+from agendador import (
+    CUSTO_BASE_S,
+    consultar_ceps,
+    custo_previsto,
+    gravar_ceps,
+    ordenar_por_custo,
+)
+from outcomes import OUTCOME_FAILED_ACTION, OUTCOME_VERIFIED_SUCCESS
+
+
+def _func(cpf, cargo="AJUDANTE", codfuncao="F103", cep="79560000", estado="MS"):
+    return {
+        "NOME": f"FUNC {cpf}",
+        "CPF": cpf,
+        "DESCRICAO_CARGO": cargo,
+        "CODFUNCAO": codfuncao,
+        "CEP": cep,
+        "ESTADO": estado,
+    }
+
+
+def test_custo_base_para_caso_conhecido():
+    func = _func("11111111111")
+    custo, motivos = custo_previsto(func, {"79560000": True}, {}, {"11111111111": "foto.jpg"})
+    assert custo == CUSTO_BASE_S
+    assert motivos == []
+
+
+def test_custo_soma_cargo_cep_foto_e_falha_anterior():
+    func = _func("22222222222", cargo="CARGO NOVO", codfuncao="F999", cep="7956")
+    custo, motivos = custo_previsto(func, {}, {"22222222222": OUTCOME_FAILED_ACTION}, {"22222222222": None})
+    assert motivos == ["cargo_sem_mapa", "cep_invalido", "sem_foto", "falha_anterior"]
+    assert custo > CUSTO_BASE_S
+
+    _, motivos = custo_previsto(_func("3", cep="79560000"), {"79560000": False}, {}, {})
+    assert motivos == ["cep_invalido"]
+    _, motivos = custo_previsto(_func("3"), {}, {"3": OUTCOME_VERIFIED_SUCCESS}, {})
+    assert motivos == ["cep_desconhecido"]
+
+
+def test_ordena_baratos_primeiro_e_agrupa_afinidade():
+    caro = _func("1", cargo="CARGO NOVO", codfuncao="F999")
+    barato_ms = _func("2")
+    barato_sp = _func("3", cep="01310000", estado="SP")
+    outro_ms = _func("4")
+    ordem = ordenar_por_custo(
+        [caro, barato_ms, barato_sp, outro_ms],
+        ceps_conhecidos={"79560000": True, "01310000": True},
+    )
+    assert [f["CPF"] for f, _ in ordem] == ["2", "4", "3", "1"]
+    assert ordem[0][1] < ordem[-1][1]
+
+
+def test_empate_mantem_ordem_original():
+    funcs = [_func(str(i)) for i in range(5)]
+    assert [f["CPF"] for f, _ in ordenar_por_custo(funcs)] == ["0", "1", "2", "3", "4"]
+
+
+def test_cache_de_ceps_roundtrip(tmp_path):
+    path = str(tmp_path / "ceps.sqlite3")
+    assert consultar_ceps(path, ["79560000"]) == {}
+    assert gravar_ceps(path, {"79560000": True, "01310000": False, "123": True}) == 2
+    gravar_ceps(path, {"79560000": False})
+    assert consultar_ceps(path, ["79560-000", "01310000", "99999999"]) == {"79560000": False, "01310000": False}
@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+
+from backfill import (
+    checkpoint_compativel,
+    dividir_periodo,
+    gravar_checkpoint,
+    janelas_pendentes,
+    ler_checkpoint,
+    novo_checkpoint,
+    orcamento_esgotado,
+    registrar_janela_concluida,
+    registrar_janela_se_completa,
+)
+
+
+def test_dividir_periodo_em_janelas_fechadas():
+    janelas = dividir_periodo(date(2026, 1, 1), date(2026, 1, 10), 4)
+    assert janelas == [
+        (date(2026, 1, 1), date(2026, 1, 4)),
+        (date(2026, 1, 5), date(2026, 1, 8)),
+        (date(2026, 1, 9), date(2026, 1, 10)),
+    ]
+    assert dividir_periodo(date(2026, 1, 1), date(2026, 1, 1), 7) == [(date(2026, 1, 1), date(2026, 1, 1))]
+
+
+def test_dividir_periodo_invertido():
+    with pytest.raises(ValueError):
+        dividir_periodo(date(2026, 1, 2), date(2026, 1, 1), 7)
+
+
+def test_checkpoint_retoma_na_janela_seguinte(tmp_path):
+    path = str(tmp_path / "json" / "rm_backfill.json")
+    inicio, fim = date(2026, 1, 1), date(2026, 1, 10)
+    janelas = dividir_periodo(inicio, fim, 4)
+
+    checkpoint = novo_checkpoint(inicio, fim, 4)
+    registrar_janela_concluida(checkpoint, janelas[0], "exec-1", resumo={"funcionarios": 3}, total_janelas=3)
+    gravar_checkpoint(path, checkpoint)
+
+    lido = ler_checkpoint(path)
+    assert checkpoint_compativel(lido, inicio, fim)
+    assert not checkpoint_compativel(lido, inicio, date(2026, 1, 11))
+    assert janelas_pendentes(janelas, lido) == janelas[1:]
+    assert lido["janelas_concluidas"][0]["funcionarios"] == 3
+    assert lido["concluido"] is False
+
+    registrar_janela_concluida(lido, janelas[1], "exec-2")
+    registrar_janela_concluida(lido, janelas[2], "exec-2")
+    assert lido["concluido"] is True
+    assert janelas_pendentes(janelas, lido) == []
+
+
+def test_ler_checkpoint_inexistente_ou_invalido(tmp_path):
+    assert ler_checkpoint(str(tmp_path / "nao_existe.json")) is None
+    invalido = tmp_path / "rm_backfill.json"
+    invalido.write_text("{", encoding="utf-8")
+    assert ler_checkpoint(str(invalido)) is None
+
+
+def test_backfill_com_orcamento_nao_conclui_janela_com_adiados():
+    inicio, fim = date(2026, 1, 1), date(2026, 1, 12)
+    janelas = dividir_periodo(inicio, fim, 4)
+    checkpoint = novo_checkpoint(inicio, fim, 4)
+
+    assert registrar_janela_se_completa(checkpoint, janelas[0], "exec-1", adiados=0) is True
+    assert registrar_janela_se_completa(checkpoint, janelas[1], "exec-1", adiados=2) is False
+    assert checkpoint["ultima_janela_concluida"] == "2026-01-04"
+    assert janelas_pendentes(janelas, checkpoint) == janelas[1:]
+    assert checkpoint["concluido"] is False
+
+
+def test_orcamento_esgotado():
+    assert orcamento_esgotado(None) is False
+    assert orcamento_esgotado(1000.0, agora=999.0) is False
+    assert orcamento_esgotado(1000.0, agora=1000.0) is True
@@ -0,0 +1,82 @@
+import pytest
+
+from conexao_sql import PoolConexoes, gravar_driver_cache, ler_driver_cache, ordenar_drivers
+
+
+class FakeConn:
+    def __init__(self, viva=True):
+        self.viva = viva
+        self.fechada = False
+        self.commits = 0
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def execute(self, _sql):
+                if not conn.viva:
+                    raise RuntimeError("conexao perdida")
+
+            def fetchall(self):
+                return [(1,)]
+
+        return _Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.fechada = True
+
+
+def test_ordenar_drivers_prefere_cache():
+    disponiveis = ["SQL Server", "ODBC Driver 18 for SQL Server"]
+    ordem = ordenar_drivers("ODBC Driver 17 for SQL Server", "ODBC Driver 18 for SQL Server", disponiveis)
+    assert ordem == ["ODBC Driver 18 for SQL Server", "SQL Server"]
+
+
+def test_driver_cache_por_host(tmp_path):
+    path = str(tmp_path / "odbc_driver.json")
+    gravar_driver_cache(path, "srv01", "RM", "ODBC Driver 18 for SQL Server", host="maq1")
+    assert ler_driver_cache(path, "srv01", host="maq1") == "ODBC Driver 18 for SQL Server"
+    assert ler_driver_cache(path, "srv01", host="maq2") is None
+    assert ler_driver_cache(path, "outro", host="maq1") is None
+    assert "PWD" not in (tmp_path / "odbc_driver.json").read_text(encoding="utf-8")
+
+
+def test_pool_reutiliza_conexao():
+    criadas = []
+
+    def fabrica():
+        conn = FakeConn()
+        criadas.append(conn)
+        return conn
+
+    pool = PoolConexoes(fabrica, tamanho_max=2)
+    with pool.conexao() as c1:
+        pass
+    with pool.conexao() as c2:
+        pass
+    assert c1 is c2
+    assert pool.criadas == 1
+    assert pool.reutilizadas == 1
+    pool.fechar()
+    assert criadas[0].fechada
+
+
+def test_pool_descarta_conexao_morta_e_com_erro():
+    pool = PoolConexoes(FakeConn, tamanho_max=1)
+    with pool.conexao() as c1:
+        c1.viva = False
+    with pool.conexao() as c2:
+        pass
+    assert c2 is not c1
+    assert c1.fechada
+
+    with pytest.raises(ValueError):
+        with pool.conexao() as c3:
+            raise ValueError("falha")
+    assert c3.fechada
@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+
+from custom_logger import CustomLogger
+
+
+class _OutputManagerEmMemoria:
+    def __init__(self):
+        self.tecnico = []
+        self.publico = []
+
+    def append_text(self, kind, filename, content, write_public=True):
+        self.tecnico.append(content)
+
+    def append_public_text_only(self, kind, filename, content):
+        # Cede a vez para outras threads no meio da publicacao.
+        time.sleep(0)
+        self.publico.append(content)
+
+
+def _logger_isolado(output_manager):
+    instancia = object.__new__(CustomLogger)
+    instancia.__init__()
+    instancia.output_manager = output_manager
+    instancia.log_filename = "execution_teste.jsonl"
+    instancia.public_buffer_max_lines = 3
+    return instancia
+
+
+def test_append_entry_concorrente_nao_perde_linhas_publicas():
+    om = _OutputManagerEmMemoria()
+    log = _logger_isolado(om)
+    threads_total = 8
+    linhas_por_thread = 200
+
+    def escrever(indice):
+        for n in range(linhas_por_thread):
+            log._append_entry({"thread": indice, "n": n})
+
+    threads = [threading.Thread(target=escrever, args=(i,)) for i in range(threads_total)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.flush()
+
+    publicadas = [json.loads(linha) for linha in "".join(om.publico).splitlines()]
+    assert len(publicadas) == threads_total * linhas_por_thread
+    assert len(om.tecnico) == threads_total * linhas_por_thread
+    assert log.public_buffer == []
+
+
+def test_flush_buffer_descarrega_linhas_anteriores_ao_configure():
+    log = _logger_isolado(None)
+    log.log_filename = None
+    log._append_entry({"n": 1})
+    log._append_entry({"n": 2})
+    om = _OutputManagerEmMemoria()
+    log.output_manager = om
+    log.log_filename = "execution_teste.jsonl"
+
+    log._flush_buffer()
+
+    assert log.buffer == []
+    assert "".join(om.publico).count("\n") == 2
@@ -0,0 +1,51 @@
+from entrada_txt import (
+    atualizar_fila_txt,
+    carregar_entradas_txt,
+    chaves_do_funcionario,
+    interpretar_linha_txt,
+)
+
+
+def test_interpretar_linha_txt_nome_cpf_chapa():
+    assert interpretar_linha_txt("  joão  da silva ") == ("NOME", "JOAO DA SILVA")
+    assert interpretar_linha_txt("CPF: 123.456.789-01") == ("CPF", "12345678901")
+    assert interpretar_linha_txt("12345678901") == ("CPF", "12345678901")
+    assert interpretar_linha_txt("chapa=00123") == ("CHAPA", "00123")
+    assert interpretar_linha_txt("00123") == ("CHAPA", "00123")
+    assert interpretar_linha_txt("CPF:123") is None
+    assert interpretar_linha_txt("# comentario") is None
+    assert interpretar_linha_txt("   ") is None
+
+
+def test_carregar_entradas_txt_mistura_e_dedup(tmp_path):
+    path = tmp_path / "cadastrar_metax.txt"
+    path.write_text(
+        "# fila\nMaria Souza\nCPF:123.456.789-01\n12345678901\nCHAPA:00123\nMARIA SOUZA\n",
+        encoding="utf-8",
+    )
+    linhas, entradas = carregar_entradas_txt(str(path))
+    assert len(linhas) == 6
+    assert entradas == {"NOME": ["MARIA SOUZA"], "CPF": ["12345678901"], "CHAPA": ["00123"]}
+
+
+def test_carregar_entradas_txt_sem_arquivo(tmp_path):
+    assert carregar_entradas_txt(str(tmp_path / "nao_existe.txt")) == ([], {})
+
+
+def test_atualizar_fila_remove_por_qualquer_chave(tmp_path):
+    path = tmp_path / "cadastrar_metax.txt"
+    path.write_text("# fila\nJOSE LIMA\nCPF:111.222.333-44\nCHAPA:00999\nANA PAULA\n", encoding="utf-8")
+    processados = chaves_do_funcionario({"NOME": "José Lima", "CPF": "98765432100", "CHAPA": "00999"})
+    processados |= chaves_do_funcionario({"NOME": "OUTRO NOME", "CPF": "111.222.333-44", "CHAPA": "00001"})
+
+    removidos = atualizar_fila_txt(str(path), processados)
+
+    assert removidos == 3
+    assert path.read_text(encoding="utf-8") == "# fila\nANA PAULA\n"
+
+
+def test_atualizar_fila_apaga_arquivo_vazio(tmp_path):
+    path = tmp_path / "cadastrar_metax.txt"
+    path.write_text("CHAPA:00123\n", encoding="utf-8")
+    assert atualizar_fila_txt(str(path), {("CHAPA", "00123")}) == 1
+    assert not path.exists()
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import fila_compartilhada
+from fila_compartilhada import FilaCompartilhada, consolidar_fila, gravar_consolidado
+from outcomes import OUTCOME_VERIFIED_SUCCESS
+
+
+def _registro(cpf):
+    return {"cpf": cpf, "nome": f"FUNC {cpf}", "outcome": OUTCOME_VERIFIED_SUCCESS}
+
+
+def test_cpf_so_vai_para_uma_maquina(tmp_path):
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=300)
+    b = FilaCompartilhada(str(tmp_path), "MAQ-B", "exec-b", lease_s=300)
+    assert a.reivindicar("111") is True
+    assert b.reivindicar("111") is False
+    assert b.reivindicar("222") is True
+    assert a.contagem["reivindicados"] == 1
+    assert b.contagem == {"reivindicados": 1, "outra_maquina": 1, "ja_concluidos": 0, "retomados_expirados": 0}
+
+
+def test_concluido_nao_e_reivindicado_de_novo(tmp_path):
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=300)
+    b = FilaCompartilhada(str(tmp_path), "MAQ-B", "exec-b", lease_s=300)
+    a.reivindicar("111")
+    a.concluir("111", _registro("111"))
+    assert not os.path.exists(tmp_path / "lease_111.json")
+    assert b.reivindicar("111") is False
+    assert b.contagem["ja_concluidos"] == 1
+
+
+def test_lease_sem_heartbeat_expira_e_e_retomado(tmp_path):
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=60)
+    b = FilaCompartilhada(str(tmp_path), "MAQ-B", "exec-b", lease_s=60)
+    a.reivindicar("111")
+    assert b.reivindicar("111", agora=time.time() + 30) is False
+    assert b.reivindicar("111", agora=time.time() + 120) is True
+    assert b.contagem["retomados_expirados"] == 1
+    # O dono antigo nao remove o lease que agora e de outra maquina.
+    a.liberar("111")
+    assert os.path.exists(tmp_path / "lease_111.json")
+
+
+def test_duas_maquinas_disputando_lease_expirado_so_uma_ganha(tmp_path, monkeypatch):
+    morta = FilaCompartilhada(str(tmp_path), "MAQ-C", "exec-c", lease_s=60)
+    morta.reivindicar("111")
+    antigo = time.time() - 600
+    os.utime(tmp_path / "lease_111.json", (antigo, antigo))
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=60)
+    b = FilaCompartilhada(str(tmp_path), "MAQ-B", "exec-b", lease_s=60)
+
+    rename_real = os.rename
+    disputa = {"feita": False}
+
+    def rename_com_disputa(origem, destino):
+        # B ja julgou o lease vencido; A retoma e cria o lease novo antes do rename de B.
+        if not disputa["feita"]:
+            disputa["feita"] = True
+            assert a.reivindicar("111") is True
+        rename_real(origem, destino)
+
+    monkeypatch.setattr(fila_compartilhada.os, "rename", rename_com_disputa)
+    assert b.reivindicar("111") is False
+    monkeypatch.setattr(fila_compartilhada.os, "rename", rename_real)
+
+    assert a.contagem["retomados_expirados"] == 1
+    assert b.contagem["outra_maquina"] == 1
+    with open(tmp_path / "lease_111.json", encoding="utf-8") as f:
+        assert json.load(f)["maquina"] == "MAQ-A"
+    assert [p.name for p in tmp_path.iterdir() if "expirado" in p.name] == []
+
+
+def test_heartbeat_renova_e_fechar_libera(tmp_path):
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=60)
+    a.reivindicar("111")
+    lease = tmp_path / "lease_111.json"
+    antigo = time.time() - 50
+    os.utime(lease, (antigo, antigo))
+    a.renovar()
+    assert os.path.getmtime(lease) > antigo + 40
+    a.fechar()
+    assert not lease.exists()
+
+
+def test_consolidar_junta_maquinas_e_leases_ativos(tmp_path):
+    a = FilaCompartilhada(str(tmp_path), "MAQ-A", "exec-a", lease_s=300)
+    b = FilaCompartilhada(str(tmp_path), "MAQ-B", "exec-b", lease_s=300)
+    a.reivindicar("111")
+    a.concluir("111", _registro("111"))
+    b.reivindicar("222")
+    b.concluir("222", _registro("222"))
+    b.reivindicar("333")
+
+    consolidado = consolidar_fila(str(tmp_path), lease_s=300)
+    assert sorted(p["cpf"] for p in consolidado["people"]) == ["111", "222"]
+    assert consolidado["maquinas"] == {"MAQ-A": 1, "MAQ-B": 1}
+    assert consolidado["totals"]["by_outcome"][OUTCOME_VERIFIED_SUCCESS] == 2
+    assert [l["cpf"] for l in consolidado["em_andamento"]] == ["333"]
+    assert consolidado["em_andamento"][0]["maquina"] == "MAQ-B"
+    assert os.path.exists(gravar_consolidado(str(tmp_path), consolidado))
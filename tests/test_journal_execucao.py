@@ -0,0 +1,44 @@
+import os
+import time
+
+from journal_execucao import JournalExecucao, caminho_journal, ler_journal, limpar_journals_antigos
+
+
+def test_journal_registra_e_reconstroi(tmp_path):
+    diretorio = str(tmp_path)
+    journal = JournalExecucao(caminho_journal(diretorio, "exec-1"))
+    journal.registrar_rascunhos("MECANICA", {"111", "222"})
+    journal.registrar_pessoa({"cpf": "333", "outcome": "FAILED_ACTION"})
+    journal.registrar_pessoa({"cpf": "333", "outcome": "VERIFIED_SUCCESS"})
+    journal.fechar()
+
+    parcial = JournalExecucao(caminho_journal(diretorio, "exec-1", "eletromecanica"))
+    parcial.registrar_pessoa({"cpf": "444", "outcome": "SKIPPED_ALREADY_EXISTS"})
+    parcial.fechar()
+    with open(caminho_journal(diretorio, "exec-1", "eletromecanica"), "a", encoding="utf-8") as f:
+        f.write('{"tipo": "pessoa", "registro": {"cpf": "55')
+
+    outro = JournalExecucao(caminho_journal(diretorio, "exec-2"))
+    outro.registrar_pessoa({"cpf": "999"})
+    outro.fechar()
+
+    estado = ler_journal(diretorio, "exec-1")
+    por_cpf = {p["cpf"]: p for p in estado["people"]}
+    assert set(por_cpf) == {"333", "444"}
+    assert por_cpf["333"]["outcome"] == "VERIFIED_SUCCESS"
+    assert estado["rascunhos"] == {"MECANICA": {"111", "222"}}
+
+
+def test_ler_journal_inexistente(tmp_path):
+    assert ler_journal(str(tmp_path / "nao_existe"), "exec") == {"people": [], "rascunhos": {}}
+
+
+def test_limpar_journals_antigos(tmp_path):
+    antigo = tmp_path / "journal_a.jsonl"
+    novo = tmp_path / "journal_b.jsonl"
+    antigo.write_text("", encoding="utf-8")
+    novo.write_text("", encoding="utf-8")
+    agora = time.time()
+    os.utime(antigo, (agora - 10 * 86400, agora - 10 * 86400))
+    assert limpar_journals_antigos(str(tmp_path), 7, agora=agora) == 1
+    assert not antigo.exists() and novo.exists()
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from launcher_obras import carregar_obras, mesclar_resumos, montar_env_obra
+
+
+def _gravar(tmp_path, dados):
+    path = tmp_path / "obras.json"
+    path.write_text(json.dumps(dados), encoding="utf-8")
+    return str(path)
+
+
+def test_carregar_obras_valida_campos(tmp_path):
+    path = _gravar(tmp_path, {"obras": [{"numero": "125", "nome": "ARAUCO", "sharepoint_base_folder": "/sites/x/125"}]})
+    assert carregar_obras(path) == [{"numero": 125, "nome": "ARAUCO", "sharepoint_base_folder": "/sites/x/125"}]
+
+    with pytest.raises(ValueError):
+        carregar_obras(_gravar(tmp_path, {"obras": [{"numero": "x", "nome": "A"}]}))
+    with pytest.raises(ValueError):
+        carregar_obras(_gravar(tmp_path, {"obras": [{"numero": 1, "nome": "A"}, {"numero": 1, "nome": "B"}]}))
+    with pytest.raises(ValueError):
+        carregar_obras(_gravar(tmp_path, {"obras": []}))
+    with pytest.raises(ValueError):
+        carregar_obras(_gravar(tmp_path, {"obras": [{"numero": 130, "nome": "OUTRA"}]}))
+
+
+def test_montar_env_obra_isola_diretorios_e_contratos(tmp_path):
+    base_env = {
+        "PUBLIC_JSON_DIR": "P:\\ProcessoMetaX\\json",
+        "PASTA_FOTOS": "C:\\fotos",
+        "METAX_WATERMARK_PATH": "P:\\wm.json",
+        "NOMES_EXCLUIDOS_PATH": "P:\\ProcessoMetaX\\entrada\\nomes_excluidos.txt",
+        "METAX_BACKFILL_CHECKPOINT_PATH": "P:\\bf.json",
+        "SHAREPOINT_BASE_FOLDER": "/sites/x/125",
+        "METAX_CONTRATO_MECANICA_VALUE": "6578",
+    }
+    obra = {
+        "numero": 130,
+        "nome": "OUTRA",
+        "sharepoint_base_folder": "/sites/x/130",
+        "contratos": {"mecanica": {"value": "7001", "label": "MEC 130"}},
+    }
+    env = montar_env_obra(obra, base_env, str(tmp_path), "resultado.json")
+
+    base = os.path.join(str(tmp_path), "obras", "130")
+    assert env["METAX_OBRA"] == "130"
+    assert env["PUBLIC_BASE_DIR"] == base
+    assert env["PUBLIC_JSON_DIR"] == os.path.join(base, "json")
+    assert env["FOTOS_EM_PROCESSAMENTO_DIR"] == os.path.join(base, "fotos", "em_processamento")
+    assert env["PASTA_FOTOS"] == os.path.join(base, "fotos", "em_processamento")
+    assert env["NOMES_EXCLUIDOS_PATH"] == os.path.join(base, "entrada", "nomes_excluidos.txt")
+    assert env["METAX_WATERMARK_PATH"] == os.path.join(base, "json", "rm_watermark.json")
+    assert env["METAX_BACKFILL_CHECKPOINT_PATH"] == os.path.join(base, "json", "rm_backfill.json")
+    assert env["METAX_FILA_DIR"] == os.path.join(base, "fila")
+    assert env["SHAREPOINT_BASE_FOLDER"] == "/sites/x/130"
+    assert env["METAX_CONTRATO_MECANICA_VALUE"] == "7001"
+    assert env["METAX_CONTRATO_MECANICA_LABEL"] == "MEC 130"
+    assert env["METAX_RESULTADO_PATH"] == "resultado.json"
+    assert base_env["PUBLIC_JSON_DIR"] == "P:\\ProcessoMetaX\\json"
+
+
+def test_mesclar_resumos_soma_totais_e_status():
+    resultados = [
+        {"obra": 125, "run_status": "CONSISTENT",
+         "totals": {"detected": 3, "people_total": 3, "no_photo": 1, "by_outcome": {"VERIFIED_SUCCESS": 3}}},
+        {"obra": 130, "run_status": "INCONSISTENT",
+         "totals": {"detected": 2, "people_total": 2, "no_photo": 0, "by_outcome": {"VERIFIED_SUCCESS": 1, "FAILED_ACTION": 1}}},
+    ]
+    resumo = mesclar_resumos(resultados)
+    assert resumo["run_status"] == "INCONSISTENT"
+    assert resumo["totals"]["people_total"] == 5
+    assert resumo["totals"]["no_photo"] == 1
+    assert resumo["totals"]["by_outcome"]["VERIFIED_SUCCESS"] == 4
+    assert resumo["totals"]["by_outcome"]["FAILED_ACTION"] == 1
+
+    assert mesclar_resumos(resultados[:1])["run_status"] == "CONSISTENT"
+    assert mesclar_resumos([])["run_status"] == "INCONSISTENT"
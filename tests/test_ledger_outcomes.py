@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from ledger_outcomes import (
+    atualizar_ledger,
+    consultar_ledger,
+    hash_registro_rm,
+    separar_ja_concluidos,
+)
+from outcomes import OUTCOME_FAILED_ACTION, OUTCOME_VERIFIED_SUCCESS
+
+
+def _func(cpf="123.456.789-01", chapa="00123", secao="01.125.001"):
+    return {
+        "NOME": "JOAO DA SILVA",
+        "CPF": cpf,
+        "CHAPA": chapa,
+        "DATAADMISSAO": datetime(2026, 3, 10),
+        "CODCOLIGADA": 1,
+        "CODSECAO": secao,
+        "RUA": "RUA A",
+    }
+
+
+def _pessoa(func, outcome, **extra):
+    return {
+        "nome": func["NOME"],
+        "cpf": "".join(filter(str.isdigit, func["CPF"])),
+        "outcome": outcome,
+        "contrato_chave": "MECANICA",
+        # Como no manifest: valores serializados (datetime -> isoformat, demais -> str).
+        "dados_funcionario": {
+            k: v.isoformat() if isinstance(v, datetime) else str(v) for k, v in func.items()
+        },
+        **extra,
+    }
+
+
+def test_hash_igual_para_dict_cru_e_manifest():
+    func = _func()
+    assert hash_registro_rm(func) == hash_registro_rm(_pessoa(func, OUTCOME_VERIFIED_SUCCESS)["dados_funcionario"])
+    assert hash_registro_rm(func) != hash_registro_rm(_func(secao="01.125.002"))
+    # Colunas de detalhe nao entram no hash (fase de chaves nao as traz).
+    assert hash_registro_rm(func) == hash_registro_rm({**func, "RUA": "OUTRA"})
+
+
+def test_separar_ja_concluidos_por_outcome_e_hash(tmp_path):
+    path = str(tmp_path / "cache" / "outcome_ledger.sqlite3")
+    ok = _func(cpf="11111111111")
+    falhou = _func(cpf="22222222222")
+    mudou = _func(cpf="33333333333")
+    gravados = atualizar_ledger(
+        path,
+        [
+            _pessoa(ok, OUTCOME_VERIFIED_SUCCESS),
+            _pessoa(falhou, OUTCOME_FAILED_ACTION),
+            _pessoa(mudou, OUTCOME_VERIFIED_SUCCESS),
+            _pessoa(_func(cpf="44444444444"), OUTCOME_VERIFIED_SUCCESS, ledger_skip=True),
+            _pessoa(_func(cpf="66666666666"), OUTCOME_FAILED_ACTION, adiado_orcamento=True),
+        ],
+        "exec-1",
+    )
+    assert gravados == 3
+
+    novo = _func(cpf="55555555555")
+    pendentes, concluidos = separar_ja_concluidos(
+        path, [ok, falhou, _func(cpf="33333333333", chapa="00999"), novo]
+    )
+    assert [f["CPF"] for f, _ in concluidos] == ["11111111111"]
+    assert concluidos[0][1]["execution_id"] == "exec-1"
+    assert [f["CPF"] for f in pendentes] == ["22222222222", "33333333333", "55555555555"]
+    assert "44444444444" not in consultar_ledger(path, ["44444444444"])
+
+
+def test_ledger_inexistente_nao_filtra(tmp_path):
+    path = str(tmp_path / "outcome_ledger.sqlite3")
+    pendentes, concluidos = separar_ja_concluidos(path, [_func()])
+    assert len(pendentes) == 1
+    assert concluidos == []
@@ -0,0 +1,412 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from outcomes import OUTCOME_FAILED_ACTION
+
+# main importa pyodbc e Playwright; sem o driver ODBC/browser instalados os testes sao pulados.
+main = pytest.importorskip("main", exc_type=ImportError)
+
+
+def _func(cpf, nome=None, **extras):
+    return {"CPF": cpf, "NOME": nome or f"FUNC {cpf}", "CODCOLIGADA": 1, "CHAPA": cpf[-4:], **extras}
+
+
+def _processar_grupo(funcs, manifest, page="pagina", **kwargs):
+    kwargs.setdefault("duas_fases", False)
+    return main._processar_grupo_contrato(
+        page,
+        "MECANICA",
+        funcs,
+        set(),
+        manifest=manifest,
+        output_manager=None,
+        execution_id="exec-teste",
+        started_at=datetime(2026, 1, 1),
+        fotos_cache={},
+        chaves_processadas_no_run=set(),
+        cpfs_processados_no_run=set(),
+        telemetria_sql=main.TelemetriaSQL(),
+        **kwargs,
+    )
+
+
+def _nao_chamar(*args, **kwargs):
+    raise AssertionError("nao deveria ser chamado")
+
+
+def test_sem_detalhe_no_rm_falha_sem_ir_ao_portal(monkeypatch):
+    monkeypatch.setenv("METAX_AGENDADOR", "0")
+    monkeypatch.setattr(main, "buscar_detalhes_funcionarios", lambda funcs, telemetria: list(funcs))
+    monkeypatch.setattr(main, "cadastrar_funcionario", _nao_chamar)
+    monkeypatch.setattr(main, "baixar_foto_funcionario", _nao_chamar)
+    manifest = {"people": []}
+
+    _processar_grupo([_func("11122233344")], manifest, duas_fases=True)
+
+    assert len(manifest["people"]) == 1
+    registro = manifest["people"][0]
+    assert registro["outcome"] == OUTCOME_FAILED_ACTION
+    assert registro["attempted"] is False
+    assert registro["errors"]["action_error"].startswith("Sem detalhe no RM entre as fases")
+    assert "preflight" not in registro
+
+
+def _item_classificado(cpf, **extras):
+    func = _func(cpf, DATAADMISSAO=datetime(2026, 3, 9))
+    registro = main._criar_registro_base(func["NOME"], cpf, datetime.now().isoformat())
+    return {"func": func, "cpf_limpo": cpf, "registro": registro, "finalizado": False, "classificar_foto": True, **extras}
+
+
+class _FilaFalsa:
+    def __init__(self):
+        self.concluidos, self.liberados = [], []
+
+    def concluir(self, cpf, registro):
+        self.concluidos.append(cpf)
+
+    def liberar(self, cpf):
+        self.liberados.append(cpf)
+
+
+def test_adiado_por_orcamento_fica_fora_do_manifest(monkeypatch):
+    monkeypatch.setattr(main, "cadastrar_funcionario", _nao_chamar)
+    item = _item_classificado("11122233344", custo_previsto_s=60)
+    main._etapa_portal(
+        item,
+        {"page": "pagina"},
+        chave="MECANICA",
+        output_manager=None,
+        rascunhos_existentes=set(),
+        chaves_processadas_no_run=set(),
+        cpfs_processados_no_run=set(),
+        prazo=0,
+    )
+    assert item["registro"]["adiado_orcamento"] is True
+    assert item["registro"]["attempted"] is False
+
+    manifest, fila = {"people": []}, _FilaFalsa()
+    main._etapa_relocar(
+        item, manifest=manifest, execution_id="exec-teste", started_at=datetime(2026, 1, 1), inconsistentes=[], fila=fila
+    )
+    assert manifest["people"] == []
+    assert fila.liberados == ["11122233344"] and fila.concluidos == []
+
+
+def test_adiados_orcamento_juntam_pipeline_local_e_processos():
+    pessoa = {"cpf": "1", "DATAADMISSAO": "2026-03-09T00:00:00"}
+    run_context = {
+        "pipeline": {"MECANICA": {"orcamento": {"adiados": 1, "pessoas": [pessoa]}}},
+        "contratos_paralelos": {"ELETROMECANICA": {"pipeline": {"orcamento": {"adiados": 1, "pessoas": [pessoa]}}}},
+    }
+    assert main._adiados_orcamento(run_context) == [pessoa, pessoa]
+    assert main._adiados_orcamento({}) == []
+
+
+@pytest.mark.parametrize(
+    "outcome, concluido",
+    [
+        (main.OUTCOME_VERIFIED_SUCCESS, True),
+        (main.OUTCOME_SKIPPED_ALREADY_EXISTS, True),
+        (OUTCOME_FAILED_ACTION, False),
+        (main.OUTCOME_FAILED_VERIFICATION, False),
+        (main.OUTCOME_SAVED_NOT_VERIFIED, False),
+    ],
+)
+def test_fila_so_conclui_outcomes_concluidos(outcome, concluido):
+    item = _item_classificado("11122233344", classificar_foto=False)
+    item["registro"]["outcome"] = outcome
+    manifest, fila = {"people": []}, _FilaFalsa()
+    main._etapa_relocar(
+        item, manifest=manifest, execution_id="exec-teste", started_at=datetime(2026, 1, 1), inconsistentes=[], fila=fila
+    )
+    assert manifest["people"] == [item["registro"]]
+    assert fila.concluidos == (["11122233344"] if concluido else [])
+    assert fila.liberados == ([] if concluido else ["11122233344"])
+
+
+def test_excecao_em_estagio_vira_falha_no_manifest(monkeypatch):
+    monkeypatch.setenv("METAX_AGENDADOR", "0")
+    monkeypatch.setenv("METAX_PREFLIGHT", "0")
+    monkeypatch.setattr(main, "cadastrar_funcionario", _nao_chamar)
+
+    class _FilaSemCompartilhamento(_FilaFalsa):
+        def reivindicar(self, cpf):
+            raise OSError("compartilhamento indisponivel")
+
+    fila = _FilaSemCompartilhamento()
+    manifest = {"people": []}
+    _processar_grupo([_func("11122233344")], manifest, fila=fila)
+
+    assert len(manifest["people"]) == 1
+    registro = manifest["people"][0]
+    assert registro["outcome"] == OUTCOME_FAILED_ACTION
+    assert "estagio classificar" in registro["errors"]["action_error"]
+    assert "compartilhamento indisponivel" in registro["errors"]["action_error"]
+    assert fila.liberados == ["11122233344"]
+
+
+def test_falha_no_journal_nao_duplica_quem_ja_esta_no_manifest(monkeypatch):
+    monkeypatch.setenv("METAX_AGENDADOR", "0")
+
+    class _JournalQuebrado:
+        def registrar_pessoa(self, registro):
+            raise OSError("fsync falhou")
+
+    manifest = {"people": []}
+    main._processar_grupo_contrato(
+        "pagina",
+        "MECANICA",
+        [_func("11122233344")],
+        {"11122233344"},
+        manifest=manifest,
+        output_manager=None,
+        execution_id="exec-teste",
+        started_at=datetime(2026, 1, 1),
+        fotos_cache={},
+        chaves_processadas_no_run=set(),
+        cpfs_processados_no_run=set(),
+        telemetria_sql=main.TelemetriaSQL(),
+        duas_fases=False,
+        journal=_JournalQuebrado(),
+    )
+    assert [registro["outcome"] for registro in manifest["people"]] == [main.OUTCOME_SKIPPED_ALREADY_EXISTS]
+
+
+def _salvo_pendente(cpf):
+    registro = main._criar_registro_base(f"FUNC {cpf}", cpf, datetime.now().isoformat())
+    registro.update({"attempted": True, "action_saved": True, "contrato_chave": "MECANICA", "verificacao_lote_pendente": True})
+    registro["outcome"] = main.OUTCOME_SAVED_NOT_VERIFIED
+    registro["errors"]["verification_error"] = "Verificacao em lote pendente."
+    return registro
+
+
+def test_resume_confere_salvos_pendentes_na_varredura_nova():
+    pendentes = {"11111111111": _salvo_pendente("11111111111"), "22222222222": _salvo_pendente("22222222222")}
+    funcs = [_func("11111111111"), _func("22222222222"), _func("33333333333")]
+    grupo = main._pendentes_do_grupo(pendentes, funcs[:2])
+    assert pendentes == {} and sorted(grupo) == ["11111111111", "22222222222"]
+
+    manifest, fila, cpfs_processados = {"people": []}, _FilaFalsa(), set()
+    restantes = main._resolver_pendentes_resume(
+        funcs,
+        grupo,
+        {"11111111111"},
+        manifest=manifest,
+        chaves_processadas_no_run=set(),
+        cpfs_processados_no_run=cpfs_processados,
+        fila=fila,
+    )
+
+    assert [func["CPF"] for func in restantes] == ["22222222222", "33333333333"]
+    assert len(manifest["people"]) == 1
+    registro = manifest["people"][0]
+    assert registro["outcome"] == main.OUTCOME_VERIFIED_SUCCESS
+    assert registro["errors"]["verification_error"] == ""
+    assert "verificacao_lote_pendente" not in registro
+    assert cpfs_processados == {"11111111111"}
+    assert fila.concluidos == ["11111111111"]
+
+
+def _pendente_verificacao(cpf):
+    item = _item_classificado(cpf)
+    item["registro"].update(_salvo_pendente(cpf))
+    return item
+
+
+def test_verificacao_em_lote_encontrado_e_ausente(monkeypatch):
+    monkeypatch.setattr(main, "obter_todos_rascunhos", lambda page: {"11111111111", "99999999999"})
+    encontrado, ausente = _pendente_verificacao("11111111111"), _pendente_verificacao("22222222222")
+    rascunhos = set()
+
+    main._verificar_cadastros_em_lote("pagina", [encontrado, ausente], rascunhos)
+
+    assert encontrado["registro"]["outcome"] == main.OUTCOME_VERIFIED_SUCCESS
+    assert encontrado["registro"]["status_final"] == "SUCCESS"
+    assert encontrado["registro"]["errors"]["verification_error"] == ""
+    assert "verificacao_lote_pendente" not in encontrado["registro"]
+    assert ausente["registro"]["outcome"] == main.OUTCOME_SAVED_NOT_VERIFIED
+    assert ausente["registro"]["errors"]["verification_error"] == "CPF nao encontrado na lista de rascunhos."
+    assert ausente["inconsistente"] is True
+    assert rascunhos == {"11111111111"}
+
+
+def test_verificacao_em_lote_erro_na_varredura_falha_todos(monkeypatch):
+    def _varredura_quebrada(page):
+        raise RuntimeError("lista nao carregou")
+
+    monkeypatch.setattr(main, "obter_todos_rascunhos", _varredura_quebrada)
+    pendentes = [_pendente_verificacao("11111111111"), _pendente_verificacao("22222222222")]
+
+    main._verificar_cadastros_em_lote("pagina", pendentes, set())
+
+    for item in pendentes:
+        assert item["registro"]["outcome"] == main.OUTCOME_FAILED_VERIFICATION
+        assert item["registro"]["verified"] is False
+        assert "lista nao carregou" in item["registro"]["errors"]["verification_error"]
+        assert item["inconsistente"] is True
+
+
+class _ExecutorEmThreads(ThreadPoolExecutor):
+    """ProcessPoolExecutor no mesmo processo: o worker do contrato e substituido no teste."""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers)
+
+
+def _processar_em_processos(monkeypatch, grupos, worker, manifest, cpfs_processados):
+    monkeypatch.setattr(main, "ProcessPoolExecutor", _ExecutorEmThreads)
+    monkeypatch.setattr(main, "_processar_contrato_em_processo", worker)
+    for chave in grupos:
+        monkeypatch.setattr(main, f"METAX_CONTRATO_{chave}_VALUE", f"valor-{chave}")
+    args = SimpleNamespace(
+        headless=True,
+        log_level="INFO",
+        sql_stats=False,
+        paginas_paralelas=1,
+        verificacao_em_lote=False,
+        novo_login=True,
+    )
+    return main._processar_contratos_em_processos(
+        list(grupos),
+        grupos,
+        manifest=manifest,
+        execution_id="exec-teste",
+        started_at=datetime(2026, 1, 1),
+        args=args,
+        robot_version="teste",
+        environment_name="TESTE",
+        chaves_processadas_no_run=set(),
+        cpfs_processados_no_run=cpfs_processados,
+        duas_fases=False,
+    )
+
+
+def test_processo_que_caiu_registra_faltantes_e_mescla_contadores(monkeypatch):
+    grupos = {
+        "MECANICA": [_func("11111111111"), _func("22222222222")],
+        "ELETROMECANICA": [_func("33333333333")],
+    }
+
+    def _worker(tarefa):
+        fila = {"reivindicados": 1, "outra_maquina": 1, "ja_concluidos": 0, "retomados_expirados": 0}
+        if tarefa["chave"] == "MECANICA":
+            salvo = main._criar_registro_base("FUNC 11111111111", "11111111111", datetime.now().isoformat())
+            salvo["outcome"] = main.OUTCOME_VERIFIED_SUCCESS
+            return {
+                "chave": "MECANICA",
+                "erro": "Falha no processo do contrato MECANICA: browser fechou",
+                "people": [salvo],
+                "cpfs_processados": {"11111111111"},
+                "fila": fila,
+            }
+        concluido = main._criar_registro_base("FUNC 33333333333", "33333333333", datetime.now().isoformat())
+        concluido["outcome"] = main.OUTCOME_VERIFIED_SUCCESS
+        return {
+            "chave": "ELETROMECANICA",
+            "erro": None,
+            "inconsistente": True,
+            "people": [concluido],
+            "cpfs_processados": {"33333333333"},
+            "fila": fila,
+        }
+
+    manifest = {"people": [], "run_context": {}}
+    cpfs_processados = {"00000000000"}
+    inconsistente = _processar_em_processos(monkeypatch, grupos, _worker, manifest, cpfs_processados)
+
+    assert inconsistente is True
+    por_cpf = {registro["cpf"]: registro for registro in manifest["people"]}
+    assert sorted(por_cpf) == ["11111111111", "22222222222", "33333333333"]
+    assert por_cpf["11111111111"]["outcome"] == main.OUTCOME_VERIFIED_SUCCESS
+    assert por_cpf["22222222222"]["outcome"] == OUTCOME_FAILED_ACTION
+    assert "browser fechou" in por_cpf["22222222222"]["errors"]["action_error"]
+    assert por_cpf["22222222222"]["contrato_chave"] == "MECANICA"
+    assert cpfs_processados == {"00000000000", "11111111111", "33333333333"}
+    contagem = manifest["run_context"]["fila"]["contagem"]
+    assert contagem == {"reivindicados": 2, "outra_maquina": 2, "ja_concluidos": 0, "retomados_expirados": 0}
+    assert manifest["run_context"]["contratos_paralelos"]["MECANICA"]["erro"].endswith("browser fechou")
+
+
+def test_processo_que_nao_devolve_resultado_falha_o_grupo_inteiro(monkeypatch):
+    grupos = {"MECANICA": [_func("11111111111"), _func("22222222222")]}
+
+    def _worker(tarefa):
+        raise RuntimeError("processo morto")
+
+    manifest = {"people": [], "run_context": {}}
+    _processar_em_processos(monkeypatch, grupos, _worker, manifest, set())
+
+    assert [registro["outcome"] for registro in manifest["people"]] == [OUTCOME_FAILED_ACTION] * 2
+    assert all("processo morto" in registro["errors"]["action_error"] for registro in manifest["people"])
+
+
+def test_sessao_antecipada_nao_abre_browser_sem_pendentes(monkeypatch):
+    monkeypatch.setattr(main, "iniciar_sessao", _nao_chamar)
+    futuro_sql = Future()
+    futuro_sql.set_result({"grupos": {"MECANICA": [], "ELETROMECANICA": []}})
+
+    assert main._iniciar_sessao_antecipada(True, futuro_sql, threading.Event()) is None
+
+
+def test_sessao_antecipada_escolhe_primeiro_contrato_com_pessoas(monkeypatch):
+    monkeypatch.setattr(main, "METAX_CONTRATO_ELETROMECANICA_VALUE", "valor-eletro")
+
+    def _iniciar_sessao(headless, resolver_contrato, estado_sessao_dir):
+        assert resolver_contrato() == ("valor-eletro", main.METAX_CONTRATO_ELETROMECANICA_LABEL)
+        return "p", "browser", "pagina"
+
+    monkeypatch.setattr(main, "iniciar_sessao", _iniciar_sessao)
+    futuro_sql = Future()
+    futuro_sql.set_result({"grupos": {"MECANICA": [], "ELETROMECANICA": [_func("11111111111")]}})
+    sinal_pendentes = threading.Event()
+    sinal_pendentes.set()
+
+    sessao = main._iniciar_sessao_antecipada(True, futuro_sql, sinal_pendentes)
+    assert sessao["chave"] == "ELETROMECANICA"
+    assert sessao["page"] == "pagina"
+
+
+def _estagios_do_grupo(monkeypatch, funcs, paginas_paralelas):
+    capturados = {}
+
+    def _executar_pipeline(itens, estagios, capacidade):
+        capturados["estagios"] = {estagio.nome: estagio for estagio in estagios}
+        return {}
+
+    monkeypatch.setenv("METAX_AGENDADOR", "0")
+    monkeypatch.setenv("METAX_PREFLIGHT", "0")
+    monkeypatch.setattr(main, "executar_pipeline", _executar_pipeline)
+    _processar_grupo(funcs, {"people": []}, paginas_paralelas=paginas_paralelas)
+    return capturados["estagios"]
+
+
+def test_paginas_paralelas_limitadas_ao_tamanho_do_grupo(monkeypatch):
+    abertas = []
+    monkeypatch.setattr(main, "exportar_estado_sessao", lambda page: {"origem": page})
+
+    def _abrir_sessao_com_estado(storage_state, headless):
+        abertas.append(storage_state)
+        return "p", "browser", f"pagina-extra-{len(abertas)}"
+
+    monkeypatch.setattr(main, "abrir_sessao_com_estado", _abrir_sessao_com_estado)
+    portal = _estagios_do_grupo(monkeypatch, [_func("11111111111"), _func("22222222222")], 5)["portal"]
+
+    assert portal.workers == 2
+    assert portal.na_thread_atual is True
+    assert portal.abrir_worker(0) == {"page": "pagina", "p": None, "browser": None}
+    assert abertas == []
+    assert portal.abrir_worker(1)["page"] == "pagina-extra-1"
+    assert abertas == [{"origem": "pagina"}]
+
+
+def test_pagina_unica_nao_exporta_sessao(monkeypatch):
+    monkeypatch.setattr(main, "exportar_estado_sessao", _nao_chamar)
+    monkeypatch.setattr(main, "abrir_sessao_com_estado", _nao_chamar)
+    portal = _estagios_do_grupo(monkeypatch, [_func("11111111111")], 4)["portal"]
+
+    assert portal.workers == 1
+    assert portal.abrir_worker(0)["page"] == "pagina"
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from pipeline import Estagio, executar_pipeline
+
+
+def test_itens_passam_por_todos_os_estagios():
+    saida = []
+    metricas = executar_pipeline(
+        range(10),
+        [
+            Estagio("dobrar", lambda x: x * 2, workers=3),
+            Estagio("filtrar", lambda x: x if x % 4 == 0 else None),
+            Estagio("coletar", saida.append),
+        ],
+        capacidade=2,
+    )
+    assert sorted(saida) == [0, 4, 8, 12, 16]
+    assert metricas["dobrar"]["itens"] == 10
+    assert metricas["filtrar"]["itens"] == 10
+    assert metricas["coletar"]["itens"] == 5
+    assert metricas["dobrar"]["workers"] == 3
+
+
+def test_estagio_na_thread_atual_e_recurso_por_worker():
+    thread_chamadora = threading.current_thread().name
+    abertos, fechados, threads_do_worker0 = [], [], set()
+
+    def abrir(indice):
+        abertos.append(indice)
+        return {"indice": indice}
+
+    def processar(item, recurso):
+        if recurso["indice"] == 0:
+            threads_do_worker0.add(threading.current_thread().name)
+        return (item, recurso["indice"])
+
+    saida = []
+    executar_pipeline(
+        range(20),
+        [
+            Estagio("browser", processar, workers=2, na_thread_atual=True, abrir_worker=abrir, fechar_worker=fechados.append),
+            Estagio("coletar", saida.append),
+        ],
+    )
+    assert sorted(item for item, _ in saida) == list(range(20))
+    assert sorted(abertos) == [0, 1]
+    assert len(fechados) == 2
+    assert threads_do_worker0 <= {thread_chamadora}
+
+
+def test_worker_que_nao_abre_deixa_fila_para_os_demais():
+    def abrir(indice):
+        if indice == 1:
+            raise RuntimeError("sem browser")
+        return indice
+
+    saida = []
+    metricas = executar_pipeline(
+        range(6),
+        [
+            Estagio("browser", lambda item, recurso: item, workers=2, abrir_worker=abrir),
+            Estagio("coletar", saida.append),
+        ],
+    )
+    assert sorted(saida) == list(range(6))
+    assert metricas["browser"]["itens"] == 6
+
+
+def test_excecao_encerra_apenas_o_item():
+    def talvez_falhar(x):
+        if x == 3:
+            raise ValueError("falhou")
+        return x
+
+    saida = []
+    metricas = executar_pipeline(range(5), [Estagio("etapa", talvez_falhar, workers=2), Estagio("coletar", saida.append)])
+    assert sorted(saida) == [0, 1, 2, 4]
+    assert metricas["etapa"]["erros"] == 1
+
+
+def test_manter_ordem_entrega_na_ordem_de_entrada():
+    def lento_nos_pares(x):
+        time.sleep(0.02 if x % 2 == 0 else 0)
+        return x if x != 5 else None
+
+    saida = []
+    executar_pipeline(
+        range(12),
+        [
+            Estagio("foto", lento_nos_pares, workers=4, manter_ordem=True),
+            Estagio("coletar", saida.append),
+        ],
+        capacidade=2,
+    )
+    assert saida == [0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 11]
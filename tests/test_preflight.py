@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from preflight import validar_funcionario, validar_lote
+
+
+def _func(**extra):
+    func = {
+        "NOME": "JOAO DA SILVA",
+        "CPF": "123.456.789-01",
+        "PISPASEP": "12345678901",
+        "DTNASCIMENTO": datetime(1990, 5, 1),
+        "DTEMISSAOIDENT": "2010-01-15",
+        "DTCARTTRAB": datetime(2012, 3, 2),
+        "DATAADMISSAO": datetime(2026, 3, 10),
+        "DESCRICAO_CARGO": "AJUDANTE",
+        "CODFUNCAO": "F103",
+        "GRAUINSTRUCAO": "7",
+        "ESTADOCIVIL": "S",
+        "SEXO": "M",
+        "ESTADONATAL": "MS",
+        "UFCARTIDENT": "MS",
+        "UFCARTTRAB": "MS",
+        "TELEFONE1": "(67) 99999-0000",
+    }
+    func.update(extra)
+    return func
+
+
+def test_funcionario_valido_sem_apontamentos():
+    assert validar_funcionario(_func()) == ([], [])
+
+
+def test_erros_de_formatador_com_valor_de_origem():
+    erros, _ = validar_funcionario(
+        _func(CPF="123", PISPASEP="999", DTNASCIMENTO="01/05/1990", DESCRICAO_CARGO=None)
+    )
+    assert any("CPF" in e and "123" in e for e in erros)
+    assert any("PIS" in e and "999" in e for e in erros)
+    assert "Data de nascimento invalida (DTNASCIMENTO='01/05/1990')" in erros
+    assert "DESCRICAO_CARGO vazia no RM" in erros
+
+
+def test_alertas_de_mapeamento_nao_reprovam():
+    erros, alertas = validar_funcionario(
+        _func(GRAUINSTRUCAO="Z", ESTADOCIVIL="X", UFCARTIDENT="XX", CODFUNCAO="F999", DESCRICAO_CARGO="CARGO NOVO", TELEFONE1="")
+    )
+    assert erros == []
+    assert len(alertas) == 5
+    assert any(a.startswith("UF do RG") and "XX" in a for a in alertas)
+
+
+def test_lote_so_devolve_quem_tem_apontamento():
+    resultado = validar_lote([_func(), _func(CPF="98765432100", PISPASEP="1")])
+    assert list(resultado) == ["98765432100"]
+    assert resultado["98765432100"]["erros"]
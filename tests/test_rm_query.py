@@ -0,0 +1,85 @@
+from datetime import date
+
+from rm_query import (
+    NOMES_EXCLUIDOS_PADRAO,
+    SQL_CHAVES_POR_DATA,
+    SQL_FUNCIONARIOS_DETALHE,
+    SQL_FUNCIONARIOS_POR_DATA,
+    calcular_janela_admissao,
+    carregar_nomes_excluidos,
+    dividir_em_chunks,
+    mesclar_detalhes,
+    montar_sql_funcionarios_por_chave,
+    montar_sql_funcionarios_por_nomes,
+)
+
+
+def test_sql_por_data_tem_texto_fixo_parametrizado():
+    assert SQL_FUNCIONARIOS_POR_DATA.count("?") == 2
+    assert "#NOMES_EXCLUIDOS" in SQL_FUNCIONARIOS_POR_DATA
+    assert "NOT IN (" not in SQL_FUNCIONARIOS_POR_DATA
+
+
+def test_sql_por_nomes_placeholders():
+    sql = montar_sql_funcionarios_por_nomes(3)
+    assert "IN (?, ?, ?)" in sql
+
+
+def test_calcular_janela_admissao():
+    assert calcular_janela_admissao("2026-03-10", 2) == (date(2026, 3, 8), date(2026, 3, 10))
+    assert calcular_janela_admissao(date(2026, 3, 10), 0) == (date(2026, 3, 10), date(2026, 3, 10))
+
+
+def test_carregar_nomes_excluidos_arquivo(tmp_path):
+    path = tmp_path / "nomes_excluidos.txt"
+    path.write_text("# comentario\njoao  da silva\nJOAO DA SILVA\n\nMARIA\n", encoding="utf-8")
+    assert carregar_nomes_excluidos(str(path)) == ["JOAO DA SILVA", "MARIA"]
+
+
+def test_carregar_nomes_excluidos_sem_arquivo_usa_padrao(tmp_path):
+    nomes = carregar_nomes_excluidos(str(tmp_path / "inexistente.txt"))
+    assert nomes == list(dict.fromkeys(NOMES_EXCLUIDOS_PADRAO))
+
+
+def test_sql_por_nomes_sem_upper_e_com_collation():
+    sql = montar_sql_funcionarios_por_nomes(2, collation="Latin1_General_CI_AI")
+    assert "UPPER(P.NOME)" not in sql
+    assert "P.NOME COLLATE Latin1_General_CI_AI IN (?, ?)" in sql
+    assert "P.NOME IN (?, ?)" in montar_sql_funcionarios_por_nomes(2)
+
+
+def test_dividir_em_chunks_tamanho_fixo():
+    chunks = dividir_em_chunks(["A", "B", "C", "D", "E"], 2)
+    assert chunks == [["A", "B"], ["C", "D"], ["E", "E"]]
+    assert all(len(c) == 2 for c in chunks)
+    assert dividir_em_chunks([], 2) == []
+
+
+def test_sql_chaves_sem_pfdepend_e_detalhe_por_tabela_temporaria():
+    assert SQL_CHAVES_POR_DATA.count("?") == 2
+    assert "PFDEPEND" not in SQL_CHAVES_POR_DATA
+    assert "#NOMES_EXCLUIDOS" in SQL_CHAVES_POR_DATA
+    assert "?" not in SQL_FUNCIONARIOS_DETALHE
+    assert "#CHAVES_DETALHE" in SQL_FUNCIONARIOS_DETALHE
+    assert "PFDEPEND" in SQL_FUNCIONARIOS_DETALHE
+    assert "PFDEPEND" not in montar_sql_funcionarios_por_nomes(2, somente_chaves=True)
+
+
+def test_mesclar_detalhes_por_coligada_e_chapa():
+    chaves = [
+        {"CPF": "1", "CODCOLIGADA": 1, "CHAPA": "00123"},
+        {"CPF": "2", "CODCOLIGADA": 1, "CHAPA": "00124"},
+    ]
+    detalhes = [{"CPF": "1", "CODCOLIGADA": 1, "CHAPA": "00123 ", "RUA": "RUA A", "NOME_PAI": "JOSE"}]
+    sem_detalhe = mesclar_detalhes(chaves, detalhes)
+    assert chaves[0]["RUA"] == "RUA A"
+    assert chaves[0]["NOME_PAI"] == "JOSE"
+    assert sem_detalhe == [chaves[1]]
+
+
+def test_sql_por_chave_usa_igualdade_direta():
+    sql_cpf = montar_sql_funcionarios_por_chave("CPF", 2)
+    sql_chapa = montar_sql_funcionarios_por_chave("CHAPA", 3, somente_chaves=True)
+    assert "P.CPF IN (?, ?)" in sql_cpf
+    assert "F.CHAPA IN (?, ?, ?)" in sql_chapa
+    assert "PFDEPEND" not in sql_chapa
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from rm_referencias import (
+    CARGO_NAO_INFORMADO,
+    enriquecer_funcionario,
+    extrair_numero_obra,
+    montar_referencias,
+    obter_referencias,
+    referencias_validas,
+    secoes_da_obra,
+)
+
+
+def _referencias():
+    return montar_referencias(
+        [
+            (1, "36.125.001.01", "125.01.004"),
+            (1, "36.125.002.01", "125.02.001"),
+            (1, "36.130.001.01", "130.01.001"),
+        ],
+        [(1, "F009", " auxiliar  administrativo ")],
+    )
+
+
+def test_extrair_numero_obra():
+    assert extrair_numero_obra("36.125.001.01.01") == 125
+    assert extrair_numero_obra("36") is None
+    assert extrair_numero_obra("36.ABC") is None
+    assert extrair_numero_obra(None) is None
+
+
+def test_secoes_da_obra():
+    secoes = secoes_da_obra(_referencias(), 125)
+    assert sorted(secoes) == [(1, "36.125.001.01"), (1, "36.125.002.01")]
+
+
+def test_enriquecer_funcionario():
+    refs = _referencias()
+    func = enriquecer_funcionario({"CODCOLIGADA": 1, "CODSECAO": "36.125.001.01", "CODFUNCAO": "F009"}, refs)
+    assert func["CENTRO_CUSTO"] == "125.01.004"
+    assert func["DESCRICAO_CARGO"] == "AUXILIAR ADMINISTRATIVO"
+    assert func["NUMERO_OBRA"] == 125
+
+    sem_cargo = enriquecer_funcionario({"CODCOLIGADA": 1, "CODSECAO": "36.125.002.01", "CODFUNCAO": "X"}, refs)
+    assert sem_cargo["DESCRICAO_CARGO"] == CARGO_NAO_INFORMADO
+
+
+def test_referencias_validas_refresh_diario():
+    refs = {"gerado_em": datetime(2026, 3, 10, 23, 0).isoformat()}
+    assert referencias_validas(refs, 24, agora=datetime(2026, 3, 10, 23, 30)) is True
+    assert referencias_validas(refs, 24, agora=datetime(2026, 3, 11, 0, 30)) is False
+    assert referencias_validas(None, 24) is False
+
+
+def test_obter_referencias_usa_cache(tmp_path):
+    class FakeCursor:
+        def __init__(self):
+            self.executados = []
+            self._rows = []
+
+        def execute(self, sql):
+            self.executados.append(sql)
+            self._rows = [(1, "36.125.001", "125.01.001")] if "PSECAO" in sql else [(1, "F009", "AJUDANTE")]
+
+        def fetchall(self):
+            return self._rows
+
+    path = str(tmp_path / "rm_referencias.json")
+    cursor = FakeCursor()
+    refs, hit = obter_referencias(cursor, path)
+    assert hit is False
+    assert len(cursor.executados) == 2
+
+    refs_cache, hit = obter_referencias(cursor, path)
+    assert hit is True
+    assert len(cursor.executados) == 2
+    assert refs_cache["secoes"] == refs["secoes"]
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from rm_snapshot_cache import (
+    gravar_snapshot,
+    invalidar_snapshots,
+    ler_snapshot,
+    montar_chave_snapshot,
+)
+
+
+LINHAS = [
+    {
+        "NOME": "JOAO DA SILVA",
+        "CPF": "12345678901",
+        "DATAADMISSAO": datetime(2026, 3, 10),
+        "DTNASCIMENTO": date(1990, 1, 2),
+        "SALARIO": Decimal("2500.50"),
+    }
+]
+
+
+def test_chave_snapshot_depende_de_modo_janela_e_nomes():
+    chave_data, _ = montar_chave_snapshot("data", date(2026, 3, 9), date(2026, 3, 10))
+    chave_data2, _ = montar_chave_snapshot("data", date(2026, 3, 8), date(2026, 3, 10))
+    chave_nomes, desc = montar_chave_snapshot("nomes", nomes=["B", "A"])
+    chave_nomes2, _ = montar_chave_snapshot("nomes", nomes=["A", "B"])
+    assert chave_data != chave_data2
+    assert chave_nomes == chave_nomes2
+    assert desc["nomes_total"] == 2
+
+
+def test_snapshot_roundtrip_e_ttl(tmp_path):
+    path = str(tmp_path / "rm_snapshots.sqlite3")
+    chave, desc = montar_chave_snapshot("data", date(2026, 3, 10), date(2026, 3, 10))
+    gravar_snapshot(path, chave, desc, LINHAS, ttl_seg=600, agora=1000)
+
+    assert ler_snapshot(path, chave, ttl_seg=600, agora=1500) == LINHAS
+    assert ler_snapshot(path, chave, ttl_seg=600, agora=1700) is None
+    assert ler_snapshot(path, chave, ttl_seg=0, agora=1500) is None
+
+
+def test_invalidar_snapshots(tmp_path):
+    path = str(tmp_path / "rm_snapshots.sqlite3")
+    chave, desc = montar_chave_snapshot("nomes", nomes=["JOAO DA SILVA"])
+    gravar_snapshot(path, chave, desc, LINHAS, ttl_seg=600)
+    assert invalidar_snapshots(path) == 1
+    assert ler_snapshot(path, chave, ttl_seg=600) is None
+    assert invalidar_snapshots(str(tmp_path / "nao_existe.sqlite3")) == 0
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from sessao_persistida import (
+    caminho_estado_sessao,
+    descartar_estado_sessao,
+    existe_estado_sessao,
+    gravar_estado_sessao,
+    ler_estado_sessao,
+)
+
+
+def _cifrar(dados: bytes) -> bytes:
+    return bytes(b ^ 0x5A for b in dados)
+
+
+ESTADO = {"cookies": [{"name": "ASP.NET_SessionId", "value": "abc", "domain": "portal.metax.ind.br"}], "origins": []}
+
+
+def test_caminho_por_contrato(tmp_path):
+    assert caminho_estado_sessao(str(tmp_path), "6578", "MONTAGEM").endswith("sessao_6578.bin")
+    assert caminho_estado_sessao(str(tmp_path), None, "Montagem Mecanica - ENESA").endswith(
+        "sessao_montagem_mecanica_-_enesa.bin"
+    )
+    assert caminho_estado_sessao(str(tmp_path), None, None).endswith("sessao_padrao.bin")
+
+
+def test_grava_cifrado_e_le_dentro_do_ttl(tmp_path):
+    path = caminho_estado_sessao(str(tmp_path), "6578", None)
+    agora = datetime(2026, 3, 10, 8, 0)
+    assert not existe_estado_sessao(str(tmp_path))
+    assert gravar_estado_sessao(path, ESTADO, agora=agora, cifrar=_cifrar)
+    assert existe_estado_sessao(str(tmp_path))
+    with open(path, "rb") as f:
+        assert b"ASP.NET_SessionId" not in f.read()
+
+    lido = ler_estado_sessao(path, ttl_min=60, agora=agora + timedelta(minutes=30), decifrar=_cifrar)
+    assert lido == ESTADO
+    assert ler_estado_sessao(path, ttl_min=60, agora=agora + timedelta(minutes=61), decifrar=_cifrar) is None
+
+
+def test_ler_ilegivel_ou_ausente(tmp_path):
+    path = str(tmp_path / "sessao_x.bin")
+    assert ler_estado_sessao(path, decifrar=_cifrar) is None
+    with open(path, "wb") as f:
+        f.write(b"lixo")
+    assert ler_estado_sessao(path, decifrar=_cifrar) is None
+    descartar_estado_sessao(path)
+    assert not (tmp_path / "sessao_x.bin").exists()
+
+
+def test_sem_dpapi_nao_grava(tmp_path):
+    def _sem_dpapi(_dados):
+        raise ImportError("win32crypt")
+
+    path = str(tmp_path / "sessao_x.bin")
+    assert gravar_estado_sessao(path, ESTADO, cifrar=_sem_dpapi) is False
+    assert not (tmp_path / "sessao_x.bin").exists()
@@ -0,0 +1,53 @@
+from sql_telemetria import TelemetriaSQL, interpretar_mensagens_estatisticas
+
+
+MENSAGENS = [
+    "[01000] [Microsoft][ODBC Driver 17 for SQL Server][SQL Server]SQL Server parse and compile time: \n   CPU time = 15 ms, elapsed time = 20 ms.",
+    "[01000] [Microsoft][ODBC Driver 17 for SQL Server][SQL Server]Table 'PFUNC'. Scan count 1, logical reads 120, physical reads 3, read-ahead reads 0.",
+    "[01000] [Microsoft][ODBC Driver 17 for SQL Server][SQL Server]Table 'PFUNC'. Scan count 2, logical reads 30, physical reads 0, read-ahead reads 0.",
+    "[01000] [Microsoft][ODBC Driver 17 for SQL Server][SQL Server] SQL Server Execution Times:\n   CPU time = 40 ms,  elapsed time = 55 ms.",
+]
+
+
+class CursorFake:
+    def __init__(self, messages):
+        self.messages = messages
+
+
+def test_interpretar_mensagens_soma_tempos_e_leituras():
+    resumo = interpretar_mensagens_estatisticas(MENSAGENS)
+    assert resumo["compile_cpu_ms"] == 15
+    assert resumo["compile_elapsed_ms"] == 20
+    assert resumo["exec_cpu_ms"] == 40
+    assert resumo["exec_elapsed_ms"] == 55
+    assert resumo["io"]["PFUNC"] == {"scan_count": 3, "logical_reads": 150, "physical_reads": 3}
+
+
+def test_telemetria_acumula_fases_e_extras():
+    telemetria = TelemetriaSQL()
+    telemetria.registrar("fetch", 10.0, rows=200)
+    telemetria.registrar("fetch", 5.0, rows=50)
+    with telemetria.fase("setup") as fase:
+        fase["rows"] = 3
+    telemetria.extras["snapshot"] = "MISS"
+
+    data = telemetria.como_dict()
+    assert data["fases"]["fetch"] == {"ms": 15.0, "chamadas": 2, "rows": 250}
+    assert data["fases"]["setup"]["rows"] == 3
+    assert data["fases"]["connect"]["chamadas"] == 0
+    assert data["snapshot"] == "MISS"
+    assert data["total_ms"] >= 15.0
+
+
+def test_mensagens_ignoradas_sem_captura():
+    telemetria = TelemetriaSQL(capturar_estatisticas=False)
+    telemetria.coletar_mensagens("execute", CursorFake([("01000", MENSAGENS[0])]))
+    assert "statistics" not in telemetria.como_dict()["fases"]["execute"]
+
+
+def test_mensagens_capturadas_por_fase():
+    telemetria = TelemetriaSQL(capturar_estatisticas=True)
+    telemetria.coletar_mensagens("execute", CursorFake([("01000", m) for m in MENSAGENS]))
+    stats = telemetria.como_dict()["fases"]["execute"]["statistics"]
+    assert stats["exec_elapsed_ms"] == 55
+    assert stats["io"]["PFUNC"]["logical_reads"] == 150
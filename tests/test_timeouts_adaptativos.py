@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from timeouts_adaptativos import ETAPAS, MIN_AMOSTRAS, TimeoutsAdaptativos, percentil
+
+
+def _timeouts(tmp_path, **kwargs):
+    kwargs.setdefault("janela", 50)
+    kwargs.setdefault("percentil_alvo", 95)
+    kwargs.setdefault("margem", 1.5)
+    kwargs.setdefault("habilitado", True)
+    return TimeoutsAdaptativos(str(tmp_path / "timeouts.json"), **kwargs)
+
+
+def test_percentil():
+    assert percentil(list(range(1, 101)), 95) == 95
+    assert percentil([10.0], 95) == 10.0
+
+
+def test_usa_padrao_ate_ter_amostras_suficientes(tmp_path):
+    t = _timeouts(tmp_path)
+    for _ in range(MIN_AMOSTRAS - 1):
+        t.registrar("cep_resposta", 1000)
+    assert t.timeout("cep_resposta") == ETAPAS["cep_resposta"][0]
+    t.registrar("cep_resposta", 1000)
+    assert t.timeout("cep_resposta") == ETAPAS["cep_resposta"][1]
+
+
+def test_percentil_com_margem_limitado_por_piso_e_teto(tmp_path):
+    _, piso, teto = ETAPAS["salvar_rascunho"]
+    t = _timeouts(tmp_path)
+    for _ in range(MIN_AMOSTRAS):
+        t.registrar("salvar_rascunho", 40000)
+    assert t.timeout("salvar_rascunho") == 60000
+    for _ in range(MIN_AMOSTRAS * 2):
+        t.registrar("salvar_rascunho", teto)
+    assert t.timeout("salvar_rascunho") == teto
+    rapido = _timeouts(tmp_path / "rapido")
+    for _ in range(MIN_AMOSTRAS):
+        rapido.registrar("salvar_rascunho", 100)
+    assert rapido.timeout("salvar_rascunho") == piso
+
+
+def test_desabilitado_usa_padrao(tmp_path):
+    t = _timeouts(tmp_path, habilitado=False)
+    for _ in range(MIN_AMOSTRAS):
+        t.registrar("cep_resposta", 10000)
+    assert t.timeout("cep_resposta") == ETAPAS["cep_resposta"][0]
+
+
+def test_medir_registra_sucesso_e_timeout_mas_ignora_outros_erros(tmp_path):
+    t = _timeouts(tmp_path)
+    with t.medir("combo_carregado", 5000) as timeout_ms:
+        assert timeout_ms == 5000
+    with pytest.raises(TimeoutError):
+        with t.medir("combo_carregado", 5000):
+            raise TimeoutError()
+    with pytest.raises(ValueError):
+        with t.medir("combo_carregado", 5000):
+            raise ValueError()
+    amostras = list(t._amostras["combo_carregado"])
+    assert len(amostras) == 2
+    assert amostras[0] < 5000
+    assert amostras[1] == 5000
+
+
+def test_gravar_junta_com_arquivo_e_corta_na_janela(tmp_path):
+    path = tmp_path / "timeouts.json"
+    path.write_text(json.dumps({"etapas": {"cep_resposta": [1.0] * 45, "combo_cargo": [2.0]}}), encoding="utf-8")
+    t = _timeouts(tmp_path)
+    for _ in range(10):
+        t.registrar("cep_resposta", 3.0)
+    assert t.gravar() is True
+    etapas = json.loads(path.read_text(encoding="utf-8"))["etapas"]
+    assert len(etapas["cep_resposta"]) == 50
+    assert etapas["cep_resposta"][-10:] == [3.0] * 10
+    assert etapas["combo_cargo"] == [2.0]
+    assert t.gravar() is False
+
+    nova = _timeouts(tmp_path)
+    assert nova.resumo()["cep_resposta"]["amostras"] == 50
+
+
+def test_log_quando_timeout_muda(tmp_path):
+    logs = []
+    t = _timeouts(tmp_path, log=lambda mensagem, detalhes: logs.append(detalhes))
+    t.timeout("cep_resposta")
+    t.timeout("cep_resposta")
+    assert len(logs) == 1
+    for _ in range(MIN_AMOSTRAS):
+        t.registrar("cep_resposta", 8000)
+    assert t.timeout("cep_resposta") == 12000
+    assert len(logs) == 2
+    assert logs[-1]["timeout_ms"] == 12000
+    assert logs[-1]["amostras"] == MIN_AMOSTRAS
@@ -1,8 +1,12 @@
+import json
+import os
+
 import pytest
 from datetime import date, datetime
 from utils import (
     normalizar_texto, formatar_cpf, formatar_pis, 
-    formatar_data, formatar_telefone_numerico
+    formatar_data, formatar_telefone_numerico,
+    gravar_bytes_atomico, gravar_json_atomico
 )
 
 # TESTES DE NORMALIZAÇÃO DE TEXTO
@@ -73,3 +77,26 @@ def test_formatar_telefone_curto():
 
 def test_formatar_telefone_none():
     assert formatar_telefone_numerico(None) == ""
+
+# TESTES DE ESCRITA ATOMICA
+def test_gravar_json_atomico_cria_pasta_e_nao_deixa_temporario(tmp_path):
+    path = tmp_path / "json" / "estado.json"
+    gravar_json_atomico(str(path), {"nome": "João", "quando": date(2026, 1, 2)}, indent=2, default=str)
+
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"nome": "João", "quando": "2026-01-02"}
+    assert os.listdir(path.parent) == ["estado.json"]
+
+def test_gravar_bytes_atomico_preserva_arquivo_quando_falha(tmp_path, monkeypatch):
+    path = tmp_path / "sessao.bin"
+    gravar_bytes_atomico(str(path), b"antigo")
+
+    def _falhar(origem, destino):
+        raise OSError("compartilhamento indisponivel")
+
+    monkeypatch.setattr(os, "replace", _falhar)
+    with pytest.raises(OSError):
+        gravar_bytes_atomico(str(path), b"novo")
+
+    assert path.read_bytes() == b"antigo"
+    assert os.listdir(tmp_path) == ["sessao.bin"]
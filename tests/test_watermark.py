@@ -0,0 +1,59 @@
+from datetime import date
+
+from outcomes import OUTCOME_FAILED_ACTION, OUTCOME_SKIPPED_ALREADY_EXISTS, OUTCOME_VERIFIED_SUCCESS
+from watermark import (
+    calcular_novo_watermark,
+    data_inicio_incremental,
+    gravar_watermark,
+    ler_watermark,
+)
+
+
+def _pessoa(outcome: str, admissao: str, chapa: str) -> dict:
+    return {"outcome": outcome, "dados_funcionario": {"DATAADMISSAO": admissao, "CHAPA": chapa}}
+
+
+def test_watermark_avanca_ate_maior_concluida():
+    people = [
+        _pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-09T00:00:00", "001"),
+        _pessoa(OUTCOME_SKIPPED_ALREADY_EXISTS, "2026-03-10T00:00:00", "002"),
+    ]
+    novo = calcular_novo_watermark(people)
+    assert novo["ultima_admissao"] == "2026-03-10"
+    assert novo["ultima_chapa"] == "002"
+
+
+def test_watermark_para_antes_da_primeira_pendencia():
+    people = [
+        _pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-08T00:00:00", "001"),
+        _pessoa(OUTCOME_FAILED_ACTION, "2026-03-09T00:00:00", "002"),
+        _pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-10T00:00:00", "003"),
+    ]
+    assert calcular_novo_watermark(people)["ultima_admissao"] == "2026-03-08"
+    assert calcular_novo_watermark(people[1:2]) is None
+
+
+def test_watermark_para_antes_de_pendente_fora_do_manifest():
+    people = [
+        _pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-08T00:00:00", "001"),
+        _pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-10T00:00:00", "003"),
+    ]
+    novo = calcular_novo_watermark(people, pendentes=[{"DATAADMISSAO": "2026-03-09T00:00:00", "CHAPA": "002"}])
+    assert novo["ultima_admissao"] == "2026-03-08"
+
+
+def test_watermark_nao_retrocede():
+    people = [_pessoa(OUTCOME_VERIFIED_SUCCESS, "2026-03-08", "001")]
+    assert calcular_novo_watermark(people, {"ultima_admissao": "2026-03-09"}) is None
+
+
+def test_data_inicio_incremental_com_overlap():
+    assert data_inicio_incremental({"ultima_admissao": "2026-03-10"}, 1) == date(2026, 3, 9)
+    assert data_inicio_incremental(None, 1) is None
+
+
+def test_gravar_e_ler_watermark(tmp_path):
+    path = str(tmp_path / "json" / "rm_watermark.json")
+    gravar_watermark(path, {"ultima_admissao": "2026-03-10", "ultima_chapa": "002"})
+    assert ler_watermark(path)["ultima_chapa"] == "002"
+    assert ler_watermark(str(tmp_path / "nao_existe.json")) is None
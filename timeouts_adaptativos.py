@@ -0,0 +1,154 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils import gravar_json_atomico
+
+
+# Timeouts por etapa nomeada do portal derivados da latencia observada: cada etapa guarda
+# uma janela movel de duracoes (ms), persistida entre execucoes, e o timeout passa a ser
+# percentil alto * margem, limitado por piso e teto. Espera que estoura entra como amostra
+# do proprio timeout (censurada), entao portal lento empurra o timeout para cima. Ate ter
+# amostras suficientes vale o padrao fixo da etapa.
+
+# etapa -> (padrao_ms, piso_ms, teto_ms)
+ETAPAS = {
+    "campo_visivel": (8000, 3000, 20000),
+    "campo_formulario": (60000, 5000, 60000),
+    "combo_carregado": (15000, 4000, 30000),
+    "combo_cargo": (15000, 4000, 30000),
+    "cep_resposta": (6000, 3000, 20000),
+    "salvar_rascunho": (90000, 30000, 180000),
+}
+
+MIN_AMOSTRAS = 20
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+class TimeoutsAdaptativos:
+    def __init__(
+        self,
+        path: str | None,
+        janela: int | None = None,
+        percentil_alvo: float | None = None,
+        margem: float | None = None,
+        habilitado: bool | None = None,
+        log=None,
+    ):
+        self.path = path
+        self.janela = janela or int(os.getenv("METAX_TIMEOUT_JANELA", "200"))
+        self.percentil_alvo = percentil_alvo or float(os.getenv("METAX_TIMEOUT_PERCENTIL", "95"))
+        self.margem = margem or float(os.getenv("METAX_TIMEOUT_MARGEM", "1.5"))
+        if habilitado is None:
+            habilitado = os.getenv("METAX_TIMEOUT_ADAPTATIVO", "1") == "1"
+        self.habilitado = habilitado
+        self._log = log
+        self._lock = threading.Lock()
+        self._amostras: dict[str, deque] = {}
+        self._novas: dict[str, list[float]] = {}
+        self._escolhidos: dict[str, int] = {}
+        self._carregado = False
+
+    def _ler_arquivo(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            return dados.get("etapas", {}) if isinstance(dados, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _garantir_carregado(self):
+        if self._carregado:
+            return
+        for etapa, valores in self._ler_arquivo().items():
+            self._amostras[etapa] = deque((float(v) for v in valores or []), maxlen=self.janela)
+        self._carregado = True
+
+    def registrar(self, etapa: str, duracao_ms: float):
+        with self._lock:
+            self._garantir_carregado()
+            self._amostras.setdefault(etapa, deque(maxlen=self.janela)).append(float(duracao_ms))
+            self._novas.setdefault(etapa, []).append(float(duracao_ms))
+
+    def timeout(self, etapa: str) -> int:
+        """Timeout (ms) da etapa; loga quando o valor escolhido muda na execucao."""
+        padrao, piso, teto = ETAPAS[etapa]
+        with self._lock:
+            self._garantir_carregado()
+            amostras = list(self._amostras.get(etapa) or [])
+            if not self.habilitado or len(amostras) < MIN_AMOSTRAS:
+                escolhido = padrao
+                base = None
+            else:
+                base = percentil(amostras, self.percentil_alvo)
+                escolhido = int(min(teto, max(piso, base * self.margem)))
+            anterior = self._escolhidos.get(etapa)
+            self._escolhidos[etapa] = escolhido
+        if self._log is not None and (anterior is None or abs(escolhido - anterior) >= 0.2 * anterior):
+            self._log(
+                "Timeout adaptativo",
+                {
+                    "etapa": etapa,
+                    "timeout_ms": escolhido,
+                    "percentil_ms": round(base, 1) if base is not None else None,
+                    "amostras": len(amostras),
+                    "piso_ms": piso,
+                    "teto_ms": teto,
+                },
+            )
+        return escolhido
+
+    @contextmanager
+    def medir(self, etapa: str, timeout_ms: int | None = None, excecoes_timeout: tuple = (TimeoutError,)):
+        """
+        with medir("cep_resposta") as timeout_ms: ... espera com timeout_ms. Sucesso registra a
+        duracao; excecao de timeout registra o proprio timeout; outras excecoes nao entram.
+        """
+        timeout_ms = timeout_ms or self.timeout(etapa)
+        started = time.perf_counter()
+        try:
+            yield timeout_ms
+        except excecoes_timeout:
+            self.registrar(etapa, timeout_ms)
+            raise
+        self.registrar(etapa, (time.perf_counter() - started) * 1000)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            self._garantir_carregado()
+            return {
+                etapa: {
+                    "amostras": len(valores),
+                    "p50_ms": round(percentil(list(valores), 50), 1) if valores else None,
+                    "percentil_ms": round(percentil(list(valores), self.percentil_alvo), 1) if valores else None,
+                    "timeout_ms": self._escolhidos.get(etapa),
+                }
+                for etapa, valores in sorted(self._amostras.items())
+            }
+
+    def gravar(self) -> bool:
+        """Junta as amostras novas desta execucao as do arquivo (outros processos podem ter gravado)."""
+        if not self.path:
+            return False
+        with self._lock:
+            novas = {etapa: list(valores) for etapa, valores in self._novas.items() if valores}
+            self._novas = {}
+        if not novas:
+            return False
+        etapas = {etapa: list(valores) for etapa, valores in self._ler_arquivo().items()}
+        for etapa, valores in novas.items():
+            etapas[etapa] = (etapas.get(etapa, []) + valores)[-self.janela:]
+        gravar_json_atomico(self.path, {"atualizado_em": datetime.now().isoformat(), "etapas": etapas})
+        return True
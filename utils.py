@@ -1,5 +1,6 @@
 import unicodedata
 from datetime import date, datetime
+import json
 import os
 import tempfile
 from PIL import Image, ImageOps
@@ -153,3 +154,22 @@ def formatar_cpf(cpf: str) -> str:
     if len(cpf) != 11:
         raise ValueError(f"CPF inválido: {cpf}")
     return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+
+def gravar_bytes_atomico(path: str, dados: bytes):
+    """Grava em arquivo temporario na mesma pasta e troca com os.replace (leitor nunca ve arquivo pela metade)."""
+    dir_name = os.path.dirname(path) or "."
+    os.makedirs(dir_name, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=dir_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def gravar_json_atomico(path: str, dados, **json_kwargs):
+    json_kwargs.setdefault("ensure_ascii", False)
+    gravar_bytes_atomico(path, json.dumps(dados, **json_kwargs).encode("utf-8"))
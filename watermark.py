@@ -0,0 +1,89 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from outcomes import OUTCOME_SKIPPED_ALREADY_EXISTS, OUTCOME_VERIFIED_SUCCESS
+from utils import gravar_json_atomico
+
+
+# Outcomes que encerram a pessoa; somente eles podem empurrar o watermark.
+OUTCOMES_CONCLUIDOS = {OUTCOME_VERIFIED_SUCCESS, OUTCOME_SKIPPED_ALREADY_EXISTS}
+
+
+def _para_data(valor) -> date | None:
+    if not valor:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor)).date()
+    except ValueError:
+        return None
+
+
+def ler_watermark(path: str) -> dict | None:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not _para_data(data.get("ultima_admissao")):
+        return None
+    return data
+
+
+def gravar_watermark(path: str, watermark: dict):
+    gravar_json_atomico(path, watermark, indent=2)
+
+
+def data_inicio_incremental(watermark: dict | None, overlap_dias: int) -> date | None:
+    """Menor DATAADMISSAO que ainda precisa ser consultada (watermark - overlap)."""
+    ultima = _para_data((watermark or {}).get("ultima_admissao"))
+    if not ultima:
+        return None
+    return ultima - timedelta(days=max(0, int(overlap_dias or 0)))
+
+
+def calcular_novo_watermark(
+    people: list[dict], watermark_atual: dict | None = None, pendentes: list[dict] | None = None
+) -> dict | None:
+    """
+    Avanca o watermark ate a maior admissao concluida que nao tenha nenhuma
+    pessoa pendente (falha/nao verificada) na mesma data ou antes dela.
+    pendentes sao dados de funcionario que ficaram fora do manifest sem
+    conclusao (adiados pelo orcamento de tempo). Retorna None quando nao ha avanco.
+    """
+    concluidos = []
+    menor_pendente = None
+    for dados in pendentes or []:
+        admissao = _para_data(dados.get("DATAADMISSAO"))
+        if admissao and (menor_pendente is None or admissao < menor_pendente):
+            menor_pendente = admissao
+    for person in people or []:
+        dados = person.get("dados_funcionario") or {}
+        admissao = _para_data(dados.get("DATAADMISSAO"))
+        if not admissao:
+            continue
+        if person.get("outcome") in OUTCOMES_CONCLUIDOS:
+            concluidos.append((admissao, str(dados.get("CHAPA") or "")))
+        elif menor_pendente is None or admissao < menor_pendente:
+            menor_pendente = admissao
+
+    if menor_pendente is not None:
+        concluidos = [c for c in concluidos if c[0] < menor_pendente]
+    if not concluidos:
+        return None
+
+    admissao, chapa = max(concluidos)
+    atual = _para_data((watermark_atual or {}).get("ultima_admissao"))
+    if atual and admissao <= atual:
+        return None
+    return {
+        "ultima_admissao": admissao.isoformat(),
+        "ultima_chapa": chapa,
+        "atualizado_em": datetime.now().isoformat(),
+    }